@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+End-to-end API benchmark with recorded upstreams, and a regression gate
+
+Drives the real FastAPI app in-process (all middleware, caches, admission
+control) with arXiv and the LLM providers replaced by stand-ins that
+replay recorded responses after a configurable latency:
+  - arXiv: the metadata fixture, via ReplayArxivClient
+  - LLM: the answers in fixtures/llm_responses.json, streamed at a fixed
+    token rate after a time-to-first-token delay
+
+Each scenario (search -> /api/papers, chat -> /api/chat) runs at every
+concurrency level and reports throughput, p50/p95/p99 latency, errors and
+process memory.
+
+    python benchmarks/bench_api.py --concurrency 1 8 32 --requests 400
+    python benchmarks/bench_api.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_api.py --baseline benchmarks/baseline.json --tolerance 0.15
+
+With --baseline the run exits non-zero when throughput drops, or p95
+latency or peak memory grows, by more than the tolerance. Baselines are
+machine specific: record one on the machine that checks against it.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "attention transformer",
+    "graph convolutional networks",
+    "stochastic optimization",
+    "language models few shot",
+    "generative adversarial",
+    "residual learning image recognition",
+    "retrieval augmented generation",
+    "word representations",
+]
+
+
+class ReplayLLM:
+    """Stand-in LLM provider answering with recorded responses
+
+    The answer is picked by the question in the prompt when it was recorded,
+    otherwise by a hash of the prompt, so runs are deterministic. Output is
+    released as whitespace-delimited tokens at `tokens_per_second` after
+    `first_token_latency`.
+    """
+
+    def __init__(self, responses, first_token_latency: float, tokens_per_second: float):
+        self.responses = responses
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+
+    def _pick(self, prompt: str) -> str:
+        for recorded in self.responses:
+            if recorded["question"] in prompt:
+                return recorded["response"]
+        digest = int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16)
+        return self.responses[digest % len(self.responses)]["response"]
+
+    def _tokens(self, text: str):
+        return [token + " " for token in text.split(" ")]
+
+    async def ainvoke(self, prompt: str):
+        text = self._pick(prompt)
+        await asyncio.sleep(self.first_token_latency + len(self._tokens(text)) / self.tokens_per_second)
+        return SimpleNamespace(content=text)
+
+    async def astream(self, prompt: str):
+        await asyncio.sleep(self.first_token_latency)
+        for token in self._tokens(self._pick(prompt)):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield SimpleNamespace(content=token)
+
+    def invoke(self, prompt: str):
+        text = self._pick(prompt)
+        time.sleep(self.first_token_latency + len(self._tokens(text)) / self.tokens_per_second)
+        return SimpleNamespace(content=text)
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux), else the peak"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if platform.system() == "Darwin" else peak / 1024
+
+
+def percentile(ordered, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_scenario(client, make_request, concurrency: int, total: int) -> dict:
+    """Issue `total` requests with `concurrency` in flight; return latency and memory figures"""
+    latencies = []
+    errors = 0
+    issued = 0
+    rss_before = rss_mb()
+
+    async def worker():
+        nonlocal errors, issued
+        while issued < total:
+            n = issued
+            issued += 1
+            method, path, body = make_request(n)
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                errors += 1
+            else:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+
+    ordered = sorted(latencies) or [float("nan")]
+    return {
+        "throughput": len(latencies) / duration,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "errors": errors,
+        "rss_mb": rss_mb(),
+        "rss_growth_mb": rss_mb() - rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Regression messages for results worse than the baseline by more than tolerance"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        if current["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {current['throughput']:.1f} req/s "
+                               f"vs baseline {previous['throughput']:.1f}")
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {current['p95_ms']:.1f} ms vs baseline {previous['p95_ms']:.1f}")
+        if current["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{key}: peak RSS {current['peak_rss_mb']:.0f} MB "
+                               f"vs baseline {previous['peak_rss_mb']:.0f}")
+    return regressions
+
+
+def configure_environment(tmp: str):
+    """Isolate the app from real services and state; explicit env vars still win"""
+    defaults = {
+        "RAG_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "PREFETCH_ENABLED": "false",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "LLM_WARMUP": "false",
+        "HEALTH_PROBE_INTERVAL": "3600",
+        "CACHE_BACKEND": "memory",
+        "CACHE_SQLITE_PATH": os.path.join(tmp, "cache.db"),
+        "ARTIFACT_STORE_PATH": os.path.join(tmp, "artifacts.db"),
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    os.chdir(ROOT)
+
+
+async def run(args, records, responses) -> dict:
+    import httpx
+    import main
+    from arxiv_service import ArxivService
+    from bench_local_index import ReplayArxivClient
+    from llm_service import LLMService
+
+    logging.getLogger().setLevel(logging.WARNING)
+    main.init_services()
+    main.llm_service = LLMService(providers=[
+        ("replay", ReplayLLM(responses, args.llm_latency, args.llm_tokens_per_second))
+    ])
+
+    questions = [recorded["question"] for recorded in responses]
+    scenarios = {
+        "search": lambda n: ("GET", f"/api/papers?q={QUERIES[n % len(QUERIES)]}&limit={args.limit}", None),
+        "chat": lambda n: ("POST", "/api/chat", {
+            "paper_id": records[n % len(records)]["id"],
+            "message": questions[n % len(questions)]
+        }),
+    }
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        for name in args.scenarios:
+            # Empty caches per scenario, so chat never runs on papers a search scenario already fetched
+            main.arxiv_service.shutdown()
+            main.arxiv_service = ArxivService()
+            main.arxiv_service.client = ReplayArxivClient(records, args.arxiv_latency)
+            for concurrency in args.concurrency:
+                key = f"{name}@{concurrency}"
+                results[key] = await run_scenario(client, scenarios[name], concurrency, args.requests)
+                result = results[key]
+                print(f"{key:<12} {result['throughput']:8.1f} req/s  p50 {result['p50_ms']:7.1f}  "
+                      f"p95 {result['p95_ms']:7.1f}  p99 {result['p99_ms']:7.1f} ms  errors {result['errors']:<4} "
+                      f"RSS {result['rss_mb']:6.1f} MB ({result['rss_growth_mb']:+.1f})")
+    await main.shutdown_services()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=["search", "chat"], default=["search", "chat"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--limit", type=int, default=10, help="Results per search")
+    parser.add_argument("--arxiv-latency", type=float, default=0.3, help="Seconds per replayed arXiv call")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="Seconds to the first LLM token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=400)
+    parser.add_argument("--baseline", help="Baseline JSON to compare against; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--save-baseline", help="Write this run's results as a baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(tmp)
+        from bench_local_index import FIXTURES
+        from local_index import LocalArxivIndex
+
+        records = list(LocalArxivIndex._read_json(os.path.join(FIXTURES, "arxiv_metadata_sample.jsonl")))
+        with open(os.path.join(FIXTURES, "llm_responses.json"), encoding="utf-8") as f:
+            responses = json.load(f)
+
+        print(f"arXiv {args.arxiv_latency * 1000:.0f} ms, LLM first token {args.llm_latency * 1000:.0f} ms "
+              f"at {args.llm_tokens_per_second:.0f} tokens/s, {args.requests} requests per level")
+        results = asyncio.run(run(args, records, responses))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"💾 Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ Within {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
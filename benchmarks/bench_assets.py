@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Bytes per page load and server CPU per request, disk-served vs bundled assets
+
+Spawns start.py twice against an offline mirror built from the recorded
+fixture: once serving static files from disk without API compression
+(ASSET_BUNDLE_ENABLED=false, API_GZIP_ENABLED=false), once with the
+in-memory bundle and JSON gzip. For each it reports:
+  - first visit: bytes on the wire for / and every /static asset it references
+  - repeat visit: requests and bytes a browser cache still needs, honouring
+    Cache-Control and revalidating with If-None-Match
+  - a 50-result /api/papers response
+  - server CPU per request, read from /proc for the server process (Linux)
+
+    python benchmarks/bench_assets.py --requests 500
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BROWSER_HEADERS = {"Accept-Encoding": "gzip, deflate, br"}
+MODES = {
+    "disk": {"ASSET_BUNDLE_ENABLED": "false", "API_GZIP_ENABLED": "false"},
+    "bundle": {"ASSET_BUNDLE_ENABLED": "true", "API_GZIP_ENABLED": "true"},
+}
+
+
+def server_cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a process, from /proc/<pid>/stat"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def spawn(mode: str, tmp: str, index_path: str):
+    from load_test import free_port, wait_until_live
+
+    port = free_port()
+    env = {
+        **os.environ,
+        **MODES[mode],
+        "PORT": str(port),
+        "ARXIV_BACKEND": "local",
+        "ARXIV_LOCAL_INDEX_PATH": index_path,
+        "CACHE_SQLITE_PATH": os.path.join(tmp, f"cache-{mode}.db"),
+        "RAG_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "LLM_WARMUP": "false",
+        "HEALTH_PROBE_INTERVAL": "3600",
+    }
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "start.py")],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_live(url)
+    except Exception:
+        process.terminate()
+        raise
+    return process, url
+
+
+def page_load(client: httpx.Client, cache: dict = None):
+    """Fetch / and its /static assets like a browser; returns (requests, wire bytes, cache)"""
+    cached = cache or {}
+    fresh = {}
+    requests = 0
+    wire_bytes = 0
+
+    def fetch(path: str):
+        nonlocal requests, wire_bytes
+        entry = cached.get(path)
+        if entry and ("immutable" in entry["cache_control"] or "max-age=" in entry["cache_control"]):
+            fresh[path] = entry
+            return entry["text"]
+        headers = dict(BROWSER_HEADERS)
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        response = client.get(path, headers=headers)
+        requests += 1
+        wire_bytes += response.num_bytes_downloaded
+        if response.status_code == 304:
+            fresh[path] = entry
+            return entry["text"]
+        fresh[path] = {
+            "text": response.text,
+            "etag": response.headers.get("etag"),
+            "cache_control": response.headers.get("cache-control", "")
+        }
+        return response.text
+
+    html = fetch("/")
+    for path in re.findall(r'"(/static/[^"]+)"', html):
+        fetch(path)
+    return requests, wire_bytes, fresh
+
+
+def measure(mode: str, tmp: str, index_path: str, count: int) -> dict:
+    process, url = spawn(mode, tmp, index_path)
+    try:
+        with httpx.Client(base_url=url, timeout=30) as client:
+            first_requests, first_bytes, cache = page_load(client)
+            repeat_requests, repeat_bytes, _ = page_load(client, cache)
+
+            api_path = "/api/papers?q=learning&limit=50&rerank=false"
+            api = client.get(api_path, headers=BROWSER_HEADERS)
+
+            # Server CPU for a stream of first-visit page loads and API calls
+            cpu_start = server_cpu_seconds(process.pid)
+            requests = 0
+            while requests < count:
+                loaded, _, _ = page_load(client)
+                client.get(api_path, headers=BROWSER_HEADERS)
+                requests += loaded + 1
+            cpu = server_cpu_seconds(process.pid) - cpu_start
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {
+        "first": (first_requests, first_bytes),
+        "repeat": (repeat_requests, repeat_bytes),
+        "api_bytes": api.num_bytes_downloaded,
+        "cpu_ms": cpu * 1000 / requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300, help="Requests per mode for the CPU measurement")
+    args = parser.parse_args()
+
+    from bench_local_index import FIXTURES, replicate
+    from local_index import LocalArxivIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "arxiv.db")
+        index = LocalArxivIndex(index_path)
+        records = list(index._read_json(os.path.join(FIXTURES, "arxiv_metadata_sample.jsonl")))
+        index.ingest_records(replicate(records, 10))
+
+        print(f"{'mode':<8} {'first visit':>22} {'repeat visit':>22} {'/api/papers x50':>16} {'server CPU':>14}")
+        for mode in MODES:
+            result = measure(mode, tmp, index_path, args.requests)
+            first_requests, first_bytes = result["first"]
+            repeat_requests, repeat_bytes = result["repeat"]
+            print(f"{mode:<8} {first_requests:>3} req {first_bytes:>10,} B "
+                  f"{repeat_requests:>5} req {repeat_bytes:>10,} B "
+                  f"{result['api_bytes']:>14,} B {result['cpu_ms']:>8.3f} ms/req")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the ArxivService async path
+
+Replaces the arxiv client with a fake that sleeps for a fixed upstream
+latency, then compares calling the blocking method from a coroutine with
+the executor-backed async method at increasing numbers of in-flight requests.
+Every request searches a distinct query, so the query cache and request
+coalescing never answer for the upstream and both paths pay its latency.
+
+Usage: python benchmarks/bench_concurrency.py --latency 0.2 --levels 1 2 4 8 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# A shared on-disk cache would carry results over between runs
+os.environ.setdefault("CACHE_BACKEND", "memory")
+
+from arxiv_service import ArxivService
+
+
+class FakeArxivClient:
+    """Stand-in for arxiv.Client that simulates upstream latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def results(self, search):
+        time.sleep(self.latency)
+        ids = search.id_list or [f"2401.{i:05d}v1" for i in range(search.max_results)]
+        for i, paper_id in enumerate(ids):
+            yield SimpleNamespace(
+                entry_id=f"http://arxiv.org/abs/{paper_id}",
+                title=f"Fake paper {i}",
+                authors=[SimpleNamespace(name="A. Author")],
+                summary="Fake abstract " * 20,
+                published=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                pdf_url=f"http://arxiv.org/pdf/{paper_id}",
+                categories=["cs.LG"]
+            )
+
+
+async def run_level(service: ArxivService, concurrency: int, rounds: int, offload: bool) -> float:
+    """Run concurrency * rounds searches with `concurrency` in flight, return req/s"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    mode = "async" if offload else "blocking"
+
+    async def one_request(n: int):
+        query = f"benchmark {mode} {concurrency} {n}"
+        async with semaphore:
+            if offload:
+                await service.asearch_papers(query, 5)
+            else:
+                service.search_papers(query, 5)
+
+    total = concurrency * rounds
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(n) for n in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated upstream latency in seconds")
+    parser.add_argument("--rounds", type=int, default=3, help="Requests per in-flight slot")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    service = ArxivService()
+    service.client = FakeArxivClient(args.latency)
+
+    print(f"Upstream latency: {args.latency * 1000:.0f}ms, pool size: {service.executor._max_workers}")
+    print(f"{'in-flight':>10} {'blocking req/s':>16} {'async req/s':>14} {'speedup':>9}")
+    for level in args.levels:
+        blocking = await run_level(service, level, args.rounds, offload=False)
+        offloaded = await run_level(service, level, args.rounds, offload=True)
+        print(f"{level:>10} {blocking:>16.1f} {offloaded:>14.1f} {offloaded / blocking:>8.1f}x")
+
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
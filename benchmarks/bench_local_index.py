@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Search latency benchmark: local FTS5 mirror vs the live arXiv client
+
+Builds a throwaway mirror from the recorded metadata fixture (optionally
+replicated to grow the index), applies the OAI-PMH update fixture to
+exercise incremental ingestion, then times the same queries through
+ArxivService against the mirror and against the live path. The live path
+replays the fixture behind a client that sleeps for --live-latency; pass
+--live to measure export.arxiv.org itself instead.
+
+Usage: python benchmarks/bench_local_index.py --copies 2000 --live-latency 1.0
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from arxiv_service import ArxivService
+from local_index import LocalArxivIndex, base_id
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+QUERIES = [
+    "attention transformer",
+    "graph convolutional networks",
+    "stochastic optimization",
+    "au:Kingma",
+    "ti:generative adversarial",
+    "cat:cs.CV residual",
+    "retrieval augmented generation",
+    "word representations vector space",
+]
+
+
+class ReplayArxivClient:
+    """Stand-in for arxiv.Client answering from recorded records after a fixed delay"""
+
+    def __init__(self, records, latency: float):
+        self.records = records
+        self.latency = latency
+
+    def results(self, search):
+        time.sleep(self.latency)
+        if search.id_list:
+            wanted = {base_id(paper_id) for paper_id in search.id_list}
+            matches = [r for r in self.records if base_id(r["id"]) in wanted]
+        else:
+            terms = [t.split(":")[-1].lower() for t in search.query.split()]
+            matches = [
+                r for r in self.records
+                if any(t in f"{r['title']} {r['abstract']} {' '.join(r['authors'])}".lower() for t in terms)
+            ]
+        # arxiv.Search defaults max_results to inf, e.g. for id_list lookups
+        limit = None if search.max_results is None or math.isinf(search.max_results) else int(search.max_results)
+        for record in matches[:limit]:
+            yield SimpleNamespace(
+                entry_id=f"http://arxiv.org/abs/{record['id']}",
+                title=record["title"],
+                authors=[SimpleNamespace(name=name) for name in record["authors"]],
+                summary=record["abstract"],
+                published=datetime.fromisoformat(record["published"]),
+                pdf_url=record["pdf_url"],
+                categories=record["categories"]
+            )
+
+
+def replicate(records, copies):
+    """The fixture records plus renumbered copies, to benchmark a larger index"""
+    for copy in range(copies):
+        for n, record in enumerate(records):
+            paper_id = record["id"] if copy == 0 else f"{9000 + copy // 10000:04d}.{copy % 10000:04d}{n:02d}v1"
+            yield {**record, "id": paper_id}
+
+
+def time_queries(service: ArxivService, queries, max_results: int):
+    """Per-query latencies in ms, bypassing the query cache"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        service._fetch_search(query, max_results)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{label:<6} n={len(ordered):<4} mean {statistics.mean(ordered):9.2f} ms   p50 {statistics.median(ordered):9.2f} ms   "
+          f"p95 {p95:9.2f} ms")
+    return statistics.median(ordered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=1000, help="Times to replicate the fixture into the index")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the query set")
+    parser.add_argument("--max-results", type=int, default=10)
+    parser.add_argument("--live-latency", type=float, default=1.0,
+                        help="Seconds the replayed live client sleeps per search")
+    parser.add_argument("--live", action="store_true", help="Query export.arxiv.org instead of replaying")
+    args = parser.parse_args()
+
+    records = list(LocalArxivIndex._read_json(os.path.join(FIXTURES, "arxiv_metadata_sample.jsonl")))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LocalArxivIndex(os.path.join(tmp, "arxiv.db"))
+        start = time.perf_counter()
+        count = index.ingest_records(replicate(records, args.copies))
+        elapsed = time.perf_counter() - start
+        print(f"📥 Ingested {count} records in {elapsed:.2f}s ({count / elapsed:,.0f} records/s)")
+
+        start = time.perf_counter()
+        updated = index.ingest_file(os.path.join(FIXTURES, "oai_pmh_update_sample.xml"))
+        print(f"🔄 Incremental OAI-PMH update: {updated} upserted in {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"{json.dumps(index.stats())}")
+
+        local = ArxivService()
+        local.local_index = index
+        live = ArxivService()
+        if not args.live:
+            live.client = ReplayArxivClient(records, args.live_latency)
+
+        # The live path runs one pass (three queries against arXiv, which throttles clients)
+        print(f"\nmax_results={args.max_results}")
+        local_p50 = report("local", time_queries(local, QUERIES * args.rounds, args.max_results))
+        live_p50 = report("live", time_queries(live, QUERIES[:3] if args.live else QUERIES, args.max_results))
+        print(f"\n⚡ Local mirror p50 is {live_p50 / local_p50:,.0f}x faster")
+
+        local.shutdown()
+        live.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Time to first result and memory per request, /api/papers vs /api/papers/stream
+
+Serves the real app with uvicorn on a local port (in a thread, so streamed
+bytes really cross a socket) with arXiv replaced by the recorded fixture.
+The replayed arXiv API pays its latency once per page of results, like the
+arxiv client fetching pages of --page-size, so larger limits take several
+round trips. For each endpoint it reports:
+  - time to first result: for /api/papers the whole body, for the stream
+    the first complete paper line
+  - total time to the last byte
+  - peak traced allocations per request (tracemalloc, separate pass)
+
+Each request uses a distinct query so every one is a cache miss.
+
+    python benchmarks/bench_search_stream.py --limit 50 --page-size 10 --arxiv-latency 0.2
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_api import QUERIES, configure_environment
+
+ENDPOINTS = ["/api/papers", "/api/papers/stream"]
+
+
+class PagedReplayArxivClient:
+    """Wraps a replay client, paying the latency before each page of page_size results"""
+
+    def __init__(self, client, latency: float, page_size: int):
+        self.client = client
+        self.page_latency = latency
+        self.page_size = page_size
+
+    def results(self, search):
+        for n, result in enumerate(self.client.results(search)):
+            if n % self.page_size == 0:
+                time.sleep(self.page_latency)
+            yield result
+
+
+def serve(port: int):
+    import uvicorn
+    import main
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    return server, thread
+
+
+def fetch(client: httpx.Client, endpoint: str, query: str, limit: int):
+    """(ms to first result, ms to last byte), consuming the body without keeping it"""
+    params = {"q": query, "limit": limit, "rerank": "false"}
+    start = time.perf_counter()
+    first = None
+    with client.stream("GET", endpoint, params=params) as response:
+        response.raise_for_status()
+        if endpoint.endswith("/stream"):
+            for line in response.iter_lines():
+                if first is None and line.startswith('{"type":"paper"'):
+                    first = time.perf_counter()
+        else:
+            for _ in response.iter_bytes():
+                pass
+    end = time.perf_counter()
+    return ((first or end) - start) * 1000, (end - start) * 1000
+
+
+def measure(client: httpx.Client, endpoint: str, limit: int, count: int, tag: str) -> dict:
+    first, total, peaks = [], [], []
+    for n in range(count):
+        query = f"{QUERIES[n % len(QUERIES)]} {tag}{n}"
+        first_ms, total_ms = fetch(client, endpoint, query, limit)
+        first.append(first_ms)
+        total.append(total_ms)
+
+    tracemalloc.start()
+    for n in range(count):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fetch(client, endpoint, f"{QUERIES[n % len(QUERIES)]} {tag}mem{n}", limit)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return {
+        "first_ms": statistics.median(first),
+        "total_ms": statistics.median(total),
+        "peak_kb": statistics.median(peaks) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=50, help="Results per search")
+    parser.add_argument("--page-size", type=int, default=10, help="Results per replayed arXiv page")
+    parser.add_argument("--arxiv-latency", type=float, default=0.2, help="Seconds per replayed arXiv page")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per endpoint and pass")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Search only: prefetch and RAG would download real PDFs for every result.
+        # Settings load on first import of the app modules, so nothing imports them before this.
+        os.environ["PREFETCH_ENABLED"] = "false"
+        os.environ["RAG_ENABLED"] = "false"
+        configure_environment(tmp)
+        from bench_local_index import FIXTURES, ReplayArxivClient, replicate
+        from load_test import free_port, wait_until_live
+        from local_index import LocalArxivIndex
+
+        records = list(LocalArxivIndex._read_json(os.path.join(FIXTURES, "arxiv_metadata_sample.jsonl")))
+        records = list(replicate(records, 20))
+
+        port = free_port()
+        server, thread = serve(port)
+        url = f"http://127.0.0.1:{port}"
+        wait_until_live(url)
+        logging.getLogger().setLevel(logging.WARNING)
+
+        import main as app_main
+        app_main.arxiv_service.client = PagedReplayArxivClient(
+            ReplayArxivClient(records, 0.0), args.arxiv_latency, args.page_size
+        )
+
+        print(f"limit {args.limit}, arXiv page of {args.page_size} every {args.arxiv_latency * 1000:.0f} ms, "
+              f"{args.requests} requests per endpoint")
+        print(f"{'endpoint':<20} {'first result':>14} {'total':>12} {'peak alloc':>12}")
+        try:
+            with httpx.Client(base_url=url, timeout=60) as client:
+                for n, endpoint in enumerate(ENDPOINTS):
+                    result = measure(client, endpoint, args.limit, args.requests, f"run{n}x")
+                    print(f"{endpoint:<20} {result['first_ms']:11.1f} ms {result['total_ms']:9.1f} ms "
+                          f"{result['peak_kb']:9.1f} KB")
+        finally:
+            server.should_exit = True
+            thread.join(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Paper encode time and per-record memory, dicts vs PaperRecord
+
+Uses the recorded fixture, replicated to fill a page. Reports:
+  - encode time for one page of results, FastAPI's default path
+    (jsonable_encoder + JSONResponse) on dicts vs ORJSONResponse on records
+  - bytes a cache entry for one paper is sized at (json.dumps vs orjson)
+  - traced memory per paper held as a dict vs as a PaperRecord
+
+    python benchmarks/bench_serialization.py --page 50 --repeat 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+import orjson
+
+from bench_local_index import FIXTURES, replicate
+from local_index import LocalArxivIndex
+from models import PAPER_FIELDS, PaperRecord
+
+
+def paper_dicts(records):
+    return [{name: record[name] for name in PAPER_FIELDS} for record in records]
+
+
+def per_call_us(func, repeat: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+
+def per_object_bytes(build, count: int) -> float:
+    """Traced bytes per object for `count` objects built from scratch"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=50, help="Papers per encoded page")
+    parser.add_argument("--repeat", type=int, default=200, help="Encodes per measurement")
+    parser.add_argument("--objects", type=int, default=10000, help="Papers held for the memory measurement")
+    args = parser.parse_args()
+
+    fixture = list(LocalArxivIndex._read_json(os.path.join(FIXTURES, "arxiv_metadata_sample.jsonl")))
+    copies = args.objects // len(fixture) + 1
+    raw = list(replicate(fixture, copies))[:args.objects]
+    dicts = paper_dicts(raw)
+    records = [PaperRecord.from_dict(paper) for paper in dicts]
+
+    dict_page = {"papers": dicts[:args.page], "count": args.page}
+    record_page = {"papers": records[:args.page], "count": args.page}
+    default_us = per_call_us(lambda: JSONResponse(jsonable_encoder(dict_page)), args.repeat)
+    orjson_us = per_call_us(lambda: ORJSONResponse(record_page), args.repeat)
+    print(f"encode {args.page}-paper page   default {default_us:9.1f} us   orjson+records {orjson_us:8.1f} us "
+          f"({default_us / orjson_us:.1f}x)")
+
+    json_bytes = sum(len(json.dumps(paper)) for paper in dicts) / len(dicts)
+    orjson_bytes = sum(len(orjson.dumps(record)) for record in records) / len(records)
+    print(f"cache entry per paper     json    {json_bytes:9.0f} B    orjson         {orjson_bytes:8.0f} B")
+
+    # Build from JSON text, as the services do, so strings are not shared between the two measurements
+    encoded = [json.dumps(paper) for paper in dicts]
+    dict_bytes = per_object_bytes(lambda: [json.loads(text) for text in encoded], len(encoded))
+    record_bytes = per_object_bytes(lambda: [PaperRecord.from_dict(json.loads(text)) for text in encoded],
+                                    len(encoded))
+    print(f"memory per paper          dict    {dict_bytes:9.0f} B    PaperRecord    {record_bytes:8.0f} B "
+          f"({1 - record_bytes / dict_bytes:.0%} less)")
+
+
+if __name__ == "__main__":
+    main()
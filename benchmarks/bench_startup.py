@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Import time and cold-start benchmark, usable as a regression check
+
+Measures, each in a fresh interpreter:
+  - `import main` wall time, and the slowest modules from `python -X importtime`
+  - the provider packages that must stay off the startup path
+    (langchain_groq, langchain_google_genai, arxiv) and what importing them costs
+  - time from spawning start.py to the first 200 from /api/health/live and /api/health
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --max-import-ms 1500 --max-startup-ms 4000
+
+Exits non-zero when a deferred package is imported eagerly or a threshold is exceeded.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use or by the background warm-up, never by `import main`
+DEFERRED_MODULES = ["langchain_groq", "langchain_google_genai", "arxiv"]
+
+
+def app_env(**extra) -> dict:
+    """Offline configuration; dummy keys so both LLM providers are configured as in production"""
+    return {
+        **os.environ,
+        "PYTHONPATH": os.path.join(ROOT, "src"),
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "bench-dummy-key"),
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "bench-dummy-key"),
+        "HEALTH_PROBE_INTERVAL": "3600",
+        **extra
+    }
+
+
+def import_main():
+    """Import main in a fresh interpreter; return (wall ms, importtime rows as (cumulative us, module))"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=app_env(), capture_output=True, text=True, check=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        rows.append((int(cumulative), module.rstrip()))
+    return wall_ms, rows
+
+
+def deferred_import_ms() -> float:
+    """What importing the deferred packages costs, i.e. what eager imports would add to startup"""
+    code = (
+        "import time; start = time.perf_counter(); "
+        + "; ".join(f"import {name}" for name in DEFERRED_MODULES)
+        + "; print((time.perf_counter() - start) * 1000)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    return float(result.stdout) if result.returncode == 0 else float("nan")
+
+
+def cold_start(path: str, timeout: float = 60):
+    """Spawn start.py and return ms until `path` first answers 200"""
+    from load_test import free_port
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "start.py")],
+        env=app_env(PORT=str(port)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(url, timeout=1).status_code == 200:
+                    return (time.perf_counter() - start) * 1000
+            except httpx.HTTPError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"start.py exited with code {process.returncode}")
+            time.sleep(0.01)
+        raise RuntimeError(f"{path} did not answer within {timeout:.0f}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per measurement (median is used)")
+    parser.add_argument("--top", type=int, default=8, help="Slowest top-level imports to list")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if `import main` takes longer")
+    parser.add_argument("--max-startup-ms", type=float, help="Fail if /api/health takes longer to answer")
+    args = parser.parse_args()
+
+    failures = []
+
+    imports = [import_main() for _ in range(args.runs)]
+    import_ms = statistics.median(wall_ms for wall_ms, _ in imports)
+    rows = imports[-1][1]
+    print(f"import main       {import_ms:8.0f} ms  (median of {args.runs})")
+    # Modules one level below the top (imported by main or by site) have exactly three leading spaces
+    top_level = sorted((row for row in rows if row[1].startswith("   ") and not row[1].startswith("    ")),
+                       reverse=True)[:args.top]
+    for cumulative, module in top_level:
+        print(f"  {module.strip():<28} {cumulative / 1000:8.1f} ms")
+
+    imported = {module.strip() for _, module in rows}
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+    print(f"deferred packages {deferred_import_ms():8.0f} ms  ({', '.join(DEFERRED_MODULES)})")
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+
+    for path in ("/api/health/live", "/api/health"):
+        startup_ms = statistics.median(cold_start(path) for _ in range(args.runs))
+        print(f"first 200 {path:<18} {startup_ms:6.0f} ms  (spawn to response)")
+
+    if args.max_import_ms and import_ms > args.max_import_ms:
+        failures.append(f"import main took {import_ms:.0f} ms (max {args.max_import_ms:.0f})")
+    if args.max_startup_ms and startup_ms > args.max_startup_ms:
+        failures.append(f"/api/health answered after {startup_ms:.0f} ms (max {args.max_startup_ms:.0f})")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for a running ArxivChat server, or for freshly spawned ones
+
+Against an existing deployment:
+    python benchmarks/load_test.py --url http://localhost:8080 --concurrency 32 --duration 15
+
+To show how throughput scales with workers, --spawn starts start.py in
+production mode once per worker count, backed by an offline mirror built
+from the recorded fixture so no network or API keys are needed:
+    python benchmarks/load_test.py --spawn 1 2 4 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import cycle
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+QUERIES = [
+    "attention transformer",
+    "graph convolutional networks",
+    "stochastic optimization",
+    "language models few shot",
+    "generative adversarial",
+    "residual learning image recognition",
+    "retrieval augmented generation",
+    "word representations",
+]
+
+
+async def run_load(url: str, concurrency: int, duration: float, paths):
+    """Keep `concurrency` requests in flight for `duration` seconds; return latencies and errors"""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    next_path = cycle(paths)
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(next(next_path))
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def report(label: str, latencies, errors: int, duration: float) -> float:
+    if not latencies:
+        print(f"{label:<12} no successful requests ({errors} errors)")
+        return 0.0
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    throughput = len(ordered) / duration
+    print(f"{label:<12} {throughput:8.1f} req/s   p50 {statistics.median(ordered) * 1000:7.1f} ms   "
+          f"p95 {p95 * 1000:7.1f} ms   errors {errors}")
+    return throughput
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_live(url: str, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/api/health/live", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server at {url} did not become live within {timeout:.0f}s")
+
+
+def spawn_server(workers: int, tmp: str, index_path: str):
+    """Start start.py in production mode with an offline, shared-cache configuration"""
+    port = free_port()
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "SERVER_MODE": "production",
+        "WEB_CONCURRENCY": str(workers),
+        "CACHE_BACKEND": "sqlite",
+        "CACHE_SQLITE_PATH": os.path.join(tmp, f"cache-{workers}.db"),
+        "ARXIV_BACKEND": "local",
+        "ARXIV_LOCAL_INDEX_PATH": index_path,
+        "RAG_ENABLED": "false",
+        "HEALTH_PROBE_INTERVAL": "3600",
+    }
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "start.py")],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_live(url)
+    except Exception:
+        process.terminate()
+        raise
+    return process, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8080", help="Server to load when not spawning")
+    parser.add_argument("--spawn", type=int, nargs="+", metavar="WORKERS",
+                        help="Spawn a local server per worker count and compare them")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--limit", type=int, default=10, help="Results per search")
+    args = parser.parse_args()
+
+    paths = [f"/api/papers?q={query.replace(' ', '+')}&limit={args.limit}" for query in QUERIES]
+
+    if not args.spawn:
+        latencies, errors = asyncio.run(run_load(args.url, args.concurrency, args.duration, paths))
+        report(args.url, latencies, errors, args.duration)
+        return
+
+    from bench_local_index import FIXTURES, replicate
+    from local_index import LocalArxivIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "arxiv.db")
+        index = LocalArxivIndex(index_path)
+        records = list(index._read_json(os.path.join(FIXTURES, "arxiv_metadata_sample.jsonl")))
+        index.ingest_records(replicate(records, 500))
+
+        print(f"{args.concurrency} concurrent clients, {args.duration:.0f}s per run, {os.cpu_count()} CPUs")
+        baseline = None
+        for workers in args.spawn:
+            process, url = spawn_server(workers, tmp, index_path)
+            try:
+                latencies, errors = asyncio.run(run_load(url, args.concurrency, args.duration, paths))
+                throughput = report(f"{workers} worker{'s' if workers > 1 else ''}", latencies, errors, args.duration)
+                baseline = baseline or throughput
+                if baseline:
+                    print(f"{'':<12} {throughput / baseline:.2f}x the first run")
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
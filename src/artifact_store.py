@@ -0,0 +1,238 @@
+"""
+Persistent per-paper artifacts: a structured summary, key contributions and
+suggested follow-up questions, generated once per paper version
+
+Artifacts are generated lazily by GET /api/papers/{id}/summary, or ahead of
+time in a batch job:
+    python src/artifact_store.py generate 1706.03762 1810.04805 --db data/artifacts.db
+    python src/artifact_store.py generate --file ids.txt --concurrency 4
+    python src/artifact_store.py show 1706.03762
+    python src/artifact_store.py status
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Awaitable, Callable, List, Optional
+from local_index import base_id
+
+logger = logging.getLogger(__name__)
+
+def paper_version(paper_id: str) -> str:
+    """Version suffix of an arXiv ID ("v3"), or "" when the ID carries none"""
+    match = re.search(r"v\d+$", paper_id)
+    return match.group(0) if match else ""
+
+def parse_artifacts(text: str) -> Optional[dict]:
+    """Pull the artifact fields out of a model response, tolerating code fences and chatter"""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+
+    summary = data.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        return None
+
+    def strings(value) -> List[str]:
+        return [" ".join(item.split()) for item in value if isinstance(item, str) and item.strip()] \
+            if isinstance(value, list) else []
+
+    return {
+        "summary": " ".join(summary.split()),
+        "contributions": strings(data.get("contributions")),
+        "questions": strings(data.get("questions"))
+    }
+
+class ArtifactStore:
+    """SQLite table of generated artifacts keyed by (base arXiv ID, version)
+
+    A new arXiv version gets fresh artifacts while the old version's rows
+    stay valid for anyone still chatting about it. Concurrent requests for
+    the same missing paper share one generation instead of each paying for
+    an LLM call.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS artifacts (
+                base_id TEXT NOT NULL,
+                version TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                contributions TEXT NOT NULL,
+                questions TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (base_id, version)
+            );
+        """)
+        self._conn.commit()
+        self._inflight = {}  # (base_id, version) -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failed = 0
+
+    @staticmethod
+    def _key(paper_id: str):
+        return base_id(paper_id), paper_version(paper_id)
+
+    def get(self, paper_id: str, record: bool = True) -> Optional[dict]:
+        """Stored artifacts for this paper version (the newest stored one for an unversioned ID)"""
+        paper_base, version = self._key(paper_id)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, contributions, questions, provider, created_at, version FROM artifacts "
+                "WHERE base_id = ? AND (version = ? OR ? = '') ORDER BY created_at DESC LIMIT 1",
+                (paper_base, version, version)
+            ).fetchone()
+        if record:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not row:
+            return None
+        return {
+            "paper_id": paper_base + row[5],
+            "summary": row[0],
+            "contributions": json.loads(row[1]),
+            "questions": json.loads(row[2]),
+            "provider": row[3],
+            "created_at": row[4]
+        }
+
+    def put(self, paper_id: str, artifacts: dict, provider: str = "") -> dict:
+        created_at = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*self._key(paper_id), artifacts["summary"], json.dumps(artifacts["contributions"]),
+                 json.dumps(artifacts["questions"]), provider, created_at)
+            )
+            self._conn.commit()
+        return {"paper_id": paper_id, **artifacts, "provider": provider, "created_at": created_at}
+
+    async def aget_or_generate(self, paper: dict,
+                               generate: Callable[[dict], Awaitable[Optional[tuple]]]) -> Optional[dict]:
+        """Return stored artifacts, generating them at most once per version if missing
+
+        `generate` returns (artifacts, provider), or None when the model's
+        output could not be used, in which case nothing is stored.
+        """
+        stored = self.get(paper["id"])
+        if stored:
+            return stored
+
+        key = self._key(paper["id"])
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate(paper, generate))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller giving up doesn't cancel the generation others are waiting on
+        return await asyncio.shield(task)
+
+    async def _generate(self, paper: dict, generate) -> Optional[dict]:
+        try:
+            result = await generate(paper)
+        except Exception as e:
+            logger.warning(f"⚠️ Artifact generation failed for {paper['id']}: {e}")
+            result = None
+        if not result:
+            self.failed += 1
+            return None
+        artifacts, provider = result
+        self.generated += 1
+        return self.put(paper["id"], artifacts, provider)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+        return {
+            "papers": count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "failed": self.failed,
+            "generating": len(self._inflight),
+            "path": self.path
+        }
+
+
+async def generate_batch(store: ArtifactStore, paper_ids: List[str], concurrency: int, force: bool):
+    """Generate artifacts for many papers, looking them up in one batched arXiv request"""
+    from arxiv_service import ArxivService
+    from llm_service import LLMService
+
+    arxiv_service = ArxivService()
+    llm_service = LLMService()
+    if not llm_service.router.providers:
+        sys.exit("No LLM provider configured; set GOOGLE_API_KEY or GROQ_API_KEY")
+
+    papers = await arxiv_service.aget_papers_by_ids(paper_ids)
+    found = {base_id(paper["id"]) for paper in papers}
+    for paper_id in paper_ids:
+        if base_id(paper_id) not in found:
+            print(f"❓ {paper_id}: not found")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(paper: dict):
+        if not force and store.get(paper["id"], record=False):
+            print(f"✅ {paper['id']}: already stored")
+            return
+        async with semaphore:
+            start = time.perf_counter()
+            result = await store._generate(paper, llm_service.agenerate_artifacts)
+        status = "💾" if result else "❌"
+        print(f"{status} {paper['id']}: {time.perf_counter() - start:.1f}s")
+
+    await asyncio.gather(*(run(paper) for paper in papers))
+    arxiv_service.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage generated per-paper artifacts")
+    parser.add_argument("command", choices=["generate", "show", "status"])
+    parser.add_argument("ids", nargs="*", help="arXiv IDs (latest version unless one is given)")
+    parser.add_argument("--file", help="File with one arXiv ID per line")
+    parser.add_argument("--db", default=os.getenv("ARTIFACT_STORE_PATH", "data/artifacts.db"))
+    parser.add_argument("--concurrency", type=int, default=2, help="LLM calls in flight")
+    parser.add_argument("--force", action="store_true", help="Regenerate artifacts that already exist")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    store = ArtifactStore(args.db)
+    ids = list(args.ids)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            ids += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    if args.command == "generate":
+        asyncio.run(generate_batch(store, list(dict.fromkeys(ids)), args.concurrency, args.force))
+        print(f"📊 {store.stats()}")
+    elif args.command == "show":
+        for paper_id in ids:
+            print(json.dumps(store.get(paper_id, record=False), indent=2))
+    else:
+        print(f"📊 {store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,348 @@
 """
 Simple ArXiv service for fetching papers
 """
-import arxiv
-from typing import List
-from models import Paper
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+import deadline
+from cache import AsyncSingleFlight, SingleFlight, build_cache
+from config import settings
+from local_index import LocalArxivIndex, base_id
+from metrics import timed_stage
+from models import PaperRecord
 
 class ArxivService:
+    # IDs per id_list request, keeping the query URL well under arXiv's limits
+    ID_BATCH_SIZE = 100
+    
     def __init__(self):
-        self.client = arxiv.Client()
+        # Built on first use: the local backend may never need the arxiv package at all
+        self._client = None
+        # The arxiv client is blocking, so async callers run it on a bounded pool
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.ARXIV_MAX_WORKERS,
+            thread_name_prefix="arxiv"
+        )
+        self.paper_cache = build_cache(
+            "papers",
+            ttl=settings.PAPER_CACHE_TTL,
+            max_entries=settings.PAPER_CACHE_MAX_ENTRIES,
+            max_bytes=settings.PAPER_CACHE_MAX_BYTES,
+            path=settings.PAPER_CACHE_PATH
+        )
+        self.query_cache = build_cache(
+            "queries",
+            ttl=settings.QUERY_CACHE_TTL,
+            max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+            max_bytes=settings.QUERY_CACHE_MAX_BYTES,
+            path=settings.QUERY_CACHE_PATH
+        )
+        self.search_flight = SingleFlight()
+        # Async callers coalesce before the executor hop, so followers don't hold pool threads
+        self.async_search_flight = AsyncSingleFlight()
+        # Optional offline mirror that answers searches without touching arXiv
+        self.local_index = None
+        if settings.ARXIV_BACKEND == "local":
+            self.local_index = LocalArxivIndex(settings.ARXIV_LOCAL_INDEX_PATH)
+    
+    @property
+    def client(self):
+        if self._client is None:
+            import arxiv
+            self._client = arxiv.Client()
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    def search_papers(self, query: str, max_results: int = 10) -> List[PaperRecord]:
+        """Search for papers on ArXiv, served from the query cache when possible"""
+        papers = self._cached_search(query, max_results)
+        if papers is not None:
+            return papers
+        return self._search_uncached(query, max_results)
+    
+    def _cached_search(self, query: str, max_results: int, record: bool = True) -> Optional[List[PaperRecord]]:
+        """Return cached results for the query, slicing a larger cached page if needed"""
+        entry = self.query_cache.get(self._normalize_query(query), record=record)
+        if entry is None:
+            return None
+        # A larger cached page, or one arXiv could not fill, answers any smaller limit
+        if entry["max_results"] >= max_results or len(entry["papers"]) < entry["max_results"]:
+            # Persistent backends hand back decoded dicts
+            return [PaperRecord.coerce(paper) for paper in entry["papers"][:max_results]]
+        return None
+    
+    def _cached_paper(self, paper_id: str, record: bool = True) -> Optional[PaperRecord]:
+        cached = self.paper_cache.get(paper_id, record=record)
+        return PaperRecord.coerce(cached) if cached is not None else None
+    
+    def cached_papers(self, query: str, max_results: int) -> List[PaperRecord]:
+        """Whatever the query cache holds for a query, even a page smaller than asked for
+        
+        Used as a degraded answer when a live search runs out of time.
+        """
+        entry = self.query_cache.get(self._normalize_query(query), record=False)
+        if entry is None:
+            return []
+        return [PaperRecord.coerce(paper) for paper in entry["papers"][:max_results]]
+    
+    def cached_papers_by_ids(self, paper_ids: List[str]) -> List[PaperRecord]:
+        """The requested papers already in the paper cache, in request order"""
+        papers = (self._cached_paper(paper_id, record=False) for paper_id in dict.fromkeys(paper_ids))
+        return [paper for paper in papers if paper is not None]
+    
+    def _search_uncached(self, query: str, max_results: int) -> List[PaperRecord]:
+        """Fetch from arXiv, coalescing identical in-flight searches into one request"""
+        # An identical search may have finished while this one was queued
+        papers = self._cached_search(query, max_results, record=False)
+        if papers is not None:
+            return papers
+        
+        return self.search_flight.do(self._flight_key(query, max_results), self._fetch_search, query, max_results)
     
-    def search_papers(self, query: str, max_results: int = 10) -> List[dict]:
-        """Search for papers on ArXiv"""
+    @timed_stage("arxiv_search")
+    def _fetch_search(self, query: str, max_results: int) -> List[PaperRecord]:
+        """Run the search against arXiv (or the local mirror) and fill the query and paper caches"""
         try:
-            search = arxiv.Search(
-                query=query,
-                max_results=max_results,
-                sort_by=arxiv.SortCriterion.Relevance
-            )
+            start_time = time.perf_counter()
+            if self.local_index is not None:
+                papers = self.local_index.search(query, max_results)
+            else:
+                papers = list(self._live_results(query, max_results))
+            for paper in papers:
+                self.paper_cache.set(paper["id"], paper)
             
+            self.query_cache.record_load(time.perf_counter() - start_time)
+            self.query_cache.set(
+                self._normalize_query(query),
+                {"max_results": max_results, "papers": papers}
+            )
+            return papers
+        except deadline.DeadlineExceeded:
+            # Searches coalesced onto this one see the timeout too, not a generic upstream error
+            raise
+        except Exception as e:
+            raise Exception(f"Error searching ArXiv: {str(e)}")
+    
+    def _live_results(self, query: str, max_results: int) -> Iterator[PaperRecord]:
+        """Papers from the arXiv API, converted one by one as the client's pages are parsed"""
+        import arxiv
+        search = arxiv.Search(
+            query=" ".join(query.split()),
+            max_results=max_results,
+            sort_by=arxiv.SortCriterion.Relevance
+        )
+        for result in self.client.results(search):
+            # Iterating fetches the next page lazily, so stop before one a timed-out request would waste
+            deadline.check("the next arXiv result")
+            yield self._to_paper(result)
+    
+    def iter_papers(self, query: str, max_results: int = 10) -> Iterator[PaperRecord]:
+        """Search lazily, yielding each paper as soon as it is available
+        
+        Cached and local-mirror results are complete up front. Live results
+        are yielded as the arXiv client parses them and only cached once the
+        search finishes, so an abandoned stream never stores a partial page.
+        """
+        papers = self._cached_search(query, max_results)
+        if papers is not None:
+            yield from papers
+            return
+        yield from self._iter_uncached(query, max_results)
+    
+    def _iter_uncached(self, query: str, max_results: int) -> Iterator[PaperRecord]:
+        if self.local_index is not None:
+            yield from self._search_uncached(query, max_results)
+            return
+        
+        try:
+            start_time = time.perf_counter()
             papers = []
-            for result in self.client.results(search):
-                paper = {
-                    "id": result.entry_id.split('/')[-1],
-                    "title": result.title,
-                    "authors": [author.name for author in result.authors],
-                    "abstract": result.summary,
-                    "published": result.published.isoformat(),
-                    "pdf_url": result.pdf_url,
-                    "categories": [cat for cat in result.categories]
-                }
+            for paper in self._live_results(query, max_results):
+                self.paper_cache.set(paper["id"], paper)
                 papers.append(paper)
-            
-            return papers
+                yield paper
+            self.query_cache.record_load(time.perf_counter() - start_time)
+            self.query_cache.set(
+                self._normalize_query(query),
+                {"max_results": max_results, "papers": papers}
+            )
+        except deadline.DeadlineExceeded:
+            raise
         except Exception as e:
             raise Exception(f"Error searching ArXiv: {str(e)}")
     
-    def get_paper_by_id(self, paper_id: str) -> dict:
-        """Get a specific paper by ID"""
+    def get_paper_by_id(self, paper_id: str) -> PaperRecord:
+        """Get a specific paper by ID, reading through the paper cache"""
+        cached = self._cached_paper(paper_id)
+        if cached is not None:
+            return cached
+        return self._fetch_paper(paper_id)
+    
+    @timed_stage("arxiv_fetch")
+    def _fetch_paper(self, paper_id: str) -> PaperRecord:
+        """Fetch a paper from the local mirror or arXiv and store it in the paper cache"""
+        if self.local_index is not None:
+            paper = self.local_index.get(paper_id)
+            if paper is not None:
+                self.paper_cache.set(paper_id, paper)
+                return paper
+        
+        # Papers missing from the mirror still fall through to arXiv
         try:
+            import arxiv
+            start_time = time.perf_counter()
             search = arxiv.Search(id_list=[paper_id])
-            result = next(self.client.results(search))
-            
-            return {
-                "id": result.entry_id.split('/')[-1],
-                "title": result.title,
-                "authors": [author.name for author in result.authors],
-                "abstract": result.summary,
-                "published": result.published.isoformat(),
-                "pdf_url": result.pdf_url,
-                "categories": [cat for cat in result.categories]
-            }
+            paper = self._to_paper(next(self.client.results(search)))
+            self.paper_cache.record_load(time.perf_counter() - start_time)
+            self.paper_cache.set(paper_id, paper)
+            return paper
         except Exception as e:
             raise Exception(f"Error fetching paper: {str(e)}")
+    
+    def get_papers_by_ids(self, paper_ids: List[str]) -> List[PaperRecord]:
+        """Get several papers, fetching every cache miss in one arXiv request
+        
+        Papers come back in request order; IDs arXiv does not know are left out.
+        """
+        papers = {}
+        misses = []
+        for paper_id in dict.fromkeys(paper_ids):
+            cached = self._cached_paper(paper_id)
+            if cached is not None:
+                papers[paper_id] = cached
+            else:
+                misses.append(paper_id)
+        if misses:
+            papers.update(self._fetch_papers(misses))
+        return [papers[paper_id] for paper_id in dict.fromkeys(paper_ids) if paper_id in papers]
+    
+    @timed_stage("arxiv_fetch_batch")
+    def _fetch_papers(self, paper_ids: List[str]) -> Dict[str, PaperRecord]:
+        """Fetch papers by ID with one id_list request per batch, keyed by the requested ID"""
+        found = {}
+        if self.local_index is not None:
+            for paper_id in paper_ids:
+                paper = self.local_index.get(paper_id)
+                if paper is not None:
+                    found[paper_id] = paper
+                    self.paper_cache.set(paper_id, paper)
+            paper_ids = [paper_id for paper_id in paper_ids if paper_id not in found]
+        
+        try:
+            for i in range(0, len(paper_ids), self.ID_BATCH_SIZE):
+                deadline.check("the next arXiv ID batch")
+                import arxiv
+                batch = paper_ids[i:i + self.ID_BATCH_SIZE]
+                # arXiv answers with versioned IDs, so map them back to what was asked for
+                requested = {base_id(paper_id): paper_id for paper_id in batch}
+                start_time = time.perf_counter()
+                search = arxiv.Search(id_list=batch, max_results=len(batch))
+                results = list(self.client.results(search))
+                if results:
+                    self.paper_cache.record_load((time.perf_counter() - start_time) / len(results))
+                for result in results:
+                    paper = self._to_paper(result)
+                    paper_id = requested.get(base_id(paper["id"]), paper["id"])
+                    found[paper_id] = paper
+                    self.paper_cache.set(paper_id, paper)
+            return found
+        except deadline.DeadlineExceeded:
+            raise
+        except Exception as e:
+            raise Exception(f"Error fetching papers: {str(e)}")
+    
+    def ping(self):
+        """Minimal live request to arXiv, bypassing the caches, for health probing"""
+        if self.local_index is not None:
+            self.local_index.stats()
+            return
+        import arxiv
+        search = arxiv.Search(query="machine learning", max_results=1)
+        next(self.client.results(search))
+    
+    async def aping(self):
+        await self._run_in_executor(self.ping)
+    
+    async def asearch_papers(self, query: str, max_results: int = 10) -> List[PaperRecord]:
+        """Search for papers without blocking the event loop"""
+        papers = self._cached_search(query, max_results)
+        if papers is not None:
+            return papers
+        return await self.async_search_flight.do(
+            self._flight_key(query, max_results), self._run_in_executor, self._search_uncached, query, max_results
+        )
+    
+    async def aiter_papers(self, query: str, max_results: int = 10) -> AsyncIterator[PaperRecord]:
+        """iter_papers without blocking the event loop: each next paper is pulled on the service pool"""
+        cached = self._cached_search(query, max_results)
+        if cached is not None:
+            for paper in cached:
+                yield paper
+            return
+        
+        papers = self._iter_uncached(query, max_results)
+        finished = object()
+        while True:
+            paper = await self._run_in_executor(next, papers, finished)
+            if paper is finished:
+                return
+            yield paper
+    
+    async def aget_paper_by_id(self, paper_id: str) -> PaperRecord:
+        """Get a specific paper by ID without blocking the event loop"""
+        cached = self._cached_paper(paper_id)
+        if cached is not None:
+            return cached
+        return await self._run_in_executor(self._fetch_paper, paper_id)
+    
+    async def aget_papers_by_ids(self, paper_ids: List[str]) -> List[PaperRecord]:
+        """Get several papers without blocking the event loop"""
+        return await self._run_in_executor(self.get_papers_by_ids, paper_ids)
+    
+    async def _run_in_executor(self, func, *args):
+        """Run a blocking call on the service pool, keeping the caller's context"""
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, partial(ctx.run, func, *args))
+    
+    @staticmethod
+    def _to_paper(result) -> PaperRecord:
+        """Paper record from an arxiv.Result"""
+        return PaperRecord(
+            id=result.entry_id.split('/')[-1],
+            title=result.title,
+            authors=tuple(author.name for author in result.authors),
+            abstract=result.summary,
+            published=result.published.isoformat(),
+            pdf_url=result.pdf_url,
+            categories=tuple(result.categories)
+        )
+    
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Cache key for a query: collapsed whitespace and case-folded terms, keeping boolean operators"""
+        return " ".join(
+            term if term in ("AND", "OR", "ANDNOT") else term.lower()
+            for term in query.split()
+        )
+    
+    def _flight_key(self, query: str, max_results: int) -> str:
+        return f"{self._normalize_query(query)}|{max_results}"
+    
+    def cache_stats(self) -> dict:
+        """Hit/miss counters for the service caches"""
+        coalesced = self.search_flight.coalesced + self.async_search_flight.coalesced
+        return {
+            "papers": self.paper_cache.stats(),
+            "queries": {**self.query_cache.stats(), "coalesced": coalesced}
+        }
+    
+    def shutdown(self):
+        """Release the worker threads"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
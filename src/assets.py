@@ -0,0 +1,205 @@
+"""
+Static asset bundle built at startup: minified, precompressed and content-hashed
+
+Every file in the static directory is read once, minified (CSS and JS by
+conservative whitespace and comment stripping), compressed with gzip and,
+when the optional brotli package is installed, brotli. index.html is
+rewritten to reference content-hashed URLs such as /static/script.3f9a1c2b7d4e.js,
+which are served as immutable; unhashed URLs stay valid and revalidate with
+ETags.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from typing import Dict, Optional
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip alone covers every browser
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+MIN_COMPRESS_BYTES = 512
+
+def minify_css(text: str) -> str:
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    return text.replace(";}", "}").strip()
+
+def minify_js(text: str) -> str:
+    """Drop indentation, blank lines and whole-line comments, leaving template literal contents alone
+
+    Line breaks are kept, so automatic semicolon insertion behaves exactly
+    as in the source.
+    """
+    lines = []
+    in_template = False
+    for line in text.splitlines():
+        if not in_template:
+            stripped = line.strip()
+            if stripped and not stripped.startswith("//"):
+                lines.append(stripped)
+        else:
+            lines.append(line)
+        # An odd number of unescaped backticks opens or closes a multi-line template literal
+        if len(re.findall(r"(?<!\\)`", line)) % 2:
+            in_template = not in_template
+    return "\n".join(lines)
+
+def minify_html(text: str) -> str:
+    if "<pre" in text or "<textarea" in text:
+        return text
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+MINIFIERS = {".css": minify_css, ".js": minify_js, ".html": minify_html}
+
+class Asset:
+    """One file's bytes in every encoding, with its validator"""
+
+    def __init__(self, name: str, body: bytes, content_type: str, cache_control: str):
+        self.name = name
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        self.etag = f'"{self.digest}"'
+        self.encodings = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.encodings["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.encodings["br"] = brotli.compress(body, quality=11)
+
+    @property
+    def hashed_name(self) -> str:
+        stem, ext = os.path.splitext(self.name)
+        return f"{stem}.{self.digest}{ext}"
+
+    def response(self, request: Request, immutable: bool = False) -> Response:
+        """Response for this request: 304 on a matching ETag, else the best accepted encoding"""
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": IMMUTABLE if immutable else self.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        if self.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+
+        accepted = request.headers.get("accept-encoding", "")
+        for encoding in ("br", "gzip"):
+            if encoding in self.encodings and encoding in accepted:
+                headers["Content-Encoding"] = encoding
+                return Response(self.encodings[encoding], media_type=self.content_type, headers=headers)
+        return Response(self.body, media_type=self.content_type, headers=headers)
+
+
+class AssetBundle:
+    """All static files, held in memory and addressable by plain or content-hashed name"""
+
+    def __init__(self, static_dir: str, minify: bool = True):
+        self.static_dir = static_dir
+        self.assets: Dict[str, Asset] = {}
+        self._hashed: Dict[str, Asset] = {}
+
+        for name in sorted(os.listdir(static_dir)):
+            path = os.path.join(static_dir, name)
+            if not os.path.isfile(path) or name == "index.html":
+                continue
+            self._add(name, self._read(path, minify), REVALIDATE)
+
+        # Pages are built last so they can point at the hashed asset URLs
+        html = self._read(os.path.join(static_dir, "index.html"), minify).decode("utf-8")
+        for name, asset in self.assets.items():
+            html = html.replace(f'"/static/{name}"', f'"/static/{asset.hashed_name}"')
+        self.index = Asset("index.html", html.encode("utf-8"), "text/html", REVALIDATE)
+
+        logger.info(f"📦 Asset bundle: {len(self.assets)} files, {self.stats()['bytes']} bytes"
+                    f"{' (brotli available)' if brotli else ''}")
+
+    @staticmethod
+    def _read(path: str, minify: bool) -> bytes:
+        with open(path, "rb") as f:
+            body = f.read()
+        minifier = MINIFIERS.get(os.path.splitext(path)[1]) if minify else None
+        return minifier(body.decode("utf-8")).encode("utf-8") if minifier else body
+
+    def _add(self, name: str, body: bytes, cache_control: str):
+        # Starlette appends the charset to text/* types itself
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        asset = Asset(name, body, content_type, cache_control)
+        self.assets[name] = asset
+        self._hashed[asset.hashed_name] = asset
+
+    def lookup(self, name: str):
+        """(asset, immutable) for a plain or hashed name, or (None, False)"""
+        if name in self._hashed:
+            return self._hashed[name], True
+        return self.assets.get(name), False
+
+    def stats(self) -> dict:
+        assets = [self.index, *self.assets.values()]
+        return {
+            "files": len(assets),
+            "bytes": sum(len(asset.body) for asset in assets),
+            "gzip_bytes": sum(len(asset.encodings.get("gzip", asset.body)) for asset in assets),
+            "brotli": brotli is not None
+        }
+
+
+class JSONGZipMiddleware:
+    """Gzip for API responses only
+
+    Starlette's GZipMiddleware compresses every response, which would hold
+    streamed events in the compressor buffer and re-compress precompressed
+    assets. This applies it to the listed content types only, so SSE and
+    other streaming types pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, compresslevel: int = 6,
+                 content_types: tuple = ("application/json", "text/plain")):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.content_types = content_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("accept-encoding", ""):
+            responder = _ContentTypeGZipResponder(self.app, self.minimum_size, self.compresslevel, self.content_types)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class _ContentTypeGZipResponder(GZipResponder):
+    def __init__(self, app: ASGIApp, minimum_size: int, compresslevel: int, content_types: tuple):
+        super().__init__(app, minimum_size, compresslevel=compresslevel)
+        self.content_types = content_types
+        self.passthrough = False
+
+    async def send_with_gzip(self, message: Message):
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            self.passthrough = not content_type.startswith(self.content_types)
+        if self.passthrough:
+            await self.send(message)
+            return
+        await super().send_with_gzip(message)
+
+
+def build_bundle(static_dir: str) -> Optional[AssetBundle]:
+    try:
+        return AssetBundle(static_dir)
+    except Exception as e:
+        logger.warning(f"⚠️ Asset bundle unavailable, serving static files from disk: {e}")
+        return None
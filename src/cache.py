@@ -0,0 +1,427 @@
+"""
+Small caching helpers shared by the services
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+import orjson
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class BaseCache:
+    """Common hit/miss accounting for the cache backends"""
+
+    def __init__(self, name: str, ttl: float, max_entries: int, max_bytes: int):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_count = 0
+        self.load_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, record: bool = True) -> Optional[Any]:
+        """Return the cached value or None, counting the lookup unless record is False"""
+        with self._lock:
+            value = self._get(key, time.time())
+            if not record:
+                return value
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serializable value (dataclass records included), sized by its compact encoding"""
+        encoded = orjson.dumps(value)
+        if len(encoded) > self.max_bytes:
+            return
+        with self._lock:
+            self._set(key, value, encoded, time.time())
+
+    def update(self, key: str, func: Callable[[Optional[Any]], Any]):
+        """Replace the value with func(current value or None) in one atomic step
+
+        func must not mutate its argument, and may be called more than once.
+        """
+        with self._lock:
+            self._update(key, func, time.time())
+
+    def _update(self, key: str, func: Callable[[Optional[Any]], Any], now: float):
+        # Atomic within the process; backends shared between processes override this
+        value = func(self._get(key, now))
+        encoded = orjson.dumps(value)
+        if len(encoded) <= self.max_bytes:
+            self._set(key, value, encoded, now)
+
+    def record_load(self, seconds: float):
+        """Record how long an upstream load took, used to estimate time saved by hits"""
+        with self._lock:
+            self.load_count += 1
+            self.load_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_load = self.load_seconds / self.load_count if self.load_count else 0.0
+            return {
+                "backend": self.backend,
+                "entries": self._len(),
+                "bytes": self._size_bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "avg_upstream_ms": round(avg_load * 1000, 1),
+                "estimated_saved_seconds": round(self.hits * avg_load, 2)
+            }
+
+
+class TTLCache(BaseCache):
+    """In-process LRU cache with per-entry TTL and a byte-size cap"""
+
+    backend = "memory"
+
+    def __init__(self, name: str, ttl: float, max_entries: int, max_bytes: int):
+        super().__init__(name, ttl, max_entries, max_bytes)
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+
+    def _get(self, key: str, now: float) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _set(self, key: str, value: Any, encoded: bytes, now: float):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (now + self.ttl, len(encoded), value)
+        self._bytes += len(encoded)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _len(self) -> int:
+        return len(self._entries)
+
+    def _size_bytes(self) -> int:
+        return self._bytes
+
+
+class SQLiteCache(BaseCache):
+    """Persistent cache backend so entries survive restarts
+
+    The file is shared by every worker on the host, so reads never write:
+    last-access times are kept in memory and written with the next set()
+    or every TOUCH_BATCH reads. A database busy past BUSY_TIMEOUT counts
+    as a miss (or a skipped write) rather than failing the request.
+
+    Entry and byte totals are kept in a one-row table by triggers, so a
+    set() checks the caps without scanning, and eviction walks the
+    accessed_at index for just the rows it removes.
+    """
+
+    backend = "sqlite"
+    BUSY_TIMEOUT = 2.0
+    TOUCH_BATCH = 200
+
+    def __init__(self, name: str, ttl: float, max_entries: int, max_bytes: int, path: str):
+        super().__init__(name, ttl, max_entries, max_bytes)
+        self.path = path
+        self._touched = {}  # key -> last read time, not yet written
+        self._conn = sqlite3.connect(path, timeout=self.BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        table = self._table
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,
+                expires_at REAL NOT NULL, accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at);
+            CREATE INDEX IF NOT EXISTS {table}_expires ON {table} (expires_at);
+            CREATE TABLE IF NOT EXISTS {table}_totals (
+                id INTEGER PRIMARY KEY CHECK (id = 1), entries INTEGER NOT NULL, bytes INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON {table} BEGIN
+                UPDATE {table}_totals SET entries = entries + 1, bytes = bytes + new.size;
+            END;
+            CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON {table} BEGIN
+                UPDATE {table}_totals SET entries = entries - 1, bytes = bytes - old.size;
+            END;
+            CREATE TRIGGER IF NOT EXISTS {table}_resize AFTER UPDATE OF size ON {table} BEGIN
+                UPDATE {table}_totals SET bytes = bytes + new.size - old.size;
+            END;
+        """)
+        # Counted once, in one statement, for a table created before the totals; triggers keep it after
+        self._conn.execute(
+            f"INSERT OR IGNORE INTO {table}_totals (id, entries, bytes) "
+            f"SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM {table}"
+        )
+        self._conn.commit()
+
+    @property
+    def _table(self) -> str:
+        return f"cache_{self.name}"
+
+    def _get(self, key: str, now: float) -> Optional[Any]:
+        try:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️ {self.name} cache read failed, treating as a miss: {e}")
+            return None
+        # Expired rows are swept by the next set()
+        if row is None or row[1] < now:
+            return None
+        self._touched[key] = now
+        if len(self._touched) >= self.TOUCH_BATCH:
+            try:
+                self._write_touched()
+                self._conn.commit()
+            except sqlite3.OperationalError:
+                self._conn.rollback()  # Recency is best effort; retried with the next batch
+        return orjson.loads(row[0])
+
+    def _write_touched(self):
+        """Write buffered last-access times, so eviction sees recent reads"""
+        if self._touched:
+            self._conn.executemany(
+                f"UPDATE {self._table} SET accessed_at = max(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _set(self, key: str, value: Any, encoded: bytes, now: float):
+        try:
+            self._write(key, encoded, now)
+            self._conn.commit()
+        except sqlite3.OperationalError as e:
+            self._conn.rollback()
+            logger.warning(f"⚠️ {self.name} cache write skipped: {e}")
+
+    def _update(self, key: str, func: Callable[[Optional[Any]], Any], now: float):
+        try:
+            # Take the write lock before reading, so no other worker writes the key in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)
+            ).fetchone()
+            value = func(orjson.loads(row[0]) if row is not None and row[1] >= now else None)
+            encoded = orjson.dumps(value)
+            if len(encoded) <= self.max_bytes:
+                self._write(key, encoded, now)
+            self._conn.commit()
+        except sqlite3.OperationalError as e:
+            self._conn.rollback()
+            logger.warning(f"⚠️ {self.name} cache update skipped: {e}")
+
+    def _write(self, key: str, encoded: bytes, now: float):
+        """Store an entry and enforce the caps, inside the caller's transaction"""
+        self._write_touched()
+        # An upsert rather than INSERT OR REPLACE, whose implicit delete would skip the triggers
+        self._conn.execute(
+            f"INSERT INTO {self._table} (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+            "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+            (key, encoded, len(encoded), now + self.ttl, now)
+        )
+        self._conn.execute(f"DELETE FROM {self._table} WHERE expires_at < ?", (now,))
+        self._evict()
+
+    def _evict(self):
+        """Delete least recently used rows until both caps hold"""
+        entries, size = self._totals()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        victims = []
+        cursor = self._conn.execute(f"SELECT key, size FROM {self._table} ORDER BY accessed_at")
+        for key, row_size in cursor:
+            if entries <= self.max_entries and size <= self.max_bytes:
+                break
+            victims.append((key,))
+            entries -= 1
+            size -= row_size
+        cursor.close()
+        self._conn.executemany(f"DELETE FROM {self._table} WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def _totals(self):
+        return self._conn.execute(f"SELECT entries, bytes FROM {self._table}_totals").fetchone()
+
+    def _len(self) -> int:
+        return self._totals()[0]
+
+    def _size_bytes(self) -> int:
+        return self._totals()[1]
+
+
+class CacheBackendUnavailable(Exception):
+    """Raised when the configured cache backend is not installed"""
+
+
+class RedisCache(BaseCache):
+    """Cache in Redis (or a Redis-compatible server) shared by every worker and host
+
+    Entries expire through Redis TTLs; entry and byte caps are left to the
+    server's maxmemory policy, so configure it with allkeys-lru. Entry and
+    byte counts are not reported: counting would scan the whole keyspace.
+    """
+
+    backend = "redis"
+
+    def __init__(self, name: str, ttl: float, max_entries: int, max_bytes: int, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise CacheBackendUnavailable("CACHE_BACKEND=redis needs the redis package: pip install redis")
+
+        super().__init__(name, ttl, max_entries, max_bytes)
+        self._client = redis.Redis.from_url(url, socket_timeout=2)
+        self._client.ping()
+        self._prefix = f"arxivchat:{name}:"
+        self._watch_error = redis.WatchError
+
+    def _get(self, key: str, now: float) -> Optional[Any]:
+        raw = self._client.get(self._prefix + key)
+        return orjson.loads(raw) if raw is not None else None
+
+    def _set(self, key: str, value: Any, encoded: bytes, now: float):
+        self._client.set(self._prefix + key, encoded, ex=max(int(self.ttl), 1))
+
+    def _update(self, key: str, func: Callable[[Optional[Any]], Any], now: float):
+        # Optimistic: retried when another client writes the key between the read and the write
+        name = self._prefix + key
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(name)
+                    raw = pipe.get(name)
+                    value = func(orjson.loads(raw) if raw is not None else None)
+                    pipe.multi()
+                    pipe.set(name, orjson.dumps(value), ex=max(int(self.ttl), 1))
+                    pipe.execute()
+                    return
+                except self._watch_error:
+                    continue
+
+    def _len(self) -> Optional[int]:
+        return None
+
+    def _size_bytes(self) -> Optional[int]:
+        return None
+
+
+def build_cache(name: str, ttl: float, max_entries: int, max_bytes: int, path: str = "") -> BaseCache:
+    """Create a cache on the configured backend, falling back to memory
+    
+    An explicit path always selects SQLite. Otherwise CACHE_BACKEND picks
+    memory (per process), sqlite (shared by workers on one host, at
+    CACHE_SQLITE_PATH) or redis (shared everywhere, at CACHE_REDIS_URL).
+    """
+    backend = "sqlite" if path else settings.CACHE_BACKEND
+    try:
+        if backend == "sqlite":
+            path = path or settings.CACHE_SQLITE_PATH
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            cache = SQLiteCache(name, ttl, max_entries, max_bytes, path)
+            logger.info(f"💾 {name} cache persisted to {path}")
+            return cache
+        if backend == "redis":
+            cache = RedisCache(name, ttl, max_entries, max_bytes, settings.CACHE_REDIS_URL)
+            logger.info(f"💾 {name} cache shared through Redis")
+            return cache
+    except CacheBackendUnavailable:
+        # Misconfigured rather than unreachable: a per-process cache would silently split state across workers
+        raise
+    except Exception as e:
+        logger.error(f"❌ Failed to open {name} cache on {backend}, falling back to memory: {e}")
+    return TTLCache(name, ttl, max_entries, max_bytes)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single execution"""
+
+    def __init__(self):
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: str, func, *args):
+        """Run func(*args) once per key at a time; concurrent callers share the result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"event": threading.Event(), "result": None, "error": None}
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = func(*args)
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["event"].set()
+
+
+class AsyncSingleFlight:
+    """Coalesce concurrent awaits with the same key onto one task, on the event loop
+
+    Unlike SingleFlight, followers wait on the loop rather than in a pool
+    thread, so a burst of identical requests occupies one worker. The shared
+    task outlives a caller that is cancelled, so the others still get it.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, func, *args):
+        """Await func(*args) once per key at a time; concurrent callers share the result"""
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func(*args))
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _finish(self, key: str, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Retrieved here too, in case every caller was cancelled before it finished
+        if not future.cancelled():
+            future.exception()
@@ -21,6 +21,127 @@ class Settings:
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", "8080"))
     
+    # Static assets served from an in-memory bundle, and gzip for API responses
+    ASSET_BUNDLE_ENABLED = os.getenv("ASSET_BUNDLE_ENABLED", "true").lower() == "true"
+    API_GZIP_ENABLED = os.getenv("API_GZIP_ENABLED", "true").lower() == "true"
+    API_GZIP_MIN_BYTES = int(os.getenv("API_GZIP_MIN_BYTES", "1000"))
+    
+    # Concurrency settings
+    ARXIV_MAX_WORKERS = int(os.getenv("ARXIV_MAX_WORKERS", "8"))
+    
+    # Search backend: "live" queries export.arxiv.org, "local" uses the offline mirror
+    ARXIV_BACKEND = os.getenv("ARXIV_BACKEND", "live").lower()
+    ARXIV_LOCAL_INDEX_PATH = os.getenv("ARXIV_LOCAL_INDEX_PATH", "data/arxiv.db")
+    
+    # Cache tier: "memory" is per process; "sqlite" and "redis" are shared across workers
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+    CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "data/cache.db")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    
+    # Paper metadata cache (set PAPER_CACHE_PATH to persist it in SQLite)
+    PAPER_CACHE_TTL = int(os.getenv("PAPER_CACHE_TTL", "86400"))
+    PAPER_CACHE_MAX_ENTRIES = int(os.getenv("PAPER_CACHE_MAX_ENTRIES", "5000"))
+    PAPER_CACHE_MAX_BYTES = int(os.getenv("PAPER_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    PAPER_CACHE_PATH = os.getenv("PAPER_CACHE_PATH", "")
+    
+    # Search result cache, keyed on the normalized query
+    QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "900"))
+    QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1000"))
+    QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "")
+    
+    # Hybrid embedding + BM25 re-ranking of search results
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+    RERANK_OVERFETCH = int(os.getenv("RERANK_OVERFETCH", "3"))
+    RERANK_MAX_CANDIDATES = int(os.getenv("RERANK_MAX_CANDIDATES", "100"))
+    RERANK_SEMANTIC_WEIGHT = float(os.getenv("RERANK_SEMANTIC_WEIGHT", "0.5"))
+    RERANK_STORE_MAX_ENTRIES = int(os.getenv("RERANK_STORE_MAX_ENTRIES", "10000"))
+    
+    # Full-text retrieval over paper PDFs
+    RAG_ENABLED = os.getenv("RAG_ENABLED", "true").lower() == "true"
+    RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", "data/rag")
+    RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+    RAG_CHUNK_WORDS = int(os.getenv("RAG_CHUNK_WORDS", "200"))
+    RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "40"))
+    RAG_MAX_WORKERS = int(os.getenv("RAG_MAX_WORKERS", "2"))
+    RAG_DOWNLOAD_TIMEOUT = float(os.getenv("RAG_DOWNLOAD_TIMEOUT", "30"))
+    RAG_MAX_PDF_BYTES = int(os.getenv("RAG_MAX_PDF_BYTES", str(30 * 1024 * 1024)))
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "hashing")
+    
+    # Multi-turn conversation memory
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+    CHAT_MAX_MESSAGES = int(os.getenv("CHAT_MAX_MESSAGES", "20"))
+    CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "5000"))
+    CHAT_SESSION_MAX_BYTES = int(os.getenv("CHAT_SESSION_MAX_BYTES", str(16 * 1024)))  # Oldest messages dropped past it
+    CHAT_SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL", "3600"))
+    
+    # Background warm-up of the top search results
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", "3"))
+    PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "1"))  # Own pool, kept below RAG_MAX_WORKERS
+    PREFETCH_MAX_PENDING = int(os.getenv("PREFETCH_MAX_PENDING", "12"))
+    PREFETCH_TRACKED_PAPERS = int(os.getenv("PREFETCH_TRACKED_PAPERS", "1000"))
+    PREFETCH_SUMMARY = os.getenv("PREFETCH_SUMMARY", "false").lower() == "true"
+    PREFETCH_SUMMARY_QUESTION = os.getenv("PREFETCH_SUMMARY_QUESTION", "Summarize this paper")
+    
+    # Generated per-paper summaries, contributions and suggested questions
+    ARTIFACTS_ENABLED = os.getenv("ARTIFACTS_ENABLED", "true").lower() == "true"
+    ARTIFACT_STORE_PATH = os.getenv("ARTIFACT_STORE_PATH", "data/artifacts.db")
+    ARTIFACT_SUMMARY_WORDS = int(os.getenv("ARTIFACT_SUMMARY_WORDS", "120"))
+    ARTIFACT_CONTRIBUTIONS = int(os.getenv("ARTIFACT_CONTRIBUTIONS", "4"))
+    ARTIFACT_QUESTIONS = int(os.getenv("ARTIFACT_QUESTIONS", "4"))
+    ARTIFACT_PROMPT_CONTEXT = os.getenv("ARTIFACT_PROMPT_CONTEXT", "true").lower() == "true"
+    
+    # Batch lookups and multi-paper chat
+    BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "50"))
+    MULTI_CHAT_MAX_PAPERS = int(os.getenv("MULTI_CHAT_MAX_PAPERS", "5"))
+    MULTI_CHAT_PAPER_TOKEN_BUDGET = int(os.getenv("MULTI_CHAT_PAPER_TOKEN_BUDGET", "600"))
+    MULTI_CHAT_EXCERPTS_PER_PAPER = int(os.getenv("MULTI_CHAT_EXCERPTS_PER_PAPER", "2"))
+    
+    # Per-client rate limits (per worker) and LLM admission control
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_CHAT_PER_MINUTE = float(os.getenv("RATE_LIMIT_CHAT_PER_MINUTE", "20"))
+    RATE_LIMIT_CHAT_BURST = int(os.getenv("RATE_LIMIT_CHAT_BURST", "5"))
+    RATE_LIMIT_SEARCH_PER_MINUTE = float(os.getenv("RATE_LIMIT_SEARCH_PER_MINUTE", "60"))
+    RATE_LIMIT_SEARCH_BURST = int(os.getenv("RATE_LIMIT_SEARCH_BURST", "20"))
+    RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))  # Proxies appending X-Forwarded-For
+    LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "8"))
+    LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+    LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+    
+    # LLM provider routing
+    LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    
+    # Semantic cache of answers to repeated first questions about a paper
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+    RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.9"))
+    
+    # Background upstream health probing
+    HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "60"))
+    HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "10"))
+    HEALTH_PROBE_WINDOW = int(os.getenv("HEALTH_PROBE_WINDOW", "10"))
+    
+    # Profiling: admin endpoints stay disabled unless ADMIN_TOKEN is set
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+    SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "5"))  # 0 disables the sampler
+    SLOW_REQUEST_SAMPLE_INTERVAL = float(os.getenv("SLOW_REQUEST_SAMPLE_INTERVAL", "0.01"))
+    SLOW_REQUEST_KEEP = int(os.getenv("SLOW_REQUEST_KEEP", "20"))
+    LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))  # 0 disables the monitor
+    
+    # Per-request deadlines in seconds (0 disables one); work still running is cancelled
+    SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "15"))
+    CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", "60"))
+    STREAM_DEADLINE_SECONDS = float(os.getenv("STREAM_DEADLINE_SECONDS", "120"))
+    SUMMARY_DEADLINE_SECONDS = float(os.getenv("SUMMARY_DEADLINE_SECONDS", "90"))
+    
     def __init__(self):
         # Log API key status (without exposing actual keys)
         logger.info(f"🔑 GROQ_API_KEY: {'✅ SET' if self.GROQ_API_KEY else '❌ MISSING'}")
@@ -0,0 +1,113 @@
+"""
+Server-side conversation history for multi-turn chat
+"""
+from datetime import datetime, timezone
+from typing import List
+import orjson
+from cache import build_cache
+from config import settings
+from models import ChatMessage
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)"""
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text at a word boundary so it fits roughly within max_tokens"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(max_tokens, 1) * 4].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:") + "…"
+
+class ConversationStore:
+    """Keeps recent messages per (session, paper), bounded in sessions, messages and size
+
+    Conversations live in a cache on the configured backend: least recently
+    used sessions are evicted once MAX_SESSIONS is reached and idle sessions
+    expire after the TTL. With a shared backend a session can move between
+    workers without losing its history. Each conversation keeps its newest
+    messages within CHAT_SESSION_MAX_BYTES, so the store's byte cap is that
+    times the session count.
+    """
+
+    MAX_MESSAGE_CHARS = 4000
+
+    def __init__(self):
+        self.max_sessions = settings.CHAT_MAX_SESSIONS
+        self.max_messages = settings.CHAT_MAX_MESSAGES
+        self.max_session_bytes = settings.CHAT_SESSION_MAX_BYTES
+        self.ttl = settings.CHAT_SESSION_TTL
+        self.token_budget = settings.CHAT_HISTORY_TOKEN_BUDGET
+        # Each conversation is a list of message dicts stored under "session|paper"
+        self._sessions = build_cache(
+            "conversations",
+            ttl=self.ttl,
+            max_entries=self.max_sessions,
+            max_bytes=self.max_sessions * self.max_session_bytes
+        )
+
+    @staticmethod
+    def _key(session_id: str, paper_id: str) -> str:
+        return f"{session_id}|{paper_id}"
+
+    def append(self, session_id: str, paper_id: str, role: str, content: str):
+        """Record a message, evicting the least recently used sessions if needed"""
+        message = ChatMessage(
+            role=role, content=content[:self.MAX_MESSAGE_CHARS], timestamp=datetime.now(timezone.utc)
+        ).model_dump(mode="json")
+        # One atomic read-modify-write, so concurrent messages in a session never overwrite each other
+        self._sessions.update(
+            self._key(session_id, paper_id), lambda messages: self._bounded((messages or []) + [message])
+        )
+
+    def _bounded(self, messages: List[dict]) -> List[dict]:
+        """The newest messages within the message count and the per-session byte limit"""
+        messages = messages[-self.max_messages:]
+        while len(messages) > 1 and len(orjson.dumps(messages)) > self.max_session_bytes:
+            messages = messages[1:]
+        return messages
+
+    def history(self, session_id: str, paper_id: str) -> List[ChatMessage]:
+        """Return the most recent messages that fit in the configured token budget"""
+        messages = self._sessions.get(self._key(session_id, paper_id))
+        if not messages:
+            return []
+        return self._trim([ChatMessage(**message) for message in messages], self.token_budget)
+
+    def clear(self, session_id: str, paper_id: str):
+        self._sessions.set(self._key(session_id, paper_id), [])
+
+    @staticmethod
+    def _trim(messages: List[ChatMessage], budget: int) -> List[ChatMessage]:
+        """Keep the newest messages within budget, noting how many older ones were dropped"""
+        kept = []
+        used = 0
+        for message in reversed(messages):
+            cost = estimate_tokens(message.content)
+            if used + cost > budget:
+                # Fit a truncated copy of the message that crosses the budget
+                remaining_chars = (budget - used) * 4
+                if remaining_chars > 200:
+                    kept.append(ChatMessage(
+                        role=message.role,
+                        content="..." + message.content[-remaining_chars:],
+                        timestamp=message.timestamp
+                    ))
+                break
+            kept.append(message)
+            used += cost
+
+        kept.reverse()
+        dropped = len(messages) - len(kept)
+        if dropped:
+            kept.insert(0, ChatMessage(role="system", content=f"({dropped} earlier messages omitted)"))
+        return kept
+
+    def stats(self) -> dict:
+        stats = self._sessions.stats()
+        return {
+            "backend": stats["backend"],
+            "sessions": stats["entries"],
+            "bytes": stats["bytes"],
+            "evictions": stats["evictions"]
+        }
@@ -0,0 +1,141 @@
+"""
+Per-request deadlines, and cancellation of upstream work on timeout or disconnect
+
+Endpoint work runs as a task raced against its endpoint's time budget and
+the client disconnecting; whichever ends first cancels the rest, so a hung
+arXiv page or a long LLM generation no longer holds the request. The
+deadline is also published in a context variable, which the copied
+contexts of the arXiv worker threads carry, so blocking loops can stop
+between pages instead of fetching results nobody will see.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import Counter
+from typing import AsyncIterator, Awaitable, Dict, Optional
+from fastapi import Request
+from metrics import CLIENT_DISCONNECTS, DEADLINE_TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+# Monotonic time the current request's work must finish by
+_expires_at: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's time budget runs out before its work finishes"""
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before its response is ready"""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one"""
+    expires_at = _expires_at.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+def check(stage: str):
+    """Raise DeadlineExceeded once the current request's deadline has passed
+
+    Called between units of blocking work (e.g. arXiv result pages), which
+    cannot be cancelled once started.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Deadline passed before {stage}")
+
+async def wait_for_disconnect(request: Request):
+    """Return when the client disconnects; the request body must already have been read"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+class RequestDeadlines:
+    """Per-endpoint time budgets, with timeout, cancellation and degraded-response counts"""
+
+    def __init__(self, budgets: Dict[str, float]):
+        # A budget of 0 leaves the endpoint without a deadline
+        self.budgets = {endpoint: budget for endpoint, budget in budgets.items() if budget > 0}
+        self.timeouts = Counter()
+        self.cancelled = Counter()
+        self.degraded = Counter()
+
+    async def run(self, endpoint: str, work: Awaitable, request: Optional[Request] = None,
+                  started: Optional[float] = None):
+        """Await work within the endpoint's budget, cancelling it if the budget runs out or the client leaves
+        
+        The budget counts from `started` (a time.monotonic() reading, e.g.
+        when the request arrived), or from now.
+        """
+        budget = self.budgets.get(endpoint)
+        expires_at = (started or time.monotonic()) + budget if budget else None
+        token = _expires_at.set(expires_at)
+        try:
+            # The task copies the context now, deadline included
+            task = asyncio.ensure_future(work)
+        finally:
+            _expires_at.reset(token)
+        watcher = asyncio.ensure_future(wait_for_disconnect(request)) if request is not None else None
+
+        try:
+            done, _ = await asyncio.wait(
+                [future for future in (task, watcher) if future is not None],
+                timeout=None if expires_at is None else max(expires_at - time.monotonic(), 0),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for future in (task, watcher):
+                if future is not None and not future.done():
+                    future.cancel()
+
+        if task in done:
+            return task.result()
+        if watcher is not None and watcher in done:
+            self.record_cancelled(endpoint)
+            raise ClientDisconnected(f"Client disconnected during {endpoint}")
+        self.record_timeout(endpoint)
+        raise DeadlineExceeded(f"{endpoint} exceeded its {budget:g}s deadline")
+
+    async def bounded(self, endpoint: str, iterator: AsyncIterator, started: Optional[float] = None) -> AsyncIterator:
+        """Items from an async iterator until the endpoint's budget is spent, then DeadlineExceeded
+
+        For streamed responses: whatever was yielded before the deadline has
+        already been sent, so callers finish the stream as partial.
+        """
+        budget = self.budgets.get(endpoint)
+        expires_at = (started or time.monotonic()) + budget if budget else None
+        iterator = iterator.__aiter__()
+        while True:
+            timeout = None if expires_at is None else max(expires_at - time.monotonic(), 0)
+            try:
+                item = await asyncio.wait_for(iterator.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                self.record_timeout(endpoint)
+                raise DeadlineExceeded(f"{endpoint} exceeded its {budget:g}s deadline")
+            yield item
+
+    def record_timeout(self, endpoint: str):
+        self.timeouts[endpoint] += 1
+        DEADLINE_TIMEOUTS.inc(endpoint=endpoint)
+        logger.warning(f"⏱️ {endpoint} ran past its {self.budgets.get(endpoint, 0):g}s deadline, work cancelled")
+
+    def record_cancelled(self, endpoint: str):
+        self.cancelled[endpoint] += 1
+        CLIENT_DISCONNECTS.inc(endpoint=endpoint)
+        logger.info(f"🔌 Client left during {endpoint}, work cancelled")
+
+    def record_degraded(self, endpoint: str):
+        self.degraded[endpoint] += 1
+
+    def stats(self) -> dict:
+        return {
+            "budgets": self.budgets,
+            "timeouts": dict(self.timeouts),
+            "cancelled": dict(self.cancelled),
+            "degraded": dict(self.degraded)
+        }
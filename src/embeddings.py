@@ -0,0 +1,72 @@
+"""
+Local CPU text embeddings for retrieval and similarity
+"""
+import logging
+import re
+import zlib
+from functools import lru_cache
+from typing import List
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+class HashingEmbedder:
+    """Dependency-free embedder: signed feature hashing of word unigrams and bigrams"""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Return L2-normalized float32 vectors, one row per text"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.uint32, count=len(features))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], hashes % self.dim, signs)
+        # Dampen repeated terms, then normalize so dot products are cosine similarities
+        np.copyto(vectors, np.sign(vectors) * np.log1p(np.abs(vectors)))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Wrapper around a sentence-transformers model running on CPU"""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Return L2-normalized float32 vectors, one row per text"""
+        return self.model.encode(
+            texts, batch_size=32, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+def build_embedder():
+    """Create the configured embedder, falling back to feature hashing"""
+    model_name = settings.EMBEDDING_MODEL
+    if model_name and model_name != "hashing":
+        try:
+            embedder = SentenceTransformerEmbedder(model_name)
+            logger.info(f"✅ Embedding model {model_name} loaded")
+            return embedder
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding model {model_name} unavailable, using feature hashing: {e}")
+    return HashingEmbedder()
+
+
+@lru_cache(maxsize=1)
+def get_embedder():
+    """Process-wide embedder so a model is only loaded once"""
+    return build_embedder()
@@ -0,0 +1,83 @@
+"""
+Background upstream health probing for cheap health checks
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class UpstreamProber:
+    """Samples an upstream on an interval and caches the outcome
+
+    Health endpoints read snapshot(), which is O(1) and never touches the
+    network, so frequent probes cost nothing upstream.
+    """
+
+    def __init__(self, name: str, probe: Callable[[], Awaitable[None]], interval: float,
+                 timeout: float, window: int):
+        self.name = name
+        self.probe = probe
+        self.interval = interval
+        self.timeout = timeout
+        self.samples = deque(maxlen=window)  # (ok, latency)
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.sample()
+            await asyncio.sleep(self.interval)
+
+    async def sample(self):
+        """Run one probe and record its outcome"""
+        start_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.probe(), timeout=self.timeout)
+            self.samples.append((True, time.perf_counter() - start_time))
+            self.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.samples.append((False, time.perf_counter() - start_time))
+            self.last_error = str(e) or type(e).__name__
+            logger.warning(f"⚠️ {self.name} probe failed: {self.last_error}")
+        self.last_checked = time.time()
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for ok, _ in self.samples if not ok) / len(self.samples)
+
+    def status(self) -> str:
+        if not self.samples:
+            return "unknown"
+        if all(not ok for ok, _ in self.samples):
+            return "down"
+        return "healthy" if self.samples[-1][0] and self.error_rate() < 0.5 else "degraded"
+
+    def snapshot(self) -> dict:
+        return {
+            "status": self.status(),
+            "last_latency_ms": round(self.samples[-1][1] * 1000) if self.samples else None,
+            "error_rate": round(self.error_rate(), 3),
+            "samples": len(self.samples),
+            "last_checked": self.last_checked,
+            "last_error": self.last_error
+        }
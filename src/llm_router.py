@@ -0,0 +1,277 @@
+"""
+Routing across LLM providers with circuit breakers, failover and hedging
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, List, Optional, Tuple
+from config import settings
+from metrics import LLM_ERRORS, LLM_LATENCY
+
+logger = logging.getLogger(__name__)
+
+class AllProvidersFailed(Exception):
+    """Raised when no provider could produce a response"""
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single trial call through after a cooldown"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether a call could go through now, without claiming the half-open trial"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            return self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def allow(self) -> bool:
+        """Claim a call, taking the single trial once an open breaker has cooled down
+        
+        Only call this right before calling the provider: a claimed trial
+        must end in record_success, record_failure or record_cancelled.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_cancelled(self):
+        """A call was abandoned without an outcome; an unfinished trial reopens for a fresh cooldown"""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"🔌 Circuit opened after {self.consecutive_failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class Provider:
+    """An LLM client plus its breaker and a rolling window of outcomes"""
+
+    WINDOW = 100
+
+    def __init__(self, name: str, llm):
+        self.name = name
+        self.llm = llm
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS)
+        self.latencies = deque(maxlen=self.WINDOW)
+        self.outcomes = deque(maxlen=self.WINDOW)  # True for errors
+        self.requests = 0
+
+    def record_success(self, seconds: float):
+        LLM_LATENCY.observe(seconds, provider=self.name)
+        self.requests += 1
+        self.latencies.append(seconds)
+        self.outcomes.append(False)
+        self.breaker.record_success()
+
+    def record_failure(self):
+        LLM_ERRORS.inc(provider=self.name)
+        self.requests += 1
+        self.outcomes.append(True)
+        self.breaker.record_failure()
+
+    def record_cancelled(self):
+        self.breaker.record_cancelled()
+
+    def p95(self) -> Optional[float]:
+        """95th percentile latency, or None until enough samples exist"""
+        if len(self.latencies) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def error_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def stats(self) -> dict:
+        p95 = self.p95()
+        return {
+            "state": self.breaker.state,
+            "requests": self.requests,
+            "error_rate": round(self.error_rate(), 3),
+            "p95_ms": round(p95 * 1000) if p95 is not None else None
+        }
+
+
+class LLMRouter:
+    """Sends each prompt to the healthiest preferred provider
+
+    Providers are tried in preference order, skipping any whose breaker is
+    open. On failure the next provider is tried. With hedging enabled, a
+    second provider is also started once the first has run past its own p95
+    latency, and whichever answers first wins. Any object with invoke,
+    ainvoke and astream (LangChain chat model style) can be a provider.
+    """
+
+    def __init__(self, providers: List[Tuple[str, object]], hedging: bool = False):
+        self.providers = [Provider(name, llm) for name, llm in providers if llm is not None]
+        self.hedging = hedging
+        self.fallbacks = 0
+        self.hedges = 0
+
+    def _candidates(self) -> List[Provider]:
+        """Providers that could take a call; each claims its breaker only when actually called"""
+        return [provider for provider in self.providers if provider.breaker.available()]
+
+    def _route(self, provider: Provider, attempts: List[str], start_time: float, hedged: bool = False) -> dict:
+        fallback = attempts[0] != provider.name
+        if fallback:
+            self.fallbacks += 1
+        logger.info(f"Using {provider.name} for response generation (tried: {', '.join(attempts)})")
+        return {
+            "provider": provider.name,
+            "attempts": attempts,
+            "fallback": fallback,
+            "hedged": hedged,
+            "latency_ms": round((time.perf_counter() - start_time) * 1000)
+        }
+
+    def invoke(self, prompt: str) -> Tuple[str, dict]:
+        """Blocking call with failover; returns the response text and routing metadata"""
+        start_time = time.perf_counter()
+        attempts = []
+        for provider in self._candidates():
+            if not provider.breaker.allow():
+                continue
+            attempts.append(provider.name)
+            call_start = time.perf_counter()
+            try:
+                response = provider.llm.invoke(prompt)
+            except Exception as e:
+                logger.warning(f"⚠️ {provider.name} failed, trying next provider: {e}")
+                provider.record_failure()
+                continue
+            provider.record_success(time.perf_counter() - call_start)
+            return response.content, self._route(provider, attempts, start_time)
+        raise AllProvidersFailed(f"No LLM provider succeeded (tried: {', '.join(attempts) or 'none'})")
+
+    async def ainvoke(self, prompt: str) -> Tuple[str, dict]:
+        """Async call with failover and optional hedging"""
+        start_time = time.perf_counter()
+        remaining = self._candidates()
+        attempts = []
+        pending = {}
+        hedged = False
+
+        def launch() -> bool:
+            while remaining:
+                provider = remaining.pop(0)
+                # Another request may have taken this provider's half-open trial meanwhile
+                if not provider.breaker.allow():
+                    continue
+                attempts.append(provider.name)
+                pending[asyncio.ensure_future(self._acall(provider, prompt))] = provider
+                return True
+            return False
+
+        if not launch():
+            raise AllProvidersFailed("No LLM provider available (all circuits open)")
+
+        try:
+            while pending:
+                hedge_delay = None
+                if self.hedging and remaining and not hedged and len(pending) == 1:
+                    primary = next(iter(pending.values()))
+                    p95 = primary.p95()
+                    if p95 is not None:
+                        hedge_delay = max(p95 - (time.perf_counter() - start_time), 0)
+
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The primary is slower than its p95, race the next provider against it
+                    if launch():
+                        hedged = True
+                        self.hedges += 1
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result(), self._route(provider, attempts, start_time, hedged)
+                    logger.warning(f"⚠️ {provider.name} failed: {task.exception()}")
+
+                if not pending and remaining:
+                    launch()
+        finally:
+            for task, provider in pending.items():
+                task.cancel()
+                # Done here rather than in _acall: a task cancelled before it first runs never enters it
+                provider.record_cancelled()
+
+        raise AllProvidersFailed(f"No LLM provider succeeded (tried: {', '.join(attempts)})")
+
+    async def _acall(self, provider: Provider, prompt: str) -> str:
+        call_start = time.perf_counter()
+        try:
+            response = await provider.llm.ainvoke(prompt)
+        except asyncio.CancelledError:
+            # Losing a hedge race is not a provider failure; ainvoke hands back a trial it held
+            raise
+        except Exception:
+            provider.record_failure()
+            raise
+        provider.record_success(time.perf_counter() - call_start)
+        return response.content
+
+    async def astream(self, prompt: str, route: Optional[dict] = None) -> AsyncIterator[str]:
+        """Stream from the first healthy provider, failing over only before the first chunk"""
+        start_time = time.perf_counter()
+        attempts = []
+        for provider in self._candidates():
+            if not provider.breaker.allow():
+                continue
+            attempts.append(provider.name)
+            call_start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in provider.llm.astream(prompt):
+                    if not started:
+                        started = True
+                        if route is not None:
+                            route.update(self._route(provider, attempts, start_time))
+                    yield chunk.content
+            except (asyncio.CancelledError, GeneratorExit):
+                # The consumer went away; the call has no outcome, so only a held trial is reset
+                provider.record_cancelled()
+                raise
+            except Exception as e:
+                provider.record_failure()
+                if started:
+                    raise
+                logger.warning(f"⚠️ {provider.name} stream failed, trying next provider: {e}")
+                continue
+            provider.record_success(time.perf_counter() - call_start)
+            return
+        raise AllProvidersFailed(f"No LLM provider succeeded (tried: {', '.join(attempts) or 'none'})")
+
+    def stats(self) -> dict:
+        return {
+            "providers": {provider.name: provider.stats() for provider in self.providers},
+            "fallbacks": self.fallbacks,
+            "hedges": self.hedges
+        }
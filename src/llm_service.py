@@ -1,49 +1,188 @@
 """
 LLM service for chatting about papers with improved prompting
 """
+import asyncio
 import logging
-from typing import Optional
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
+import threading
+import time
+from typing import AsyncIterator, Callable, List, Optional, Tuple
 from config import settings
+from artifact_store import parse_artifacts
+from conversation_store import estimate_tokens, truncate_to_tokens
+from embeddings import get_embedder
+from llm_router import LLMRouter
+from metrics import STAGE_LATENCY, stage_timer
+from models import ChatMessage
+from response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
-class LLMService:
+# Prompt headers that signal the model echoed the instructions back
+PROMPT_LEAK_MARKERS = (
+    "Instructions for high-quality responses",
+    "Response Guidelines",
+    "**Your comprehensive response:**"
+)
+
+SHORT_RESPONSE_FALLBACK = "I'd be happy to help you understand this paper better. Could you please ask a more specific question about the research methodology, findings, or implications?"
+
+class StreamingResponseCleaner:
+    """Incremental version of LLMService._format_response for streamed output
+    
+    Text is released line by line so echoed prompt sections can be dropped.
+    Long lines are released early since the leak markers are short headers,
+    and nothing is released until the response is long enough to be
+    substantive.
+    """
+    
+    MIN_RESPONSE_CHARS = 50
+    EARLY_RELEASE_CHARS = 64
+    
     def __init__(self):
+        self.line = ""
+        self.line_released = False
+        self.pending = ""
+        self.started = False
+        self.leaked = False
+        self.skip_mode = False
+    
+    def feed(self, text: str) -> str:
+        """Consume a chunk of model output and return the text safe to emit"""
+        output = []
+        self.line += text
+        while "\n" in self.line:
+            line, self.line = self.line.split("\n", 1)
+            output.append(self._finish_line(line) if not self.line_released else line + "\n")
+            self.line_released = False
+        
+        # Stream long lines without waiting for the newline, outside skipped sections
+        can_release = not self.leaked and not self.skip_mode
+        if can_release and (self.line_released or len(self.line) > self.EARLY_RELEASE_CHARS):
+            if self.line_released or not any(marker in self.line for marker in PROMPT_LEAK_MARKERS):
+                output.append(self.line)
+                self.line = ""
+                self.line_released = True
+        
+        return self._release("".join(output))
+    
+    def finish(self) -> str:
+        """Flush the remaining text at the end of the stream"""
+        tail = self.line if self.line_released else self._finish_line(self.line)
+        self.line = ""
+        released = self._release(tail.rstrip())
+        if not self.started:
+            return SHORT_RESPONSE_FALLBACK
+        return released
+    
+    def _finish_line(self, line: str) -> str:
+        """Apply the prompt-leak rules of _format_response to a complete line"""
+        if any(marker in line for marker in PROMPT_LEAK_MARKERS):
+            self.leaked = True
+        if self.leaked and ("Instructions" in line or "Guidelines" in line or "**Your comprehensive response:**" in line):
+            self.skip_mode = True
+            return ""
+        if self.skip_mode and line.strip() and not line.startswith('-') and not line.startswith('*'):
+            self.skip_mode = False
+        return "" if self.skip_mode else line + "\n"
+    
+    def _release(self, text: str) -> str:
+        """Hold back output until it is long enough to be a real answer"""
+        if self.started:
+            return text
+        self.pending += text
+        if len(self.pending.strip()) < self.MIN_RESPONSE_CHARS:
+            return ""
+        self.started = True
+        return self.pending.lstrip()
+
+class LazyChatModel:
+    """Builds a LangChain chat model on first use
+    
+    Importing the LangChain provider packages takes longer than the rest of
+    the app combined, so clients are built in a background warm-up or by
+    the first request that needs one, never on the startup path. Async
+    callers build on a worker thread so the event loop keeps serving.
+    """
+    
+    def __init__(self, name: str, factory: Callable[[], object]):
+        self.name = name
+        self._factory = factory
+        self._llm = None
+        self._lock = threading.Lock()
+    
+    @property
+    def ready(self) -> bool:
+        return self._llm is not None
+    
+    def get(self):
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    start_time = time.perf_counter()
+                    try:
+                        self._llm = self._factory()
+                    except Exception as e:
+                        logger.error(f"❌ Failed to initialize {self.name} LLM: {e}")
+                        raise
+                    logger.info(f"✅ {self.name} LLM initialized in {time.perf_counter() - start_time:.2f}s")
+        return self._llm
+    
+    async def aget(self):
+        if self._llm is None:
+            await asyncio.to_thread(self.get)
+        return self._llm
+    
+    def invoke(self, prompt):
+        return self.get().invoke(prompt)
+    
+    async def ainvoke(self, prompt):
+        return await (await self.aget()).ainvoke(prompt)
+    
+    async def astream(self, prompt):
+        async for chunk in (await self.aget()).astream(prompt):
+            yield chunk
+
+def build_groq():
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        groq_api_key=settings.GROQ_API_KEY,
+        model_name="gemma2-9b-it",
+        temperature=0.1,
+        max_tokens=2048
+    )
+
+def build_gemini():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        google_api_key=settings.GOOGLE_API_KEY,
+        model="gemma-3n-e4b-it",
+        temperature=0.1
+    )
+
+class LLMService:
+    def __init__(self, providers: Optional[List[Tuple[str, object]]] = None):
         self.groq_llm = None
         self.gemini_llm = None
+        self.response_cache = ResponseCache(get_embedder()) if settings.RESPONSE_CACHE_ENABLED else None
+        
+        # Explicit providers (e.g. local fakes) skip the API-key based setup
+        if providers is not None:
+            self.router = LLMRouter(providers, hedging=settings.LLM_HEDGE_ENABLED)
+            logger.info(f"🎉 LLM Services ready: {', '.join(p.name for p in self.router.providers)}")
+            return
         
         logger.info(f"🔍 Initializing LLM Service...")
         logger.info(f"🔑 GROQ_API_KEY available: {bool(settings.GROQ_API_KEY)}")
         logger.info(f"🔑 GOOGLE_API_KEY available: {bool(settings.GOOGLE_API_KEY)}")
         
+        # Clients are only described here; LazyChatModel imports and builds them when first needed
         if settings.GROQ_API_KEY:
-            try:
-                logger.info("🚀 Attempting to initialize Groq LLM...")
-                self.groq_llm = ChatGroq(
-                    groq_api_key=settings.GROQ_API_KEY,
-                    model_name="gemma2-9b-it",
-                    temperature=0.1,
-                    max_tokens=2048
-                )
-                logger.info("✅ Groq LLM initialized successfully")
-            except Exception as e:
-                logger.error(f"❌ Failed to initialize Groq LLM: {e}")
+            self.groq_llm = LazyChatModel("Groq", build_groq)
         else:
             logger.warning("⚠️ GROQ_API_KEY not provided - Groq LLM unavailable")
         
         if settings.GOOGLE_API_KEY:
-            try:
-                logger.info("🚀 Attempting to initialize Google Gemini LLM...")
-                self.gemini_llm = ChatGoogleGenerativeAI(
-                    google_api_key=settings.GOOGLE_API_KEY,
-                    model="gemma-3n-e4b-it",  
-                    temperature=0.1
-                )
-                logger.info("✅ Google Gemini LLM with Gemma-3n initialized successfully")
-            except Exception as e:
-                logger.error(f"❌ Failed to initialize Google Gemini LLM: {e}")
+            self.gemini_llm = LazyChatModel("Google Gemini", build_gemini)
         else:
             logger.warning("⚠️ GOOGLE_API_KEY not provided - Google Gemini LLM unavailable")
         
@@ -56,18 +195,208 @@ class LLMService:
                 available_services.append("Groq")
             if self.gemini_llm:
                 available_services.append("Google Gemini")
-            logger.info(f"🎉 LLM Services ready: {', '.join(available_services)}")
+            logger.info(f"🎉 LLM Services configured: {', '.join(available_services)}")
+        
+        # Preference order: Gemini first, Groq as the fallback
+        self.router = LLMRouter(
+            [("gemini", self.gemini_llm), ("groq", self.groq_llm)],
+            hedging=settings.LLM_HEDGE_ENABLED
+        )
     
-    def chat_about_paper(self, paper: dict, message: str) -> str:
+    def warm_up(self):
+        """Build any lazily constructed provider clients now, e.g. from a background task"""
+        for provider in self.router.providers:
+            if isinstance(provider.llm, LazyChatModel) and not provider.llm.ready:
+                try:
+                    provider.llm.get()
+                except Exception:
+                    pass  # Already logged; the router's breaker handles a provider that stays broken
+    
+    def chat_about_paper(self, paper: dict, message: str, excerpts: Optional[List[str]] = None,
+                         history: Optional[List[ChatMessage]] = None, artifacts: Optional[dict] = None) -> str:
         """Generate enhanced responses about papers with better context and formatting"""
         try:
-            context = f"""You are an expert AI research assistant with deep knowledge across scientific domains. Your task is to provide comprehensive, insightful answers about research papers by combining the paper's content with your broader scientific knowledge.
+            cached = self._cached_response(paper, message, history)
+            if cached is not None:
+                return cached
+            
+            with stage_timer("prompt_build"):
+                context = self._build_prompt(paper, message, excerpts, history, artifacts)
+            
+            if not self.router.providers:
+                return "Sorry, no LLM service is configured. Please add your API keys."
+            
+            start_time = time.perf_counter()
+            with stage_timer("llm_invoke"):
+                content, _ = self.router.invoke(context)
+            with stage_timer("format"):
+                response = self._format_response(content)
+            self._store_response(paper, message, history, context, response, time.perf_counter() - start_time)
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            return "Sorry, I encountered an error while processing your question. Please try again."
+    
+    async def achat_about_paper(self, paper: dict, message: str, excerpts: Optional[List[str]] = None,
+                                history: Optional[List[ChatMessage]] = None, route: Optional[dict] = None,
+                                artifacts: Optional[dict] = None) -> str:
+        """Async variant of chat_about_paper; the routing decision is written into route if given"""
+        try:
+            cached = self._cached_response(paper, message, history, route)
+            if cached is not None:
+                return cached
+            
+            with stage_timer("prompt_build"):
+                context = self._build_prompt(paper, message, excerpts, history, artifacts)
+            
+            if not self.router.providers:
+                return "Sorry, no LLM service is configured. Please add your API keys."
+            
+            start_time = time.perf_counter()
+            with stage_timer("llm_invoke"):
+                content, routing = await self.router.ainvoke(context)
+            if route is not None:
+                route.update(routing)
+            with stage_timer("format"):
+                response = self._format_response(content)
+            self._store_response(paper, message, history, context, response, time.perf_counter() - start_time)
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            return "Sorry, I encountered an error while processing your question. Please try again."
+    
+    async def achat_about_papers(self, papers: List[dict], message: str,
+                                 excerpts: Optional[List[List[str]]] = None,
+                                 history: Optional[List[ChatMessage]] = None, route: Optional[dict] = None) -> str:
+        """Answer one question across several papers, each held to the per-paper context budget"""
+        try:
+            with stage_timer("prompt_build"):
+                context = self._build_multi_prompt(papers, message, excerpts, history)
+            
+            if not self.router.providers:
+                return "Sorry, no LLM service is configured. Please add your API keys."
+            
+            with stage_timer("llm_invoke"):
+                content, routing = await self.router.ainvoke(context)
+            if route is not None:
+                route.update(routing)
+            with stage_timer("format"):
+                return self._format_response(content)
+            
+        except Exception as e:
+            logger.error(f"Error generating multi-paper response: {e}")
+            return "Sorry, I encountered an error while processing your question. Please try again."
+    
+    async def astream_chat_about_paper(self, paper: dict, message: str, excerpts: Optional[List[str]] = None,
+                                       history: Optional[List[ChatMessage]] = None,
+                                       route: Optional[dict] = None,
+                                       artifacts: Optional[dict] = None) -> AsyncIterator[str]:
+        """Stream the response as cleaned text chunks while the provider generates it"""
+        cached = self._cached_response(paper, message, history, route)
+        if cached is not None:
+            yield cached
+            return
+        
+        if not self.router.providers:
+            yield "Sorry, no LLM service is configured. Please add your API keys."
+            return
+        
+        context = self._build_prompt(paper, message, excerpts, history, artifacts)
+        cleaner = StreamingResponseCleaner()
+        start_time = time.perf_counter()
+        first_token_time = None
+        streamed = []
+        
+        try:
+            async for content in self.router.astream(context, route):
+                if first_token_time is None:
+                    first_token_time = time.perf_counter() - start_time
+                    STAGE_LATENCY.observe(first_token_time, stage="llm_first_token")
+                    logger.info(f"⚡ Time to first token: {first_token_time * 1000:.0f}ms")
+                text = cleaner.feed(content)
+                if text:
+                    streamed.append(text)
+                    yield text
+            
+            tail = cleaner.finish()
+            if tail:
+                streamed.append(tail)
+                yield tail
+            STAGE_LATENCY.observe(time.perf_counter() - start_time, stage="llm_stream")
+            logger.info(f"Streamed response in {time.perf_counter() - start_time:.2f}s")
+            self._store_response(paper, message, history, context, "".join(streamed), time.perf_counter() - start_time)
+            
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            yield "\n\nSorry, I encountered an error while processing your question. Please try again."
+    
+    async def agenerate_artifacts(self, paper: dict, excerpts: Optional[List[str]] = None) -> Optional[tuple]:
+        """Generate a paper's summary, contributions and suggested questions; (artifacts, provider) or None"""
+        if not self.router.providers:
+            return None
+        
+        with stage_timer("prompt_build"):
+            context = self._build_artifact_prompt(paper, excerpts)
+        with stage_timer("llm_invoke"):
+            content, routing = await self.router.ainvoke(context)
+        
+        artifacts = parse_artifacts(content)
+        if artifacts is None:
+            logger.warning(f"⚠️ Unparseable artifact response for paper: {paper['id'][:20]}")
+            return None
+        artifacts["contributions"] = artifacts["contributions"][:settings.ARTIFACT_CONTRIBUTIONS]
+        artifacts["questions"] = artifacts["questions"][:settings.ARTIFACT_QUESTIONS]
+        return artifacts, routing.get("provider", "")
+    
+    def _build_artifact_prompt(self, paper: dict, excerpts: Optional[List[str]] = None) -> str:
+        """Build the prompt asking for the paper's artifacts as a JSON object"""
+        excerpt_context = ""
+        if excerpts:
+            excerpt_context = "\n**Excerpts from the Full Text:**\n" + "\n".join(f"- {excerpt}" for excerpt in excerpts)
+        
+        return f"""You are an expert AI research assistant. Read the research paper below and describe it for a reader deciding what to ask about it.
+
+**Title**: {paper['title']}
+**Authors**: {', '.join(paper['authors'])}
+**Categories**: {', '.join(paper.get('categories', []))}
+**Abstract**: {paper['abstract']}{excerpt_context}
+
+Reply with only a JSON object with these keys:
+- "summary": a self-contained summary of the problem, approach and main results in at most {settings.ARTIFACT_SUMMARY_WORDS} words
+- "contributions": a list of at most {settings.ARTIFACT_CONTRIBUTIONS} key contributions, one sentence each
+- "questions": a list of {settings.ARTIFACT_QUESTIONS} specific follow-up questions a reader might ask about this paper"""
+    
+    def _build_prompt(self, paper: dict, message: str, excerpts: Optional[List[str]] = None,
+                      history: Optional[List[ChatMessage]] = None, artifacts: Optional[dict] = None) -> str:
+        """Build the paper-grounded prompt sent to the LLM"""
+        # A stored summary stands in for the longer abstract when available
+        paper_context = f"- **Abstract**: {paper['abstract']}"
+        if artifacts:
+            paper_context = f"- **Summary**: {artifacts['summary']}"
+            if artifacts["contributions"]:
+                paper_context += "\n- **Key Contributions**: " + "; ".join(artifacts["contributions"])
+        
+        excerpt_context = ""
+        if excerpts:
+            excerpt_context = "\n- **Relevant Excerpts from the Full Text**:\n" + "\n".join(
+                f"  [{i}] {excerpt}" for i, excerpt in enumerate(excerpts, 1)
+            )
+        
+        history_context = ""
+        if history:
+            history_context = "**Conversation So Far:**\n" + "\n".join(
+                f"{item.role.capitalize()}: {item.content}" for item in history
+            ) + "\n\n"
+        
+        return f"""You are an expert AI research assistant with deep knowledge across scientific domains. Your task is to provide comprehensive, insightful answers about research papers by combining the paper's content with your broader scientific knowledge.
 
 **Research Paper Context:**
 - **Title**: {paper['title']}
 - **Authors**: {', '.join(paper['authors'])}
 - **Categories**: {', '.join(paper.get('categories', []))}
-- **Abstract**: {paper['abstract']}
+{paper_context}{excerpt_context}
 
 **Instructions for high-quality responses:**
 1. **Be Comprehensive**: Provide detailed explanations, not just summaries
@@ -77,7 +406,7 @@ class LLMService:
 5. **Stay Focused**: Only answer questions related to this paper or its research area
 6. **Be Contextual**: Explain how this work fits into the broader research landscape
 
-**User Question**: {message}
+{history_context}**User Question**: {message}
 
 **Response Guidelines:**
 - If about paper content/methodology/implications: Provide detailed, knowledgeable answer
@@ -87,21 +416,86 @@ class LLMService:
 - Provide specific examples and connections to related work when relevant
 
 **Your comprehensive response:**"""
-            
-            llm = self.gemini_llm or self.groq_llm 
-            
-            if not llm:
-                return "Sorry, no LLM service is configured. Please add your API keys."
-            
-            model_name = "Gemma-3n" if llm == self.gemini_llm else "Groq Gemma2"
-            logger.info(f"Using {model_name} for response generation")
-            
-            response = llm.invoke(context)
-            return self._format_response(response.content)
-            
-        except Exception as e:
-            logger.error(f"Error generating response: {e}")
-            return "Sorry, I encountered an error while processing your question. Please try again."
+    
+    def _build_multi_prompt(self, papers: List[dict], message: str,
+                            excerpts: Optional[List[List[str]]] = None,
+                            history: Optional[List[ChatMessage]] = None) -> str:
+        """Build a prompt covering several papers, labelled [P1]..[Pn] for citation"""
+        budget = settings.MULTI_CHAT_PAPER_TOKEN_BUDGET
+        sections = []
+        for i, paper in enumerate(papers):
+            paper_excerpts = excerpts[i] if excerpts and i < len(excerpts) else []
+            # The abstract gets up to half the budget, excerpts share whatever remains
+            abstract = truncate_to_tokens(paper["abstract"], budget // 2)
+            remaining = budget - estimate_tokens(abstract) - estimate_tokens(paper["title"])
+            excerpt_lines = []
+            for excerpt in paper_excerpts:
+                if remaining <= 0:
+                    break
+                excerpt = truncate_to_tokens(excerpt, remaining)
+                remaining -= estimate_tokens(excerpt)
+                excerpt_lines.append(f"  - Excerpt: {excerpt}")
+            authors = ", ".join(paper["authors"][:5]) + (" et al." if len(paper["authors"]) > 5 else "")
+            sections.append("\n".join([
+                f"**[P{i + 1}] {paper['title']}** ({paper['id']})",
+                f"  - Authors: {authors}",
+                f"  - Abstract: {abstract}",
+                *excerpt_lines
+            ]))
+        
+        history_context = ""
+        if history:
+            history_context = "**Conversation So Far:**\n" + "\n".join(
+                f"{item.role.capitalize()}: {item.content}" for item in history
+            ) + "\n\n"
+        
+        papers_context = "\n\n".join(sections)
+        return f"""You are an expert AI research assistant with deep knowledge across scientific domains. Your task is to answer questions that span several research papers, comparing and connecting them accurately.
+
+**Research Papers:**
+{papers_context}
+
+**Instructions for high-quality responses:**
+1. **Cite Papers**: Refer to each paper by its label, e.g. [P1], whenever you use it
+2. **Compare Directly**: Contrast methods, assumptions, results and limitations across the papers
+3. **Be Honest About Gaps**: Say when the provided context does not cover something for a paper
+4. **Use Markdown**: Use headings, bullet points or a table where it makes the comparison clearer
+
+{history_context}**User Question**: {message}
+
+**Response Guidelines:**
+- Cover every paper the question concerns, not just the first one
+- Use markdown formatting for better readability
+
+**Your comprehensive response:**"""
+    
+    def _cached_response(self, paper: dict, message: str, history: Optional[List[ChatMessage]],
+                         route: Optional[dict] = None) -> Optional[str]:
+        """Answer a first-turn question from the response cache, if a close match exists"""
+        # Follow-up questions depend on the conversation, so only first turns are shared
+        if not self.response_cache or history:
+            return None
+        
+        response = self.response_cache.get(paper["id"], message)
+        if response is not None:
+            logger.info(f"💨 Response cache hit for paper: {paper['id'][:20]}")
+            if route is not None:
+                route.update({"provider": "cache", "attempts": [], "fallback": False, "hedged": False, "latency_ms": 0})
+        return response
+    
+    def _store_response(self, paper: dict, message: str, history: Optional[List[ChatMessage]],
+                        context: str, response: str, seconds: float):
+        if not self.response_cache or history or response == SHORT_RESPONSE_FALLBACK:
+            return
+        tokens = estimate_tokens(context) + estimate_tokens(response)
+        self.response_cache.set(paper["id"], message, response, seconds, tokens)
+    
+    def stats(self) -> dict:
+        """Provider health, routing counters and response cache savings"""
+        return {
+            **self.router.stats(),
+            "response_cache": self.response_cache.stats() if self.response_cache else {}
+        }
 
     def _format_response(self, response: str) -> str:
         """Clean and format the LLM response"""
@@ -127,6 +521,6 @@ class LLMService:
         
         # Ensure we have a substantive response
         if len(response) < 50:
-            return "I'd be happy to help you understand this paper better. Could you please ask a more specific question about the research methodology, findings, or implications?"
+            return SHORT_RESPONSE_FALLBACK
         
         return response
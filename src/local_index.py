@@ -0,0 +1,379 @@
+"""
+Local offline arXiv mirror backed by SQLite FTS5
+
+Ingests arXiv metadata dumps (the JSON-lines snapshot format) and OAI-PMH
+ListRecords harvests (arXiv metadata format) into an on-disk full-text
+index, and answers searches with BM25 ranking over title, abstract,
+authors and categories.
+
+Usage:
+    python src/local_index.py ingest arxiv-metadata-oai-snapshot.json --db data/arxiv.db
+    python src/local_index.py ingest harvest-2024-06-01.xml --db data/arxiv.db
+    python src/local_index.py search "graph neural networks" --db data/arxiv.db
+    python src/local_index.py status --db data/arxiv.db
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Iterator, List, Optional
+from models import PaperRecord
+
+logger = logging.getLogger(__name__)
+
+OAI_NS = "{http://www.openarchives.org/OAI/2.0/}"
+ARXIV_NS = "{http://arxiv.org/OAI/arXiv/}"
+
+# arXiv query field prefixes mapped to index columns
+FIELD_COLUMNS = {"ti": "title", "abs": "abstract", "au": "authors", "cat": "categories", "all": None}
+# arXiv boolean operators mapped to FTS5 ones
+OPERATORS = {"AND": "AND", "OR": "OR", "ANDNOT": "NOT"}
+
+def base_id(paper_id: str) -> str:
+    """arXiv ID without its version suffix"""
+    return re.sub(r"v\d+$", "", paper_id)
+
+def _clean(text: Optional[str]) -> str:
+    return " ".join((text or "").split())
+
+class LocalArxivIndex:
+    """On-disk inverted index over arXiv metadata, same record shape as ArxivService"""
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS papers (
+                rowid INTEGER PRIMARY KEY,
+                base_id TEXT UNIQUE NOT NULL,
+                id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                authors TEXT NOT NULL,
+                abstract TEXT NOT NULL,
+                published TEXT NOT NULL,
+                pdf_url TEXT NOT NULL,
+                categories TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                title, abstract, authors, categories,
+                content='papers', content_rowid='rowid', tokenize='porter unicode61'
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        self._conn.commit()
+
+    # Ingestion
+
+    def ingest_file(self, path: str) -> int:
+        """Ingest a JSON/JSON-lines dump or an OAI-PMH XML harvest; returns records upserted"""
+        if path.endswith(".xml"):
+            return self.ingest_records(self._read_oai(path))
+        return self.ingest_records(self._read_json(path))
+
+    def ingest_records(self, records: Iterable[dict]) -> int:
+        """Upsert records (deleted ones are removed) in batched transactions"""
+        count = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.BATCH_SIZE:
+                count += self._write_batch(batch)
+                batch = []
+        if batch:
+            count += self._write_batch(batch)
+        return count
+
+    def _write_batch(self, batch: List[dict]) -> int:
+        written = 0
+        with self._lock:
+            cursor = self._conn.cursor()
+            for record in batch:
+                key = base_id(record["id"])
+                old = cursor.execute(
+                    "SELECT rowid, title, abstract, authors, categories FROM papers WHERE base_id = ?", (key,)
+                ).fetchone()
+                if old:
+                    # External-content FTS tables need exactly the values that were indexed to remove a row
+                    rowid, title, abstract, authors, categories = old
+                    cursor.execute(
+                        "INSERT INTO papers_fts (papers_fts, rowid, title, abstract, authors, categories) "
+                        "VALUES ('delete', ?, ?, ?, ?, ?)",
+                        (rowid, title, abstract, " ".join(json.loads(authors)), " ".join(json.loads(categories)))
+                    )
+                    cursor.execute("DELETE FROM papers WHERE rowid = ?", (rowid,))
+                if record.get("deleted"):
+                    continue
+
+                authors = json.dumps(record["authors"], ensure_ascii=False)
+                categories = json.dumps(record["categories"], ensure_ascii=False)
+                cursor.execute(
+                    "INSERT INTO papers (base_id, id, title, authors, abstract, published, pdf_url, categories) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, record["id"], record["title"], authors, record["abstract"],
+                     record["published"], record["pdf_url"], categories)
+                )
+                cursor.execute(
+                    "INSERT INTO papers_fts (rowid, title, abstract, authors, categories) VALUES (?, ?, ?, ?, ?)",
+                    (cursor.lastrowid, record["title"], record["abstract"],
+                     " ".join(record["authors"]), " ".join(record["categories"]))
+                )
+                written += 1
+                if record.get("datestamp"):
+                    cursor.execute(
+                        "INSERT INTO meta (key, value) VALUES ('last_datestamp', ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value = max(value, excluded.value)",
+                        (record["datestamp"],)
+                    )
+            self._conn.commit()
+        return written
+
+    @staticmethod
+    def _read_json(path: str) -> Iterator[dict]:
+        """Records from the arXiv metadata snapshot (JSON lines) or a JSON array of them"""
+        with open(path, "r", encoding="utf-8") as f:
+            first = f.read(1)
+            f.seek(0)
+            rows = json.load(f) if first == "[" else (json.loads(line) for line in f if line.strip())
+            for row in rows:
+                versions = row.get("versions") or []
+                paper_id = row["id"] + (versions[-1]["version"] if versions else "")
+                if versions:
+                    published = parsedate_to_datetime(versions[0]["created"]).isoformat()
+                else:
+                    published = f"{row.get('update_date', '1970-01-01')}T00:00:00+00:00"
+                if row.get("authors_parsed"):
+                    authors = [_clean(f"{parts[1]} {parts[0]}") for parts in row["authors_parsed"]]
+                else:
+                    authors = [_clean(a) for a in re.split(r",| and ", row.get("authors", "")) if a.strip()]
+                yield {
+                    "id": paper_id,
+                    "title": _clean(row["title"]),
+                    "authors": authors,
+                    "abstract": _clean(row["abstract"]),
+                    "published": published,
+                    "pdf_url": f"http://arxiv.org/pdf/{paper_id}",
+                    "categories": row.get("categories", "").split(),
+                    "datestamp": row.get("update_date")
+                }
+
+    @staticmethod
+    def _read_oai(path: str) -> Iterator[dict]:
+        """Records from an OAI-PMH ListRecords response in the arXiv metadata format"""
+        for _, element in ET.iterparse(path):
+            if element.tag != f"{OAI_NS}record":
+                continue
+            header = element.find(f"{OAI_NS}header")
+            datestamp = header.findtext(f"{OAI_NS}datestamp")
+            if header.get("status") == "deleted":
+                identifier = header.findtext(f"{OAI_NS}identifier", "")
+                yield {"id": identifier.split(":")[-1], "deleted": True, "datestamp": datestamp}
+                element.clear()
+                continue
+
+            meta = element.find(f"{OAI_NS}metadata/{ARXIV_NS}arXiv")
+            if meta is None:
+                element.clear()
+                continue
+            paper_id = meta.findtext(f"{ARXIV_NS}id")
+            authors = [
+                _clean(f"{author.findtext(f'{ARXIV_NS}forenames', '')} {author.findtext(f'{ARXIV_NS}keyname', '')}")
+                for author in meta.findall(f"{ARXIV_NS}authors/{ARXIV_NS}author")
+            ]
+            yield {
+                "id": paper_id,
+                "title": _clean(meta.findtext(f"{ARXIV_NS}title")),
+                "authors": authors,
+                "abstract": _clean(meta.findtext(f"{ARXIV_NS}abstract")),
+                "published": f"{meta.findtext(f'{ARXIV_NS}created', '1970-01-01')}T00:00:00+00:00",
+                "pdf_url": f"http://arxiv.org/pdf/{paper_id}",
+                "categories": (meta.findtext(f"{ARXIV_NS}categories") or "").split(),
+                "datestamp": datestamp
+            }
+            element.clear()
+
+    # Queries
+
+    def search(self, query: str, max_results: int = 10) -> List[PaperRecord]:
+        """BM25-ranked search; all terms must match, topped up with any-term matches
+        
+        Queries using the arXiv AND/OR/ANDNOT operators are matched exactly
+        as written, without the any-term top-up.
+        """
+        expression = self._parse_boolean_query(query)
+        if expression is not None:
+            return self._match(expression, max_results) if expression else []
+        terms = self._parse_query(query)
+        if not terms:
+            return []
+        papers = self._match(" AND ".join(terms), max_results)
+        if len(papers) < max_results and len(terms) > 1:
+            seen = {paper["id"] for paper in papers}
+            for paper in self._match(" OR ".join(terms), max_results):
+                if paper["id"] not in seen and len(papers) < max_results:
+                    papers.append(paper)
+        return papers
+
+    def get(self, paper_id: str) -> Optional[PaperRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, title, authors, abstract, published, pdf_url, categories FROM papers WHERE base_id = ?",
+                (base_id(paper_id),)
+            ).fetchone()
+        return self._row_to_paper(row) if row else None
+
+    def _match(self, fts_query: str, limit: int) -> List[PaperRecord]:
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT p.id, p.title, p.authors, p.abstract, p.published, p.pdf_url, p.categories "
+                    "FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid "
+                    "WHERE papers_fts MATCH ? "
+                    "ORDER BY bm25(papers_fts, 5.0, 1.0, 2.0, 1.0) LIMIT ?",
+                    (fts_query, limit)
+                ).fetchall()
+        except sqlite3.OperationalError as e:
+            # A query FTS5 rejects matches nothing rather than failing the request
+            logger.warning(f"⚠️ Local index query {fts_query!r} failed: {e}")
+            return []
+        return [self._row_to_paper(row) for row in rows]
+
+    @staticmethod
+    def _token_terms(token: str) -> List[str]:
+        """FTS5 terms for one arXiv query token, e.g. ti:attention or cat:cs.LG"""
+        field, _, value = token.partition(":") if ":" in token else ("all", "", token)
+        column = FIELD_COLUMNS.get(field)
+        words = re.findall(r"\w+", value.replace(".", " "))
+        return [f'{column}:"{word}"' if column else f'"{word}"' for word in words]
+
+    @classmethod
+    def _parse_query(cls, query: str) -> List[str]:
+        """Translate an arXiv-style query (ti:, au:, abs:, cat: prefixes) into FTS5 terms"""
+        terms = []
+        for token in query.split():
+            if token not in OPERATORS:
+                terms.extend(cls._token_terms(token))
+        return terms
+
+    @classmethod
+    def _parse_boolean_query(cls, query: str) -> Optional[str]:
+        """FTS5 expression for a query using AND/OR/ANDNOT, or None when it uses none
+        
+        Empty when nothing is left to match positively, e.g. "ANDNOT vision".
+        
+        Terms side by side are ANDed, as arXiv does, and parentheses group.
+        FTS5's NOT needs a left side, so a leading ANDNOT's operand is moved
+        to the end of its group, and an ANDed group holding only exclusions
+        excludes from the enclosing group. Operators with nothing to apply
+        to, empty groups and unbalanced parentheses are dropped.
+        """
+        tokens = re.findall(r"[()]|[^\s()]+", query)
+        if not any(token in OPERATORS for token in tokens):
+            return None
+
+        def new_group() -> dict:
+            return {"parts": [], "excluded": [], "pending": None, "exclude_next": False}
+
+        def add(group: dict, term: str):
+            if group["exclude_next"]:
+                group["excluded"].append(term)
+                group["exclude_next"] = False
+                return
+            if group["parts"]:
+                group["parts"].append(group["pending"] or "AND")
+            group["parts"].append(term)
+            group["pending"] = None
+
+        def render(group: dict) -> str:
+            if not group["parts"]:
+                return ""
+            positive = " ".join(group["parts"])
+            if not group["excluded"]:
+                return positive
+            if len(group["parts"]) > 1:
+                positive = f"({positive})"
+            return " ".join([positive] + [f"NOT {term}" for term in group["excluded"]])
+
+        def close(stack: List[dict]):
+            group = stack.pop()
+            parent = stack[-1]
+            expression = render(group)
+            if expression:
+                add(parent, f"({expression})")
+            elif group["excluded"] and not parent["exclude_next"] and parent["pending"] in (None, "AND"):
+                parent["excluded"].extend(group["excluded"])
+                parent["pending"] = None
+
+        stack = [new_group()]
+        for token in tokens:
+            group = stack[-1]
+            if token in OPERATORS:
+                if group["parts"]:
+                    group["pending"] = OPERATORS[token]
+                elif token == "ANDNOT":
+                    group["exclude_next"] = True
+            elif token == "(":
+                stack.append(new_group())
+            elif token == ")":
+                if len(stack) > 1:
+                    close(stack)
+            else:
+                terms = cls._token_terms(token)
+                if terms:
+                    add(group, f"({' AND '.join(terms)})" if len(terms) > 1 else terms[0])
+
+        while len(stack) > 1:
+            close(stack)
+        return render(stack[0])
+
+    @staticmethod
+    def _row_to_paper(row) -> PaperRecord:
+        return PaperRecord(
+            id=row[0],
+            title=row[1],
+            authors=tuple(json.loads(row[2])),
+            abstract=row[3],
+            published=row[4],
+            pdf_url=row[5],
+            categories=tuple(json.loads(row[6]))
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'last_datestamp'").fetchone()
+        return {"papers": count, "last_datestamp": row[0] if row else None, "path": self.path}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local arXiv mirror")
+    parser.add_argument("command", choices=["ingest", "search", "status"])
+    parser.add_argument("args", nargs="*", help="Files to ingest, or the search query")
+    parser.add_argument("--db", default=os.getenv("ARXIV_LOCAL_INDEX_PATH", "data/arxiv.db"))
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    index = LocalArxivIndex(args.db)
+    if args.command == "ingest":
+        for path in args.args:
+            print(f"📥 {path}: {index.ingest_file(path)} records")
+        print(f"📊 {index.stats()}")
+    elif args.command == "search":
+        for paper in index.search(" ".join(args.args), args.limit):
+            print(f"{paper['id']:<16} {paper['title']}")
+    else:
+        print(f"📊 {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
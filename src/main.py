@@ -1,21 +1,45 @@
 """
 ArxivChat FastAPI Application - Production Ready
 """
+import asyncio
+import json
 import logging
+import re
+import secrets
 import time
-from fastapi import FastAPI, HTTPException, Request, status
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel, validator
+from starlette.background import BackgroundTask
+from starlette.routing import Match
 from typing import List, Optional
+import orjson
 import os
 
 from config import settings
 from arxiv_service import ArxivService
+from assets import JSONGZipMiddleware, build_bundle
+from artifact_store import ArtifactStore
+from conversation_store import ConversationStore
+from deadline import ClientDisconnected, DeadlineExceeded, RequestDeadlines
+from health import UpstreamProber
 from llm_service import LLMService
+from local_index import base_id
+from metrics import (
+    REGISTRY, REQUEST_ERRORS, REQUEST_LATENCY, REQUESTS_IN_FLIGHT, Counter,
+    server_timing_header, start_request_timings
+)
+from rag_service import RAGService
+from rate_limit import AdmissionController, RateLimitExceeded, TokenBucketLimiter
+from reranker import Reranker
 from models import Paper, ChatMessage
+from prefetch import Prefetcher
+from profiler import LoopLagMonitor, ProfileInProgress, Profiler, SlowRequestSampler, collapse, top_stacks
 
 # Configure logging
 logging.basicConfig(
@@ -28,6 +52,7 @@ logger = logging.getLogger(__name__)
 class ChatRequest(BaseModel):
     paper_id: str
     message: str
+    session_id: Optional[str] = None
     
     @validator('message')
     def validate_message(cls, v):
@@ -42,9 +67,70 @@ class ChatRequest(BaseModel):
         if not v or not v.strip():
             raise ValueError('Paper ID cannot be empty')
         return v.strip()
+    
+    @validator('session_id')
+    def validate_session_id(cls, v):
+        if v is not None and not re.fullmatch(r'[A-Za-z0-9_-]{1,64}', v):
+            raise ValueError('Invalid session ID')
+        return v
+
+class BatchPapersRequest(BaseModel):
+    ids: List[str]
+    
+    @validator('ids')
+    def validate_ids(cls, v):
+        ids = list(dict.fromkeys(paper_id.strip() for paper_id in v if paper_id and paper_id.strip()))
+        if not ids:
+            raise ValueError('At least one paper ID is required')
+        if len(ids) > settings.BATCH_MAX_IDS:
+            raise ValueError(f'Too many paper IDs (max {settings.BATCH_MAX_IDS})')
+        return ids
+
+class MultiChatRequest(BaseModel):
+    paper_ids: List[str]
+    message: str
+    session_id: Optional[str] = None
+    
+    @validator('paper_ids')
+    def validate_paper_ids(cls, v):
+        ids = list(dict.fromkeys(paper_id.strip() for paper_id in v if paper_id and paper_id.strip()))
+        if len(ids) < 2:
+            raise ValueError('At least two paper IDs are required')
+        if len(ids) > settings.MULTI_CHAT_MAX_PAPERS:
+            raise ValueError(f'Too many papers (max {settings.MULTI_CHAT_MAX_PAPERS})')
+        return ids
+    
+    @validator('message')
+    def validate_message(cls, v):
+        if not v or not v.strip():
+            raise ValueError('Message cannot be empty')
+        if len(v) > 1000:
+            raise ValueError('Message too long (max 1000 characters)')
+        return v.strip()
+    
+    @validator('session_id')
+    def validate_session_id(cls, v):
+        if v is not None and not re.fullmatch(r'[A-Za-z0-9_-]{1,64}', v):
+            raise ValueError('Invalid session ID')
+        return v
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build services inside each worker process and release them on shutdown"""
+    init_services()
+    if arxiv_prober:
+        arxiv_prober.start()
+    if loop_lag:
+        loop_lag.start()
+    # LLM clients are built off the startup path, so the app answers health checks meanwhile
+    if llm_service and settings.LLM_WARMUP:
+        asyncio.get_running_loop().run_in_executor(None, llm_service.warm_up)
+    yield
+    await shutdown_services()
 
 # Initialize FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="ArxivChat",
     description="Search and chat about research papers",
     version="1.0.0",
@@ -68,41 +154,262 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON API responses; static assets are precompressed and streams pass through
+if settings.API_GZIP_ENABLED:
+    app.add_middleware(JSONGZipMiddleware, minimum_size=settings.API_GZIP_MIN_BYTES)
+
+def route_label(request: Request) -> str:
+    """Route template for metrics labels, so path parameters don't explode cardinality"""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unknown")
+    return "unmatched"
+
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
+    timings = start_request_timings()
+    REQUESTS_IN_FLIGHT.inc()
+    # Profiling requests are slow by design
+    profiling = request.url.path.startswith("/api/admin/")
+    watch = slow_requests.watch() if slow_requests and not profiling else None
+    
+    finished = False
+    
+    def finish() -> float:
+        nonlocal finished
+        finished = True
+        REQUESTS_IN_FLIGHT.dec()
+        elapsed = time.time() - start_time
+        if watch:
+            slow_requests.finish(watch, request.method, route_label(request), elapsed, timings)
+        return elapsed
+    
+    try:
+        response = await call_next(request)
+    except BaseException:
+        finish()
+        raise
+    
+    # Headers go out before the body, so they can only time the work done so far
+    response.headers["Server-Timing"] = server_timing_header(timings, time.time() - start_time)
     
-    response = await call_next(request)
+    async def complete():
+        # call_next returns at the headers; streamed bodies (SSE, NDJSON) are timed to the last byte
+        if finished:
+            return
+        process_time = finish()
+        route = route_label(request)
+        REQUEST_LATENCY.observe(process_time, route=route, method=request.method)
+        if response.status_code >= 500:
+            REQUEST_ERRORS.inc(route=route)
+        logger.info(f"{request.method} {request.url.path} - {response.status_code} - {process_time:.2f}s")
     
-    process_time = time.time() - start_time
-    logger.info(f"{request.method} {request.url.path} - {response.status_code} - {process_time:.2f}s")
+    async def timed_body(body):
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            # Also covers a send that fails, which skips the background task
+            await complete()
     
+    response.body_iterator = timed_body(response.body_iterator)
+    # Runs once the body is sent, or once the client disconnects
+    response.background = BackgroundTask(complete)
     return response
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Static files come from the in-memory bundle, or straight from disk without one
+static_files = StaticFiles(directory="static")
+
+# Services are created per worker in the lifespan hook rather than at import time,
+# so nothing (thread pools, connections) is shared across a pre-fork
+arxiv_service = None
+llm_service = None
+conversation_store = None
+rag_service = None
+reranker = None
+arxiv_prober = None
+llm_admission = None
+search_limiter = None
+chat_limiter = None
+prefetcher = None
+artifact_store = None
+assets = None
+profiler = None
+slow_requests = None
+loop_lag = None
+deadlines = None
 
-# Initialize services with resilient startup
-try:
-    arxiv_service = ArxivService()
-    logger.info("ArXiv service initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize ArXiv service: {e}")
-    arxiv_service = None
+def init_services():
+    """Initialize services with resilient startup"""
+    global arxiv_service, llm_service, conversation_store, rag_service, reranker, arxiv_prober
+    global llm_admission, search_limiter, chat_limiter, prefetcher, artifact_store, assets
+    global profiler, slow_requests, loop_lag, deadlines
+    
+    assets = build_bundle("static") if settings.ASSET_BUNDLE_ENABLED else None
+    
+    try:
+        arxiv_service = ArxivService()
+        logger.info("ArXiv service initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize ArXiv service: {e}")
+        arxiv_service = None
+    
+    try:
+        llm_service = LLMService()
+        logger.info("LLM service initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize LLM service: {e}")
+        llm_service = None
+    
+    conversation_store = ConversationStore()
+    
+    artifact_store = None
+    if settings.ARTIFACTS_ENABLED:
+        try:
+            artifact_store = ArtifactStore(settings.ARTIFACT_STORE_PATH)
+            logger.info("Artifact store initialized successfully")
+        except Exception as e:
+            logger.warning(f"Artifact store unavailable, summaries won't be stored: {e}")
+    
+    rag_service = None
+    if settings.RAG_ENABLED:
+        try:
+            rag_service = RAGService()
+            logger.info("RAG service initialized successfully")
+        except Exception as e:
+            logger.warning(f"RAG service unavailable, chat will use abstracts only: {e}")
+    
+    reranker = None
+    if settings.RERANK_ENABLED:
+        try:
+            reranker = Reranker()
+            logger.info("Search re-ranker initialized successfully")
+        except Exception as e:
+            logger.warning(f"Search re-ranker unavailable, using arXiv relevance order: {e}")
+    
+    arxiv_prober = UpstreamProber(
+        "arXiv",
+        probe=lambda: arxiv_service.aping(),
+        interval=settings.HEALTH_PROBE_INTERVAL,
+        timeout=settings.HEALTH_PROBE_TIMEOUT,
+        window=settings.HEALTH_PROBE_WINDOW
+    ) if arxiv_service else None
+    
+    llm_admission = AdmissionController(
+        settings.LLM_MAX_CONCURRENT, settings.LLM_MAX_QUEUE, settings.LLM_QUEUE_TIMEOUT
+    )
+    # A per-minute rate of 0 turns that limiter off
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_SEARCH_PER_MINUTE > 0:
+        search_limiter = TokenBucketLimiter(
+            "search", settings.RATE_LIMIT_SEARCH_PER_MINUTE / 60, settings.RATE_LIMIT_SEARCH_BURST
+        )
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_CHAT_PER_MINUTE > 0:
+        chat_limiter = TokenBucketLimiter(
+            "chat", settings.RATE_LIMIT_CHAT_PER_MINUTE / 60, settings.RATE_LIMIT_CHAT_BURST
+        )
+    
+    if settings.PREFETCH_ENABLED and (rag_service or settings.PREFETCH_SUMMARY):
+        prefetcher = Prefetcher(llm_service, rag_service, llm_admission, prompt_artifacts)
+    
+    profiler = Profiler(settings.PROFILE_SAMPLE_INTERVAL, settings.PROFILE_MAX_SECONDS)
+    slow_requests = SlowRequestSampler(
+        settings.SLOW_REQUEST_SECONDS, settings.SLOW_REQUEST_SAMPLE_INTERVAL, keep=settings.SLOW_REQUEST_KEEP
+    ) if settings.SLOW_REQUEST_SECONDS > 0 else None
+    loop_lag = LoopLagMonitor(settings.LOOP_LAG_INTERVAL) if settings.LOOP_LAG_INTERVAL > 0 else None
+    deadlines = RequestDeadlines({
+        "search": settings.SEARCH_DEADLINE_SECONDS,
+        "chat": settings.CHAT_DEADLINE_SECONDS,
+        "chat_stream": settings.STREAM_DEADLINE_SECONDS,
+        "summary": settings.SUMMARY_DEADLINE_SECONDS
+    })
+    
+    logger.info("App initialization completed - starting FastAPI")
+
+def collect_service_metrics():
+    """Expose counters the services already keep, read at scrape time"""
+    cache_hits = Counter("arxivchat_cache_hits_total", "Cache hits by cache")
+    cache_misses = Counter("arxivchat_cache_misses_total", "Cache misses by cache")
+    llm_fallbacks = Counter("arxivchat_llm_fallbacks_total", "Responses served by a fallback provider")
+    llm_hedges = Counter("arxivchat_llm_hedges_total", "Hedged requests sent to a second provider")
+    
+    if arxiv_service:
+        for name, stats in arxiv_service.cache_stats().items():
+            cache_hits.inc(stats["hits"], cache=name)
+            cache_misses.inc(stats["misses"], cache=name)
+    if llm_service:
+        stats = llm_service.stats()
+        llm_fallbacks.inc(stats["fallbacks"])
+        llm_hedges.inc(stats["hedges"])
+        if stats["response_cache"]:
+            cache_hits.inc(stats["response_cache"]["hits"], cache="responses")
+            cache_misses.inc(stats["response_cache"]["misses"], cache="responses")
+    
+    return [cache_hits, cache_misses, llm_fallbacks, llm_hedges]
 
-try:
-    llm_service = LLMService()
-    logger.info("LLM service initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize LLM service: {e}")
-    llm_service = None
+REGISTRY.register_collector(collect_service_metrics)
 
-logger.info("App initialization completed - starting FastAPI")
+async def shutdown_services():
+    """Release worker pools held by the services"""
+    if prefetcher:
+        await prefetcher.stop()
+    if loop_lag:
+        await loop_lag.stop()
+    if arxiv_prober:
+        await arxiv_prober.stop()
+    if arxiv_service:
+        arxiv_service.shutdown()
+    if rag_service:
+        rag_service.shutdown()
+    if reranker:
+        reranker.shutdown()
+
+def client_key(request: Request) -> str:
+    """Identify the client for rate limiting: the socket peer, or behind trusted proxies the hop they saw
+    
+    Clients can put anything in X-Forwarded-For, so only the entries the
+    trusted proxies appended count: with N of them, the Nth from the right.
+    """
+    proxies = settings.RATE_LIMIT_TRUSTED_PROXIES
+    forwarded = request.headers.get("x-forwarded-for") if proxies > 0 else None
+    if forwarded:
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            return hops[-min(proxies, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+def too_many_requests(exc: RateLimitExceeded) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
+
+async def limit_search(request: Request):
+    """Per-client token bucket for search and lookup endpoints"""
+    if search_limiter:
+        try:
+            search_limiter.acquire(client_key(request))
+        except RateLimitExceeded as e:
+            raise too_many_requests(e)
+
+async def limit_chat(request: Request):
+    """Per-client token bucket for chat endpoints"""
+    if chat_limiter:
+        try:
+            chat_limiter.acquire(client_key(request))
+        except RateLimitExceeded as e:
+            raise too_many_requests(e)
+
+def prompt_artifacts(paper: dict) -> Optional[dict]:
+    """Stored artifacts to use as compact paper context in chat prompts, if any"""
+    if not artifact_store or not settings.ARTIFACT_PROMPT_CONTEXT:
+        return None
+    return artifact_store.get(paper["id"])
 
 @app.get("/", response_class=HTMLResponse)
-async def read_root():
+async def read_root(request: Request):
     """Serve the main HTML page"""
+    if assets:
+        return assets.index.response(request)
     try:
         with open("static/index.html", "r", encoding="utf-8") as f:
             content = f.read()
@@ -111,40 +418,255 @@ async def read_root():
         logger.error(f"Error serving index.html: {e}")
         raise HTTPException(status_code=500, detail="Failed to load page")
 
-@app.get("/api/papers")
-async def search_papers(q: str, limit: int = 10):
-    """Search for papers on ArXiv with validation"""
+@app.get("/static/{name}", include_in_schema=False)
+async def static_asset(name: str, request: Request):
+    """Bundled asset by plain or content-hashed name; hashed URLs are cacheable forever"""
+    if not assets:
+        return await static_files.get_response(name, request.scope)
+    asset, immutable = assets.lookup(name)
+    if not asset:
+        raise HTTPException(status_code=404, detail="Not found")
+    return asset.response(request, immutable)
+
+def validate_search(q: str, limit: int) -> str:
+    """Check search parameters, returning the trimmed query"""
+    if not q or not q.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    if len(q) > 200:
+        raise HTTPException(status_code=400, detail="Query too long (max 200 characters)")
+        
+    if limit < 1 or limit > 50:
+        raise HTTPException(status_code=400, detail="Limit must be between 1 and 50")
+    
+    return q.strip()
+
+@app.get("/api/papers", dependencies=[Depends(limit_search)])
+async def search_papers(request: Request, q: str, limit: int = 10, rerank: Optional[bool] = None):
+    """Search for papers on ArXiv with validation, optionally re-ranked locally"""
     try:
         # Check service availability
         if not arxiv_service:
             raise HTTPException(status_code=503, detail="ArXiv service not available")
         
         # Input validation
-        if not q or not q.strip():
-            raise HTTPException(status_code=400, detail="Query cannot be empty")
+        query = validate_search(q, limit)
+        logger.info(f"Searching papers for query: {query[:50]}...")
         
-        if len(q) > 200:
-            raise HTTPException(status_code=400, detail="Query too long (max 200 characters)")
-            
-        if limit < 1 or limit > 50:
-            raise HTTPException(status_code=400, detail="Limit must be between 1 and 50")
+        use_reranker = reranker is not None and (rerank if rerank is not None else True)
         
-        query = q.strip()
-        logger.info(f"Searching papers for query: {query[:50]}...")
+        async def run_search():
+            if use_reranker:
+                # Over-fetch so re-ranking can promote results arXiv ranked lower
+                candidates = await arxiv_service.asearch_papers(
+                    query=query, max_results=reranker.candidate_count(limit)
+                )
+                papers, rerank_ms = await reranker.arerank(query, candidates, limit)
+                return papers, len(candidates), rerank_ms
+            return await arxiv_service.asearch_papers(query=query, max_results=limit), None, None
         
-        papers = arxiv_service.search_papers(query=query, max_results=limit)
+        try:
+            papers, reranked_from, rerank_ms = await deadlines.run("search", run_search(), request)
+        except DeadlineExceeded:
+            # A smaller cached page of the same query beats an error
+            papers = arxiv_service.cached_papers(query, limit)
+            if not papers:
+                raise HTTPException(status_code=504, detail="Search timed out, please retry")
+            deadlines.record_degraded("search")
+            return ORJSONResponse({"papers": papers, "count": len(papers), "degraded": True})
         
         logger.info(f"Found {len(papers)} papers for query: {query[:50]}...")
-        return {"papers": papers, "count": len(papers)}
+        # The next step is usually opening one of the top results, so warm them now
+        if prefetcher:
+            prefetcher.schedule(papers)
+        result = {"papers": papers, "count": len(papers)}
+        if reranked_from is not None:
+            result["reranked_from"] = reranked_from
+            result["rerank_ms"] = round(rerank_ms, 2)
+        # Returned as a response so paper records skip jsonable_encoder and go straight to orjson
+        return ORJSONResponse(result)
         
+    except ClientDisconnected:
+        return client_closed_request()
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error searching papers: {e}")
         raise HTTPException(status_code=500, detail="Failed to search papers")
 
-@app.post("/api/chat")
-async def chat_with_paper(request: ChatRequest):
+def client_closed_request() -> Response:
+    """Nobody will read it, but the request still gets a status: nginx's 499 Client Closed Request"""
+    return Response(status_code=499)
+
+def ndjson_line(data: dict) -> bytes:
+    """Encode one newline-delimited JSON record"""
+    return orjson.dumps(data) + b"\n"
+
+@app.get("/api/papers/stream", dependencies=[Depends(limit_search)])
+async def search_papers_stream(q: str, limit: int = 10, rerank: Optional[bool] = None):
+    """Search for papers, streaming each result as an NDJSON line as soon as it is parsed
+    
+    Lines are {"type": "paper", "paper": ...} in arXiv relevance order, then
+    {"type": "done", "count": n}. When re-ranking applies, the same
+    over-fetched candidates as /api/papers are ranked, so both endpoints
+    return the same papers: the first `limit` stream as they arrive, any
+    later candidate promoted into the top `limit` follows as a paper line
+    marked "promoted", and the done line carries the re-ranked "order".
+    """
+    if not arxiv_service:
+        raise HTTPException(status_code=503, detail="ArXiv service not available")
+    
+    query = validate_search(q, limit)
+    use_reranker = reranker is not None and (rerank if rerank is not None else True)
+    logger.info(f"Streaming search for query: {query[:50]}...")
+    
+    started = time.monotonic()
+    
+    # Over-fetch exactly as /api/papers does, which also shares its query cache entry
+    fetch_count = reranker.candidate_count(limit) if use_reranker else limit
+    
+    async def paper_lines():
+        papers = []
+        try:
+            async for paper in deadlines.bounded("search", arxiv_service.aiter_papers(query, fetch_count), started):
+                papers.append(paper)
+                if len(papers) <= limit:
+                    yield ndjson_line({"type": "paper", "paper": paper})
+            
+            shown = papers[:limit]
+            done = {"type": "done", "count": len(shown)}
+            if use_reranker and len(papers) > 1:
+                shown, rerank_ms = await reranker.arerank(query, papers, limit)
+                sent = {paper["id"] for paper in papers[:limit]}
+                for paper in shown:
+                    if paper["id"] not in sent:
+                        yield ndjson_line({"type": "paper", "paper": paper, "promoted": True})
+                done["count"] = len(shown)
+                done["order"] = [paper["id"] for paper in shown]
+                done["reranked_from"] = len(papers)
+                done["rerank_ms"] = round(rerank_ms, 2)
+            if prefetcher:
+                prefetcher.schedule(shown)
+            yield ndjson_line(done)
+        except DeadlineExceeded:
+            # The papers already sent stand; arXiv order, since re-ranking needs the full page
+            yield ndjson_line({"type": "done", "count": min(len(papers), limit), "partial": True})
+        except (asyncio.CancelledError, GeneratorExit):
+            deadlines.record_cancelled("search")
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming search results: {e}")
+            yield ndjson_line({"type": "error", "detail": "Failed to search papers"})
+    
+    return StreamingResponse(
+        paper_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/papers/batch", dependencies=[Depends(limit_search)])
+async def get_papers_batch(request: BatchPapersRequest, http_request: Request):
+    """Resolve many paper IDs at once, fetching only cache misses in a single arXiv request"""
+    try:
+        if not arxiv_service:
+            raise HTTPException(status_code=503, detail="ArXiv service not available")
+        
+        result = {}
+        try:
+            papers = await deadlines.run("search", arxiv_service.aget_papers_by_ids(request.ids), http_request)
+        except DeadlineExceeded:
+            # Papers already cached are still worth returning; the rest are reported missing
+            papers = arxiv_service.cached_papers_by_ids(request.ids)
+            deadlines.record_degraded("search")
+            result["degraded"] = True
+        
+        found = {base_id(paper["id"]) for paper in papers}
+        return ORJSONResponse({
+            "papers": papers,
+            "count": len(papers),
+            "missing": [paper_id for paper_id in request.ids if base_id(paper_id) not in found],
+            **result
+        })
+        
+    except ClientDisconnected:
+        return client_closed_request()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching paper batch: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch papers")
+
+@app.get("/api/papers/{paper_id:path}/summary", dependencies=[Depends(limit_search)])
+async def get_paper_summary(paper_id: str, request: Request, generate: bool = True):
+    """Stored summary, key contributions and suggested questions, generated on first request"""
+    started = time.monotonic()
+    try:
+        if not arxiv_service:
+            raise HTTPException(status_code=503, detail="ArXiv service not available")
+        
+        if not artifact_store:
+            raise HTTPException(status_code=503, detail="Paper summaries are disabled")
+        
+        async def summarize():
+            paper = await arxiv_service.aget_paper_by_id(paper_id)
+            if not paper:
+                raise HTTPException(status_code=404, detail="Paper not found")
+            
+            artifacts = artifact_store.get(paper["id"])
+            if artifacts:
+                return {**artifacts, "cached": True}
+            
+            # generate=false lets the UI show a summary only when it costs nothing
+            if not generate:
+                raise HTTPException(status_code=404, detail="Summary not generated yet")
+            
+            if not llm_service:
+                raise HTTPException(status_code=503, detail="LLM service not available - please check API keys")
+            
+            # Reading a stored summary is a lookup; generating one costs an LLM call like a chat turn
+            await limit_chat(request)
+            excerpts = await rag_service.aretrieve(paper, "main contributions and results") if rag_service else []
+            
+            async def generate_artifacts(paper: dict):
+                async with llm_admission.slot():
+                    return await llm_service.agenerate_artifacts(paper, excerpts)
+            
+            try:
+                artifacts = await artifact_store.aget_or_generate(paper, generate_artifacts)
+            except RateLimitExceeded as e:
+                raise too_many_requests(e)
+            
+            if not artifacts:
+                raise HTTPException(status_code=502, detail="Failed to generate a summary, please retry")
+            return {**artifacts, "cached": False}
+        
+        try:
+            return await deadlines.run("summary", summarize(), request, started)
+        except DeadlineExceeded:
+            # Generation is shared with concurrent callers and keeps going, so a retry can pick it up
+            raise HTTPException(status_code=504, detail="Summary is taking longer than expected, please retry shortly")
+        
+    except ClientDisconnected:
+        return client_closed_request()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting paper summary: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get paper summary")
+
+def fallback_answer(paper_id: str) -> Optional[str]:
+    """Stored summary and contributions, offered when a chat answer runs out of time"""
+    artifacts = artifact_store.get(paper_id) if artifact_store else None
+    if not artifacts:
+        return None
+    lines = ["*The full answer took too long, so here is the paper's stored summary instead.*", "",
+             artifacts["summary"]]
+    if artifacts["contributions"]:
+        lines += ["", "**Key contributions:**"] + [f"- {item}" for item in artifacts["contributions"]]
+    return "\n".join(lines)
+
+@app.post("/api/chat", dependencies=[Depends(limit_chat)])
+async def chat_with_paper(request: ChatRequest, http_request: Request):
     """Chat about a paper with validation and rate limiting"""
     try:
         # Check service availability
@@ -156,24 +678,240 @@ async def chat_with_paper(request: ChatRequest):
         
         logger.info(f"Chat request for paper: {request.paper_id[:20]}...")
         
-        # Get paper details
-        paper = arxiv_service.get_paper_by_id(request.paper_id)
+        session_id = request.session_id or uuid.uuid4().hex
         
-        if not paper:
-            raise HTTPException(status_code=404, detail="Paper not found")
+        async def answer():
+            # Get paper details
+            paper = await arxiv_service.aget_paper_by_id(request.paper_id)
+            
+            if not paper:
+                raise HTTPException(status_code=404, detail="Paper not found")
+            
+            if prefetcher:
+                prefetcher.record_use(paper["id"])
+            
+            # Pull the most relevant full-text passages into the prompt
+            excerpts = await rag_service.aretrieve(paper, request.message) if rag_service else []
+            
+            history = conversation_store.history(session_id, paper["id"])
+            
+            # Generate response using improved LLM service
+            route = {}
+            try:
+                async with llm_admission.slot():
+                    response = await llm_service.achat_about_paper(
+                        paper, request.message, excerpts, history, route, artifacts=prompt_artifacts(paper)
+                    )
+            except RateLimitExceeded as e:
+                raise too_many_requests(e)
+            return paper, response, route
+        
+        try:
+            paper, response, route = await deadlines.run("chat", answer(), http_request)
+        except DeadlineExceeded:
+            # Nothing is added to the conversation, so asking again starts clean
+            response = fallback_answer(request.paper_id)
+            if response is None:
+                raise HTTPException(status_code=504, detail="Response timed out, please retry")
+            deadlines.record_degraded("chat")
+            return {"response": response, "session_id": session_id, "routing": {}, "degraded": True}
         
-        # Generate response using improved LLM service
-        response = llm_service.chat_about_paper(paper, request.message)
+        conversation_store.append(session_id, paper["id"], "user", request.message)
+        conversation_store.append(session_id, paper["id"], "assistant", response)
         
         logger.info(f"Generated response for paper: {request.paper_id[:20]}...")
-        return {"response": response, "paper_title": paper.get("title", "")[:100]}
+        return {
+            "response": response,
+            "paper_title": paper.get("title", "")[:100],
+            "session_id": session_id,
+            "routing": route
+        }
         
+    except ClientDisconnected:
+        return client_closed_request()
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error in chat: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate response")
 
+@app.post("/api/chat/multi", dependencies=[Depends(limit_chat)])
+async def chat_with_papers(request: MultiChatRequest, http_request: Request):
+    """Ask one question across several papers, e.g. to compare bookmarked papers"""
+    try:
+        if not arxiv_service:
+            raise HTTPException(status_code=503, detail="ArXiv service not available")
+        
+        if not llm_service:
+            raise HTTPException(status_code=503, detail="LLM service not available - please check API keys")
+        
+        logger.info(f"Multi-paper chat request for {len(request.paper_ids)} papers")
+        
+        session_id = request.session_id or uuid.uuid4().hex
+        
+        async def answer():
+            papers = await arxiv_service.aget_papers_by_ids(request.paper_ids)
+            if len(papers) < len(request.paper_ids):
+                raise HTTPException(status_code=404, detail="One or more papers not found")
+            
+            excerpts = []
+            if rag_service:
+                excerpts = await asyncio.gather(*(
+                    rag_service.aretrieve(paper, request.message, settings.MULTI_CHAT_EXCERPTS_PER_PAPER)
+                    for paper in papers
+                ))
+            
+            # One conversation per set of papers, independent of the order they were sent in
+            conversation_key = "multi:" + ",".join(sorted(paper["id"] for paper in papers))
+            history = conversation_store.history(session_id, conversation_key)
+            
+            route = {}
+            try:
+                async with llm_admission.slot():
+                    response = await llm_service.achat_about_papers(papers, request.message, excerpts, history, route)
+            except RateLimitExceeded as e:
+                raise too_many_requests(e)
+            return papers, conversation_key, response, route
+        
+        try:
+            papers, conversation_key, response, route = await deadlines.run("chat", answer(), http_request)
+        except DeadlineExceeded:
+            raise HTTPException(status_code=504, detail="Response timed out, please retry")
+        
+        conversation_store.append(session_id, conversation_key, "user", request.message)
+        conversation_store.append(session_id, conversation_key, "assistant", response)
+        
+        return {
+            "response": response,
+            "paper_titles": [paper.get("title", "")[:100] for paper in papers],
+            "session_id": session_id,
+            "routing": route
+        }
+        
+    except ClientDisconnected:
+        return client_closed_request()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in multi-paper chat: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate response")
+
+def sse_event(event: str, data: dict) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/chat/stream", dependencies=[Depends(limit_chat)])
+async def chat_with_paper_stream(request: ChatRequest, http_request: Request):
+    """Chat about a paper, streaming the response as Server-Sent Events"""
+    # The budget covers the paper lookup, retrieval and queueing for a slot, not just the stream
+    started = time.monotonic()
+    try:
+        # Check service availability
+        if not arxiv_service:
+            raise HTTPException(status_code=503, detail="ArXiv service not available")
+        
+        if not llm_service:
+            raise HTTPException(status_code=503, detail="LLM service not available - please check API keys")
+        
+        logger.info(f"Streaming chat request for paper: {request.paper_id[:20]}...")
+        
+        session_id = request.session_id or uuid.uuid4().hex
+        
+        async def prepare():
+            # Get paper details before the stream starts so errors still map to status codes
+            paper = await arxiv_service.aget_paper_by_id(request.paper_id)
+            
+            if not paper:
+                raise HTTPException(status_code=404, detail="Paper not found")
+            
+            if prefetcher:
+                prefetcher.record_use(paper["id"])
+            
+            excerpts = await rag_service.aretrieve(paper, request.message) if rag_service else []
+            history = conversation_store.history(session_id, paper["id"])
+            artifacts = prompt_artifacts(paper)
+            
+            # Take the LLM slot last, before streaming starts, so a full queue is still a 429.
+            # Nothing runs after it until the response owns the slot, so no error path can hold one.
+            try:
+                acquired_at = await llm_admission.acquire()
+            except RateLimitExceeded as e:
+                raise too_many_requests(e)
+            return paper, excerpts, history, artifacts, acquired_at
+        
+        try:
+            paper, excerpts, history, artifacts, acquired_at = await deadlines.run(
+                "chat_stream", prepare(), http_request, started
+            )
+        except DeadlineExceeded:
+            raise HTTPException(status_code=504, detail="Response timed out, please retry")
+        
+    except ClientDisconnected:
+        return client_closed_request()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in chat stream: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate response")
+    
+    async def event_stream():
+        tokens = []
+        route = {}
+        done = {"paper_title": paper.get("title", "")[:100], "session_id": session_id, "routing": route}
+        try:
+            async for token in deadlines.bounded("chat_stream", llm_service.astream_chat_about_paper(
+                paper, request.message, excerpts, history, route, artifacts
+            ), started):
+                tokens.append(token)
+                yield sse_event("token", {"token": token})
+            
+            conversation_store.append(session_id, paper["id"], "user", request.message)
+            conversation_store.append(session_id, paper["id"], "assistant", "".join(tokens))
+            yield sse_event("done", done)
+        except DeadlineExceeded:
+            # Keep what was streamed so follow-up questions see the same answer the user did
+            conversation_store.append(session_id, paper["id"], "user", request.message)
+            conversation_store.append(session_id, paper["id"], "assistant", "".join(tokens))
+            yield sse_event("done", {**done, "partial": True})
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client went away; closing the token stream cancels the provider request
+            deadlines.record_cancelled("chat_stream")
+            raise
+        except Exception as e:
+            logger.error(f"Error in chat stream: {e}")
+            yield sse_event("error", {"detail": "Failed to generate response"})
+    
+    async def release_slot():
+        llm_admission.release(acquired_at)
+    
+    # Released as a background task, which runs even when the client disconnects mid-stream
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-ID": session_id},
+        background=BackgroundTask(release_slot)
+    )
+
+@app.get("/api/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": time.time()}
+
+@app.get("/api/health/ready")
+async def readiness():
+    """Readiness probe from cached upstream samples; never calls arXiv itself"""
+    upstream = arxiv_prober.snapshot() if arxiv_prober else {"status": "unavailable"}
+    ready = bool(arxiv_service) and upstream["status"] != "down"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "timestamp": time.time(),
+            "upstreams": {"arxiv_api": upstream},
+            "llm_service": "available" if llm_service else "no_api_keys"
+        }
+    )
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint for Railway"""
@@ -182,14 +920,9 @@ async def health_check():
         arxiv_status = "healthy" if arxiv_service else "unavailable"
         llm_status = "healthy" if llm_service else "no_api_keys"
         
-        # Only test ArXiv if service is available
-        if arxiv_service:
-            try:
-                test_papers = arxiv_service.search_papers("machine learning", 1)
-                if not test_papers:
-                    arxiv_status = "degraded"
-            except:
-                arxiv_status = "degraded"
+        # Upstream status comes from the background prober, keeping this check O(1)
+        if arxiv_prober and arxiv_prober.status() in ("degraded", "down"):
+            arxiv_status = "degraded"
         
         # Overall status - healthy if at least basic functionality works
         overall_status = "healthy" if arxiv_service else "degraded"
@@ -220,9 +953,74 @@ async def get_stats():
         "app": "ArxivChat",
         "version": "1.0.0",
         "features": ["paper_search", "ai_chat", "paper_focused_responses"],
-        "apis": ["arxiv", "groq", "gemini"]
+        "apis": ["arxiv", "groq", "gemini"],
+        "cache": arxiv_service.cache_stats() if arxiv_service else {},
+        "local_index": arxiv_service.local_index.stats() if arxiv_service and arxiv_service.local_index else None,
+        "conversations": conversation_store.stats() if conversation_store else {},
+        "llm": llm_service.stats() if llm_service else {},
+        "rerank": reranker.stats() if reranker else None,
+        "admission": llm_admission.stats() if llm_admission else {},
+        "prefetch": prefetcher.stats() if prefetcher else None,
+        "artifacts": artifact_store.stats() if artifact_store else None,
+        "loop_lag": loop_lag.stats() if loop_lag else None,
+        "slow_requests": slow_requests.stats() if slow_requests else None,
+        "deadlines": deadlines.stats() if deadlines else None,
+        "rate_limits": {
+            limiter.name: limiter.stats() for limiter in (search_limiter, chat_limiter) if limiter
+        }
     }
 
+def require_admin(request: Request):
+    """Admin endpoints answer only to the configured token; without one they don't exist"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    authorization = request.headers.get("authorization", "")
+    token = request.headers.get("x-admin-token") or authorization.removeprefix("Bearer ").strip()
+    if not secrets.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/api/admin/profile", dependencies=[Depends(require_admin)], include_in_schema=False)
+async def profile_process(seconds: float = 10, interval: Optional[float] = None, format: str = "collapsed"):
+    """Sample every thread's stack for a while: collapsed stacks for flamegraph tools, or a JSON summary"""
+    if seconds <= 0 or seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"Seconds must be between 0 and {settings.PROFILE_MAX_SECONDS:g}")
+    
+    if interval is not None and not 0.001 <= interval <= 1:
+        raise HTTPException(status_code=400, detail="Interval must be between 0.001 and 1 seconds")
+    
+    if format not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail="Format must be collapsed or json")
+    
+    try:
+        result = await profiler.profile(seconds, interval)
+    except ProfileInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if format == "json":
+        return {
+            "seconds": result["seconds"],
+            "samples": result["samples"],
+            "loop_lag": result["loop_lag"],
+            "stacks": top_stacks(result["counts"], 100)
+        }
+    return PlainTextResponse(collapse(result["counts"]), headers={
+        "X-Profile-Samples": str(result["samples"]),
+        "X-Loop-Lag-Max-Ms": str(result["loop_lag"]["max_ms"])
+    })
+
+@app.get("/api/admin/slow-requests", dependencies=[Depends(require_admin)], include_in_schema=False)
+async def get_slow_requests():
+    """Stacks sampled from the most recent requests over the slow-request threshold, newest first"""
+    if not slow_requests:
+        return {"enabled": False, "recent": []}
+    return {"enabled": True, **slow_requests.stats(), "recent": list(reversed(slow_requests.recent))}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc: HTTPException):
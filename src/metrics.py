@@ -0,0 +1,211 @@
+"""
+Minimal Prometheus metrics and per-request stage timing
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stage timings collected for the current request, exported as a Server-Timing header
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+class Metric:
+    """Base class holding one value per label set"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted(labels.items()))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = buckets
+        self._series: Dict[Tuple[Tuple[str, str], ...], list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            for labels, series in self._series.items():
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', str(bound)),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Holds metrics plus collectors that report values owned elsewhere at scrape time"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], List[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[Metric]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        metrics = list(self._metrics)
+        for collector in self._collectors:
+            metrics.extend(collector())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "arxivchat_request_duration_seconds", "HTTP request latency by route"
+))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "arxivchat_requests_in_flight", "HTTP requests currently being served"
+))
+REQUEST_ERRORS = REGISTRY.register(Counter(
+    "arxivchat_request_errors_total", "HTTP responses with a 5xx status by route"
+))
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "arxivchat_stage_duration_seconds", "Latency of each stage of request handling"
+))
+LLM_LATENCY = REGISTRY.register(Histogram(
+    "arxivchat_llm_duration_seconds", "LLM call latency by provider"
+))
+LLM_ERRORS = REGISTRY.register(Counter(
+    "arxivchat_llm_errors_total", "Failed LLM calls by provider"
+))
+LLM_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "arxivchat_llm_queue_depth", "Requests waiting for an LLM concurrency slot"
+))
+LLM_SLOTS_IN_USE = REGISTRY.register(Gauge(
+    "arxivchat_llm_slots_in_use", "LLM concurrency slots currently held"
+))
+ADMISSION_REJECTIONS = REGISTRY.register(Counter(
+    "arxivchat_llm_admission_rejections_total", "LLM requests rejected with 429 by reason"
+))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "arxivchat_rate_limited_total", "Requests rejected by a per-client rate limiter"
+))
+EVENT_LOOP_LAG = REGISTRY.register(Gauge(
+    "arxivchat_event_loop_lag_seconds", "How late the event loop last ran a timer callback"
+))
+SLOW_REQUESTS = REGISTRY.register(Counter(
+    "arxivchat_slow_requests_total", "Requests over the slow-request threshold by route"
+))
+DEADLINE_TIMEOUTS = REGISTRY.register(Counter(
+    "arxivchat_deadline_timeouts_total", "Requests whose work was cancelled at their deadline by endpoint"
+))
+CLIENT_DISCONNECTS = REGISTRY.register(Counter(
+    "arxivchat_client_disconnects_total", "Requests whose work was cancelled because the client left by endpoint"
+))
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block as a named stage, in the stage histogram and the request's Server-Timing"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start_time
+        STAGE_LATENCY.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def timed_stage(stage: str):
+    """Decorator form of stage_timer for blocking functions"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    """Begin collecting stage timings for the current request"""
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """Format timings as a Server-Timing header value, summing repeated stages"""
+    totals: Dict[str, float] = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    parts = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
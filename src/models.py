@@ -1,8 +1,9 @@
 """
 Simple data models for ArxivChat
 """
+from dataclasses import dataclass, fields
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple
 from datetime import datetime
 
 class Paper(BaseModel):
@@ -14,6 +15,59 @@ class Paper(BaseModel):
     pdf_url: str
     categories: List[str]
 
+@dataclass(slots=True, frozen=True)
+class PaperRecord:
+    """Paper metadata as held by the services, caches and API responses
+    
+    A slotted, immutable record with tuple fields is a fraction of the size
+    of the equivalent dict and serializes natively with orjson. Read access
+    by key (paper["title"], paper.get(...), {**paper}) is kept so code that
+    treats papers as mappings works unchanged.
+    """
+    id: str
+    title: str
+    authors: Tuple[str, ...]
+    abstract: str
+    published: str
+    pdf_url: str
+    categories: Tuple[str, ...]
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in PAPER_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in PAPER_FIELDS
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in PAPER_FIELDS else default
+    
+    def keys(self) -> Tuple[str, ...]:
+        return PAPER_FIELDS
+    
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in PAPER_FIELDS}
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "PaperRecord":
+        """Record from a paper dict, e.g. one decoded from a persistent cache; extra keys are dropped"""
+        return cls(
+            id=data["id"],
+            title=data["title"],
+            authors=tuple(data["authors"]),
+            abstract=data["abstract"],
+            published=data["published"],
+            pdf_url=data["pdf_url"],
+            categories=tuple(data["categories"])
+        )
+    
+    @classmethod
+    def coerce(cls, paper) -> "PaperRecord":
+        return paper if isinstance(paper, cls) else cls.from_dict(paper)
+
+PAPER_FIELDS = tuple(field.name for field in fields(PaperRecord))
+
 class ChatMessage(BaseModel):
     role: str  # "user" or "assistant"
     content: str
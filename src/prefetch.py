@@ -0,0 +1,123 @@
+"""
+Background warm-up of the top search results, ahead of the user opening one
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Callable, List, Optional
+from config import settings
+from local_index import base_id
+
+logger = logging.getLogger(__name__)
+
+class Prefetcher:
+    """Warms the full-text index (and optionally a summary answer) for top-ranked results
+
+    Search already fills the paper cache, so warming covers what the first
+    chat turn would otherwise pay for: the PDF download and indexing, and
+    with PREFETCH_SUMMARY an LLM summary stored in the response cache.
+    Indexes are built on the RAG service's background pool, smaller than
+    and separate from the one serving chats, and only that many papers
+    warm at once; past max_pending the oldest queued warm-ups are
+    cancelled in favour of the latest search.
+
+    The summary is cached as the answer to a user's first question, so it
+    is asked with the same RAG excerpts and stored artifacts (from
+    `artifacts`, a paper -> artifacts callable) as a live chat would use.
+    """
+
+    def __init__(self, llm_service=None, rag_service=None, admission=None,
+                 artifacts: Optional[Callable[[dict], Optional[dict]]] = None):
+        self.llm_service = llm_service
+        self.rag_service = rag_service
+        self.admission = admission
+        self.artifacts = artifacts
+        self.top_k = settings.PREFETCH_TOP_K
+        self.max_pending = settings.PREFETCH_MAX_PENDING
+        self.summarize = settings.PREFETCH_SUMMARY
+        concurrency = rag_service.background_workers if rag_service else settings.PREFETCH_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = OrderedDict()  # base paper ID -> asyncio.Task
+        self._warmed = OrderedDict()  # base paper ID -> search rank, awaiting a chat
+        self.scheduled = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.used = 0
+        self.used_by_rank = [0] * self.top_k
+
+    def schedule(self, papers: List[dict]):
+        """Queue warm-ups for the top-k papers of a search result"""
+        for rank, paper in enumerate(papers[:self.top_k]):
+            key = base_id(paper["id"])
+            if key in self._tasks or key in self._warmed:
+                continue
+            self._tasks[key] = asyncio.create_task(self._warm(key, paper, rank))
+            self.scheduled += 1
+
+        while len(self._tasks) > self.max_pending:
+            _, task = self._tasks.popitem(last=False)
+            task.cancel()
+            self.cancelled += 1
+
+    async def _warm(self, key: str, paper: dict, rank: int):
+        try:
+            async with self._semaphore:
+                if self.rag_service and not await self.rag_service.awarm(paper):
+                    # The build failed (already logged); a chat would fall back to the abstract
+                    self.failed += 1
+                    return
+                if self.summarize and self.llm_service and self._llm_idle():
+                    await self._summarize(paper)
+            self.completed += 1
+            self._warmed[key] = rank
+            while len(self._warmed) > settings.PREFETCH_TRACKED_PAPERS:
+                self._warmed.popitem(last=False)
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"⚠️ Prefetch failed for {key}: {e}")
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+
+    async def _summarize(self, paper: dict):
+        question = settings.PREFETCH_SUMMARY_QUESTION
+        excerpts = await self.rag_service.aretrieve(paper, question, background=True) if self.rag_service else []
+        artifacts = self.artifacts(paper) if self.artifacts else None
+        async with self.admission.slot():
+            await self.llm_service.achat_about_paper(paper, question, excerpts, artifacts=artifacts)
+
+    def _llm_idle(self) -> bool:
+        """Only spend LLM capacity on speculation while at most half the slots are busy"""
+        if self.admission is None:
+            return False
+        return self.admission.in_use + self.admission.waiting <= self.admission.max_concurrent // 2
+
+    def record_use(self, paper_id: str):
+        """Count a chat about a paper this prefetcher warmed (once per warm-up)"""
+        rank: Optional[int] = self._warmed.pop(base_id(paper_id), None)
+        if rank is not None:
+            self.used += 1
+            self.used_by_rank[rank] += 1
+
+    async def stop(self):
+        """Cancel outstanding warm-ups"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        self.cancelled += len(tasks)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self) -> dict:
+        return {
+            "top_k": self.top_k,
+            "scheduled": self.scheduled,
+            "pending": len(self._tasks),
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "used": self.used,
+            "hit_rate": round(self.used / self.completed, 3) if self.completed else 0.0,
+            "used_by_rank": self.used_by_rank
+        }
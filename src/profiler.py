@@ -0,0 +1,265 @@
+"""
+On-demand sampling profiler, event-loop lag monitor and slow-request sampler
+
+Stacks are sampled from every thread with sys._current_frames() on a
+background thread, so work on the event loop, in the arXiv and RAG worker
+pools and in blocking calls all shows up. Samples are folded into the
+collapsed-stack format read by flamegraph.pl, speedscope and inferno.
+Nothing samples while no profile is running and no request is slow.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import List, Optional, Tuple
+from metrics import EVENT_LOOP_LAG, SLOW_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames of pool threads waiting for work; counting them would bury the busy stacks
+IDLE_LEAVES = (
+    ("thread:_worker",),                # concurrent.futures pools
+    ("threading:wait", "queue:get"),    # AnyIO worker threads
+)
+# How often a profile checks how late the event loop wakes it
+LAG_PROBE_INTERVAL = 0.05
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}"
+
+def is_idle(labels: List[str]) -> bool:
+    """Whether an innermost-first stack is a pool thread waiting for work"""
+    return any(tuple(labels[:len(leaf)]) == leaf for leaf in IDLE_LEAVES)
+
+def collapse(counts: Counter) -> str:
+    """Collapsed-stack text: one "thread;outer;...;inner count" line per stack, heaviest first"""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common() if count > 0)
+
+def top_stacks(counts: Counter, limit: int) -> List[dict]:
+    return [{"stack": stack, "count": count} for stack, count in counts.most_common(limit) if count > 0]
+
+def lag_stats(lags: List[float]) -> dict:
+    if not lags:
+        return {"samples": 0, "avg_ms": 0.0, "max_ms": 0.0}
+    return {
+        "samples": len(lags),
+        "avg_ms": round(sum(lags) / len(lags) * 1000, 2),
+        "max_ms": round(max(lags) * 1000, 2)
+    }
+
+
+class ProfileInProgress(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+class StackSampler:
+    """Samples every other thread's stack on an interval into collapsed-stack counts"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = 0
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self, join: bool = True) -> Tuple[int, Counter]:
+        """Signal the thread to stop and return the counts
+
+        join=True waits for a sample in progress to land in the counts; it
+        blocks, so on the event loop call it through an executor or pass
+        join=False, which leaves the thread to exit on its own.
+        """
+        self._stop.set()
+        if join and self._thread is not None:
+            self._thread.join()
+        return self.snapshot()
+
+    def snapshot(self) -> Tuple[int, Counter]:
+        """(samples taken, stack counts) so far"""
+        with self._lock:
+            return self.samples, Counter(self.counts)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame))
+                    frame = frame.f_back
+                if not labels or is_idle(labels):
+                    continue
+                labels.append(names.get(ident, f"thread-{ident}"))
+                stacks.append(";".join(reversed(labels)))
+            with self._lock:
+                self.samples += 1
+                self.counts.update(stacks)
+
+
+class Profiler:
+    """Runs one on-demand profile at a time, measuring event-loop lag alongside"""
+
+    def __init__(self, interval: float, max_seconds: float):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.running = False
+        self.profiles = 0
+
+    async def profile(self, seconds: float, interval: Optional[float] = None) -> dict:
+        """Sample for `seconds` without blocking the loop; returns samples, stack counts and loop lag"""
+        if self.running:
+            raise ProfileInProgress("A profile is already running")
+        self.running = True
+        seconds = min(seconds, self.max_seconds)
+        sampler = StackSampler(interval or self.interval)
+        loop = asyncio.get_running_loop()
+        lags = []
+        sampler.start()
+        try:
+            deadline = loop.time() + seconds
+            while loop.time() < deadline:
+                expected = loop.time() + LAG_PROBE_INTERVAL
+                await asyncio.sleep(LAG_PROBE_INTERVAL)
+                lags.append(max(0.0, loop.time() - expected))
+        finally:
+            try:
+                samples, counts = await loop.run_in_executor(None, sampler.stop)
+            finally:
+                self.running = False
+        self.profiles += 1
+        logger.info(f"📊 Profiled {seconds:.1f}s: {samples} samples, {len(counts)} distinct stacks")
+        return {"seconds": seconds, "samples": samples, "counts": counts, "loop_lag": lag_stats(lags)}
+
+
+class SlowRequestSampler:
+    """Samples stacks while any request has been running longer than the threshold
+
+    Every request arms a timer and only requests that outlive it start the
+    sampler, so a fast request costs one timer handle. Concurrent slow
+    requests share the sampler; each keeps the stacks seen while it was slow.
+    """
+
+    def __init__(self, threshold: float, interval: float, keep: int = 20, top: int = 10):
+        self.threshold = threshold
+        self.interval = interval
+        self.top = top
+        self.recent = deque(maxlen=keep)
+        self.slow = 0
+        self._sampler: Optional[StackSampler] = None
+        self._active = 0
+
+    def watch(self) -> dict:
+        """Arm the threshold timer for a request starting now"""
+        watch = {"baseline": None}
+        watch["timer"] = asyncio.get_running_loop().call_later(self.threshold, self._begin, watch)
+        return watch
+
+    def _begin(self, watch: dict):
+        if self._sampler is None:
+            self._sampler = StackSampler(self.interval)
+            self._sampler.start()
+        self._active += 1
+        watch["baseline"] = self._sampler.snapshot()
+
+    def finish(self, watch: dict, method: str, route: str, seconds: float,
+               timings: Optional[List[Tuple[str, float]]] = None) -> Optional[dict]:
+        """Disarm the timer; for a slow request, record and log the stacks sampled while it ran
+        
+        Stage timings are kept with the stacks: a request waiting on arXiv or
+        an LLM leaves the loop idle, and the stages say what it waited for.
+        """
+        watch["timer"].cancel()
+        if watch["baseline"] is None:
+            return None
+
+        samples, counts = self._sampler.snapshot()
+        baseline_samples, baseline_counts = watch["baseline"]
+        self._active -= 1
+        if self._active == 0:
+            # Runs in the request middleware: signal only, never wait on the thread from the loop
+            self._sampler.stop(join=False)
+            self._sampler = None
+
+        counts.subtract(baseline_counts)
+        stacks = top_stacks(counts, self.top)
+        stages = {}
+        for stage, elapsed in timings or []:
+            stages[stage] = stages.get(stage, 0.0) + elapsed
+        entry = {
+            "method": method,
+            "route": route,
+            "seconds": round(seconds, 3),
+            "finished_at": time.time(),
+            "stages": {stage: round(elapsed * 1000, 1) for stage, elapsed in stages.items()},
+            "samples": samples - baseline_samples,
+            "stacks": stacks
+        }
+        self.recent.append(entry)
+        self.slow += 1
+        SLOW_REQUESTS.inc(route=route)
+        hottest = stacks[0]["stack"] if stacks else "no samples"
+        logger.warning(f"🐢 Slow request {method} {route} took {seconds:.2f}s; hottest stack: {hottest}")
+        return entry
+
+    def stats(self) -> dict:
+        return {"threshold_seconds": self.threshold, "slow": self.slow, "sampling": self._active > 0}
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a periodic timer, i.e. how long it was blocked"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self.count = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected))
+
+    def record(self, lag: float):
+        self.last = lag
+        self.max = max(self.max, lag)
+        self.total += lag
+        self.count += 1
+        EVENT_LOOP_LAG.set(lag)
+
+    def stats(self) -> dict:
+        return {
+            "interval_ms": round(self.interval * 1000, 1),
+            "last_ms": round(self.last * 1000, 2),
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 2)
+        }
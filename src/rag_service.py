@@ -0,0 +1,228 @@
+"""
+Full-text retrieval over paper PDFs
+"""
+import asyncio
+import contextvars
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Optional
+import numpy as np
+import requests
+from config import settings
+from embeddings import get_embedder
+from metrics import timed_stage
+
+logger = logging.getLogger(__name__)
+
+class RAGService:
+    """Downloads each paper's PDF once, chunks and embeds it, and retrieves top-k chunks
+
+    Indexes live on disk under RAG_INDEX_DIR, one directory per paper, so every
+    user chatting about the same paper shares them. Vectors are memory-mapped
+    on read, keeping resident memory flat however many papers are indexed.
+    """
+
+    FAILURE_RETRY_SECONDS = 600
+    FAILURE_LIMIT = 1000
+    OPEN_INDEX_LIMIT = 64
+
+    def __init__(self, embedder=None):
+        import pypdf  # noqa: F401 - fail fast so the app falls back to abstract-only chat
+
+        self.embedder = embedder or get_embedder()
+        self.index_dir = settings.RAG_INDEX_DIR
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.RAG_MAX_WORKERS,
+            thread_name_prefix="rag"
+        )
+        # Speculative builds get their own smaller pool so they never queue ahead of a chat
+        self.background_workers = max(1, min(settings.PREFETCH_CONCURRENCY, settings.RAG_MAX_WORKERS - 1))
+        self.background_executor = ThreadPoolExecutor(
+            max_workers=self.background_workers,
+            thread_name_prefix="rag-prefetch"
+        )
+        self._build_locks = {}  # paper_id -> lock, only while a build may be running
+        self._locks_lock = threading.Lock()
+        self._open_indexes = OrderedDict()  # paper_id -> (vectors, chunks)
+        self._failures = OrderedDict()  # paper_id -> time of the last failed build, oldest first
+        logger.info(f"📚 RAG index at {self.index_dir} using {self.embedder.name} embeddings")
+
+    @timed_stage("rag_retrieve")
+    def retrieve(self, paper: dict, question: str, top_k: Optional[int] = None) -> List[str]:
+        """Return the chunks of the paper's full text most relevant to the question"""
+        index = self._load_or_build(paper)
+        if index is None:
+            return []
+
+        vectors, chunks = index
+        top_k = min(top_k or settings.RAG_TOP_K, len(chunks))
+        if top_k == 0:
+            return []
+
+        query = self.embedder.embed([question])[0]
+        scores = vectors @ query
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        # Keep document order so the excerpts read naturally in the prompt
+        return [chunks[i] for i in sorted(best)]
+
+    async def aretrieve(self, paper: dict, question: str, top_k: Optional[int] = None,
+                        background: bool = False) -> List[str]:
+        """Retrieve without blocking the event loop; PDF ingestion runs on the service pool
+
+        Speculative callers pass background=True to use the prefetch pool.
+        """
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.background_executor if background else self.executor,
+            partial(ctx.run, self.retrieve, paper, question, top_k)
+        )
+
+    async def awarm(self, paper: dict) -> bool:
+        """Open or build the paper's index on the background pool; False if it is unavailable"""
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(self.background_executor, self._load_or_build, paper)
+        return index is not None
+
+    def _load_or_build(self, paper: dict):
+        paper_id = paper["id"]
+        with self._locks_lock:
+            if paper_id in self._open_indexes:
+                self._open_indexes.move_to_end(paper_id)
+                return self._open_indexes[paper_id]
+
+        if self._recently_failed(paper_id):
+            return None
+
+        # One build per paper even when several chats arrive at once
+        with self._locks_lock:
+            lock = self._build_locks.setdefault(paper_id, threading.Lock())
+        with lock:
+            try:
+                index = self._load(paper_id)
+                if index is None:
+                    self._build(paper)
+                    index = self._load(paper_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Full-text index unavailable for {paper_id}, using abstract only: {e}")
+                self._record_failure(paper_id)
+                return None
+            finally:
+                # Later callers find the index on disk (or the failure), so the lock is no longer needed
+                with self._locks_lock:
+                    if self._build_locks.get(paper_id) is lock:
+                        del self._build_locks[paper_id]
+
+        with self._locks_lock:
+            self._open_indexes[paper_id] = index
+            while len(self._open_indexes) > self.OPEN_INDEX_LIMIT:
+                self._open_indexes.popitem(last=False)
+        return index
+
+    def _recently_failed(self, paper_id: str) -> bool:
+        with self._locks_lock:
+            failed_at = self._failures.get(paper_id)
+            if failed_at is None:
+                return False
+            if time.time() - failed_at < self.FAILURE_RETRY_SECONDS:
+                return True
+            del self._failures[paper_id]
+            return False
+
+    def _record_failure(self, paper_id: str):
+        with self._locks_lock:
+            self._failures.pop(paper_id, None)
+            self._failures[paper_id] = time.time()
+            while len(self._failures) > self.FAILURE_LIMIT:
+                self._failures.popitem(last=False)
+
+    def _paper_dir(self, paper_id: str) -> str:
+        return os.path.join(self.index_dir, re.sub(r"[^A-Za-z0-9._-]", "_", paper_id))
+
+    def _load(self, paper_id: str):
+        """Open an existing index built with the current embedder"""
+        paper_dir = self._paper_dir(paper_id)
+        try:
+            with open(os.path.join(paper_dir, "chunks.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["embedder"] != self.embedder.name:
+                return None
+            vectors = np.load(os.path.join(paper_dir, "vectors.npy"), mmap_mode="r")
+            return vectors, meta["chunks"]
+        except FileNotFoundError:
+            return None
+
+    def _build(self, paper: dict):
+        start_time = time.perf_counter()
+        text = self._extract_text(self._download_pdf(paper["pdf_url"]))
+        chunks = self._chunk(text)
+        if not chunks:
+            raise ValueError("no text extracted from PDF")
+        vectors = self.embedder.embed(chunks)
+
+        # Write to a temporary directory and swap it in so readers never see half an index
+        paper_dir = self._paper_dir(paper["id"])
+        tmp_dir = f"{paper_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        np.save(os.path.join(tmp_dir, "vectors.npy"), vectors)
+        with open(os.path.join(tmp_dir, "chunks.json"), "w", encoding="utf-8") as f:
+            json.dump({"embedder": self.embedder.name, "chunks": chunks}, f)
+        try:
+            if os.path.isdir(paper_dir):
+                for name in os.listdir(paper_dir):
+                    os.remove(os.path.join(paper_dir, name))
+                os.rmdir(paper_dir)
+            os.replace(tmp_dir, paper_dir)
+        except OSError:
+            # Another worker swapped in its own build of this paper first; that index is as good as ours
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if self._load(paper["id"]) is None:
+                raise
+            logger.info(f"📚 {paper['id']} was indexed by another worker meanwhile, using that index")
+            return
+
+        logger.info(f"📚 Indexed {paper['id']}: {len(chunks)} chunks in {time.perf_counter() - start_time:.2f}s")
+
+    def _download_pdf(self, pdf_url: str) -> bytes:
+        response = requests.get(pdf_url, timeout=settings.RAG_DOWNLOAD_TIMEOUT, stream=True)
+        response.raise_for_status()
+        data = bytearray()
+        for block in response.iter_content(chunk_size=64 * 1024):
+            data.extend(block)
+            if len(data) > settings.RAG_MAX_PDF_BYTES:
+                raise ValueError("PDF exceeds RAG_MAX_PDF_BYTES")
+        return bytes(data)
+
+    @staticmethod
+    def _extract_text(pdf_bytes: bytes) -> str:
+        from pypdf import PdfReader
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+    @staticmethod
+    def _chunk(text: str) -> List[str]:
+        """Split text into overlapping windows of words"""
+        words = text.split()
+        size = settings.RAG_CHUNK_WORDS
+        step = max(size - settings.RAG_CHUNK_OVERLAP, 1)
+        chunks = []
+        for start in range(0, len(words), step):
+            chunks.append(" ".join(words[start:start + size]))
+            if start + size >= len(words):
+                break
+        return chunks
+
+    def shutdown(self):
+        """Release the worker threads"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.background_executor.shutdown(wait=False, cancel_futures=True)
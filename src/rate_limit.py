@@ -0,0 +1,134 @@
+"""
+Per-client rate limiting and admission control for LLM calls
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from metrics import ADMISSION_REJECTIONS, LLM_QUEUE_DEPTH, LLM_SLOTS_IN_USE, RATE_LIMITED
+
+class RateLimitExceeded(Exception):
+    """Raised when a request should be answered with 429; carries the Retry-After seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucketLimiter:
+    """Token bucket per client key: `rate` tokens per second, holding at most `burst`
+
+    Buckets for the least recently seen clients are dropped past max_clients,
+    which only ever forgives a client, never wrongly limits one.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_clients: int = 10000):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"{name} rate limit needs a positive rate and a burst of at least 1")
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.allowed = 0
+        self.limited = 0
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str):
+        """Take one token for the key or raise RateLimitExceeded"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.limited += 1
+                RATE_LIMITED.inc(limiter=self.name)
+                raise RateLimitExceeded("Too many requests", (1 - tokens) / self.rate)
+
+            self._buckets[key] = (tokens - 1, now)
+            self.allowed += 1
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"clients": len(self._buckets), "allowed": self.allowed, "limited": self.limited}
+
+
+class AdmissionController:
+    """Caps concurrent LLM calls, with a bounded queue of callers waiting for a slot
+
+    Callers beyond the queue are rejected straight away rather than piling up
+    coroutines, as are callers that wait longer than queue_timeout.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_use = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.avg_hold_seconds = 5.0  # EWMA of how long a slot is held, for Retry-After
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def _retry_after(self) -> float:
+        """Rough time until a newly queued caller would get a slot"""
+        return self.avg_hold_seconds * (self.waiting + 1) / self.max_concurrent
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        ADMISSION_REJECTIONS.inc(reason=reason)
+        raise RateLimitExceeded("Server is busy, please retry shortly", self._retry_after())
+
+    async def acquire(self) -> float:
+        """Wait for a slot and return the time it was taken; raises RateLimitExceeded if rejected"""
+        # Counters change synchronously, unlike the semaphore whose waiters register on the next loop turn
+        if self.in_use + self.waiting >= self.max_concurrent + self.max_queue:
+            self._reject("queue_full")
+
+        self.waiting += 1
+        LLM_QUEUE_DEPTH.set(self.waiting)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject("queue_timeout")
+        finally:
+            self.waiting -= 1
+            LLM_QUEUE_DEPTH.set(self.waiting)
+
+        self.in_use += 1
+        self.admitted += 1
+        LLM_SLOTS_IN_USE.set(self.in_use)
+        return time.perf_counter()
+
+    def release(self, acquired_at: float):
+        """Give the slot back; pairs with acquire()"""
+        held = time.perf_counter() - acquired_at
+        self.avg_hold_seconds = 0.8 * self.avg_hold_seconds + 0.2 * held
+        self.in_use -= 1
+        LLM_SLOTS_IN_USE.set(self.in_use)
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        acquired_at = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(acquired_at)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_use": self.in_use,
+            "queued": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_hold_ms": round(self.avg_hold_seconds * 1000)
+        }
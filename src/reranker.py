@@ -0,0 +1,161 @@
+"""
+Hybrid semantic + keyword re-ranking of search results
+"""
+import asyncio
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Tuple
+import numpy as np
+from config import settings
+from embeddings import TOKEN_PATTERN, get_embedder
+from metrics import timed_stage
+
+logger = logging.getLogger(__name__)
+
+def paper_text(paper: dict) -> str:
+    return f"{paper['title']}. {paper['abstract']}"
+
+class EmbeddingStore:
+    """float16 paper embeddings in one preallocated matrix, one row per paper ID
+
+    Rows are recycled least-recently-used once the store is full, so memory
+    is fixed at max_entries * dim * 2 bytes.
+    """
+
+    def __init__(self, embedder, max_entries: int):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self.matrix = np.zeros((max_entries, embedder.dim), dtype=np.float16)
+        self._rows = OrderedDict()  # paper_id -> row
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def vectors_for(self, papers: List[dict]) -> np.ndarray:
+        """float32 embeddings for the papers in order, embedding any not yet stored in one batch
+
+        Stored rows are copied out under the lock, so a concurrent eviction
+        cannot overwrite a row after it has been handed out.
+        """
+        unique = dict((p["id"], p) for p in papers)
+        vectors = {}
+        with self._lock:
+            # Refresh this call's hits before any miss is stored, so storing never evicts them
+            for paper_id in unique:
+                row = self._rows.get(paper_id)
+                if row is not None:
+                    self._rows.move_to_end(paper_id)
+                    vectors[paper_id] = self.matrix[row].astype(np.float32)
+            missing = [p for paper_id, p in unique.items() if paper_id not in vectors]
+            self.hits += len(papers) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            embedded = self.embedder.embed([paper_text(p) for p in missing]).astype(np.float16)
+            with self._lock:
+                for paper, vector in zip(missing, embedded):
+                    vectors[paper["id"]] = vector.astype(np.float32)
+                    if paper["id"] in self._rows:
+                        continue
+                    if len(self._rows) < self.max_entries:
+                        row = len(self._rows)
+                    elif next(iter(self._rows)) in unique:
+                        # Only this call's own papers are left to evict; the rest go unstored
+                        continue
+                    else:
+                        _, row = self._rows.popitem(last=False)
+                    self.matrix[row] = vector
+                    self._rows[paper["id"]] = row
+
+        return np.stack([vectors[p["id"]] for p in papers])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._rows),
+                "bytes": self.matrix.nbytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+def bm25_scores(query: str, documents: List[str], k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """Okapi BM25 of the query against each document, with IDF over the documents themselves"""
+    terms = set(TOKEN_PATTERN.findall(query.lower()))
+    docs = [Counter(TOKEN_PATTERN.findall(doc.lower())) for doc in documents]
+    if not terms or not docs:
+        return np.zeros(len(docs), dtype=np.float32)
+
+    lengths = np.array([sum(doc.values()) for doc in docs], dtype=np.float32)
+    avg_length = max(float(lengths.mean()), 1.0)
+    scores = np.zeros(len(docs), dtype=np.float32)
+    for term in terms:
+        tf = np.array([doc.get(term, 0) for doc in docs], dtype=np.float32)
+        df = int(np.count_nonzero(tf))
+        if df == 0:
+            continue
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        scores += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths / avg_length))
+    return scores
+
+
+class Reranker:
+    """Scores over-fetched candidates by embedding cosine plus normalized BM25"""
+
+    def __init__(self, embedder=None):
+        self.embedder = embedder or get_embedder()
+        self.store = EmbeddingStore(self.embedder, settings.RERANK_STORE_MAX_ENTRIES)
+        self.semantic_weight = settings.RERANK_SEMANTIC_WEIGHT
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rerank")
+        self.requests = 0
+        self.total_seconds = 0.0
+
+    @staticmethod
+    def candidate_count(limit: int) -> int:
+        """How many results to fetch so re-ranking has something to choose from"""
+        return max(limit, min(limit * settings.RERANK_OVERFETCH, settings.RERANK_MAX_CANDIDATES))
+
+    @timed_stage("rerank")
+    def rerank(self, query: str, papers: List[dict], limit: int) -> Tuple[List[dict], float]:
+        """Top `limit` papers with a `score` field, plus the time re-ranking took in ms"""
+        start_time = time.perf_counter()
+        if not papers:
+            return [], 0.0
+
+        # Stored rows are float16, handed out widened so the product accumulates in float32
+        vectors = self.store.vectors_for(papers)
+        query_vector = self.embedder.embed([query])[0]
+        semantic = vectors @ query_vector
+        keyword = bm25_scores(query, [paper_text(p) for p in papers])
+        if keyword.max() > 0:
+            keyword /= keyword.max()
+        scores = self.semantic_weight * semantic + (1 - self.semantic_weight) * keyword
+
+        order = np.argsort(-scores, kind="stable")[:limit]
+        ranked = [{**papers[i], "score": round(float(scores[i]), 4)} for i in order]
+
+        elapsed = time.perf_counter() - start_time
+        self.requests += 1
+        self.total_seconds += elapsed
+        return ranked, elapsed * 1000
+
+    async def arerank(self, query: str, papers: List[dict], limit: int) -> Tuple[List[dict], float]:
+        """Re-rank on the service pool so embedding new papers does not block the event loop"""
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, partial(ctx.run, self.rerank, query, papers, limit))
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "avg_ms": round(self.total_seconds / self.requests * 1000, 2) if self.requests else 0.0,
+            "embeddings": self.store.stats()
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,116 @@
+"""
+Semantic cache of LLM answers to repeated questions about the same paper
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from config import settings
+from embeddings import HashingEmbedder
+
+# Filler words that do not change what is being asked about a paper
+STOPWORDS = {
+    "a", "an", "the", "this", "that", "paper", "please", "can", "could", "you",
+    "me", "of", "is", "are", "in", "about", "for", "to", "what", "whats", "tell"
+}
+
+def normalize_question(question: str) -> str:
+    """Lower-case, strip punctuation and filler words
+    
+    A question made only of filler ("What is this paper about?") is kept
+    as asked, so such questions don't all share one empty key.
+    """
+    words = re.findall(r"[a-z0-9]+", question.lower())
+    return " ".join(word for word in words if word not in STOPWORDS) or question.strip().lower()
+
+class ResponseCache:
+    """Answers keyed by paper ID plus question, matched exactly or by embedding similarity
+
+    Similarity matching needs a semantic embedder: feature hashing scores
+    opposite questions ("does X improve Y" / "does X hurt Y") as near
+    duplicates, so with it only exact normalized questions match.
+    Entries expire after the TTL and the least recently used are evicted past
+    the entry cap. Every hit is credited with the latency and estimated
+    tokens of the LLM call that produced the answer.
+    """
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.fuzzy = not isinstance(embedder, HashingEmbedder)
+        self.ttl = settings.RESPONSE_CACHE_TTL
+        self.max_entries = settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.threshold = settings.RESPONSE_CACHE_SIMILARITY
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+        self.spent_seconds = 0.0
+        self.spent_tokens = 0
+        # (paper_id, normalized question) -> (expires_at, vector, response, seconds, tokens)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, paper_id: str, question: str) -> Optional[str]:
+        normalized = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            key = (paper_id, normalized)
+            entry = self._entries.get(key)
+            if entry is None and self.fuzzy:
+                key, entry = self._nearest(paper_id, normalized, now)
+            if entry is None or entry[0] < now:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[3]
+            self.saved_tokens += entry[4]
+            return entry[2]
+
+    def _nearest(self, paper_id: str, normalized: str, now: float):
+        """Most similar live entry for the paper above the threshold, if any"""
+        candidates = [
+            (key, entry) for key, entry in self._entries.items()
+            if key[0] == paper_id and entry[0] >= now
+        ]
+        if not candidates:
+            return None, None
+
+        query = self.embedder.embed([normalized])[0]
+        scores = np.stack([entry[1] for _, entry in candidates]) @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None, None
+        return candidates[best]
+
+    def set(self, paper_id: str, question: str, response: str, seconds: float, tokens: int):
+        """Store an answer along with what it cost to generate"""
+        normalized = normalize_question(question)
+        vector = self.embedder.embed([normalized])[0].astype(np.float16) if self.fuzzy else None
+        with self._lock:
+            self.spent_seconds += seconds
+            self.spent_tokens += tokens
+            self._entries[(paper_id, normalized)] = (time.time() + self.ttl, vector, response, seconds, tokens)
+            self._entries.move_to_end((paper_id, normalized))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            total_seconds = self.saved_seconds + self.spent_seconds
+            total_tokens = self.saved_tokens + self.spent_tokens
+            return {
+                "entries": len(self._entries),
+                "matching": "semantic" if self.fuzzy else "exact",
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 2),
+                "saved_tokens_estimate": self.saved_tokens,
+                "saved_latency_fraction": round(self.saved_seconds / total_seconds, 3) if total_seconds else 0.0,
+                "saved_token_fraction": round(self.saved_tokens / total_tokens, 3) if total_tokens else 0.0
+            }
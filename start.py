@@ -2,6 +2,11 @@
 """
 Startup script for Railway deployment
 Handles dynamic PORT environment variable properly
+
+Runs a single uvicorn process by default. With SERVER_MODE=production it
+runs gunicorn with uvicorn workers instead, one per CPU unless
+WEB_CONCURRENCY says otherwise, and defaults the cache tier to SQLite so
+cache entries and conversations are shared between workers.
 """
 import os
 import sys
@@ -15,6 +20,35 @@ sys.path.insert(0, src_dir)
 # Change to the app directory
 os.chdir(current_dir)
 
+def worker_count() -> int:
+    """Workers for production mode: WEB_CONCURRENCY if set, otherwise one per CPU"""
+    configured = os.environ.get('WEB_CONCURRENCY')
+    if configured:
+        return max(int(configured), 1)
+    try:
+        cpus = len(os.sched_getaffinity(0))  # Respects container CPU pinning
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(cpus, 1)
+
+def run_gunicorn(host: str, port: int, workers: int):
+    """Replace this process with gunicorn running uvicorn workers"""
+    # Per-process memory caches would split hit rates and chat sessions across workers
+    if workers > 1:
+        os.environ.setdefault('CACHE_BACKEND', 'sqlite')
+    args = [
+        sys.executable, '-m', 'gunicorn', 'main:app',
+        '--pythonpath', src_dir,
+        '--worker-class', 'uvicorn.workers.UvicornWorker',
+        '--workers', str(workers),
+        '--bind', f'{host}:{port}',
+        '--timeout', os.environ.get('GUNICORN_TIMEOUT', '120'),
+        '--graceful-timeout', '30',
+        '--keep-alive', '5',
+        '--access-logfile', '-'
+    ]
+    os.execv(sys.executable, args)
+
 if __name__ == "__main__":
     # Get port from Railway environment variable, default to 8080
     port = int(os.environ.get('PORT', 8080))
@@ -26,6 +60,11 @@ if __name__ == "__main__":
     print(f"🐍 Python Path: {sys.path[:3]}")
     
     try:
+        if os.environ.get('SERVER_MODE', '').lower() == 'production':
+            workers = worker_count()
+            print(f"🏭 Production mode: gunicorn with {workers} uvicorn workers")
+            run_gunicorn(host, port, workers)
+        
         # Start uvicorn with Railway's port
         uvicorn.run(
             "main:app",
@@ -4,6 +4,7 @@ let selectedPaper = null;
 let searchHistory = JSON.parse(localStorage.getItem('arxivChat_searchHistory')) || [];
 let bookmarkedPapers = JSON.parse(localStorage.getItem('arxivChat_bookmarks')) || [];
 let currentConversation = [];
+let chatSessionId = null; // Server-side conversation memory, renewed per paper and on clear
 
 // Initialize app
 document.addEventListener('DOMContentLoaded', function() {
@@ -48,18 +49,21 @@ async function searchPapers() {
     searchBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Searching...';
 
     try {
-        const response = await fetch(`/api/papers?q=${encodeURIComponent(query)}&limit=${limit}`);
+        const response = await fetch(`/api/papers/stream?q=${encodeURIComponent(query)}&limit=${limit}`);
         
         if (!response.ok) {
             throw new Error(`HTTP ${response.status}: ${response.statusText}`);
         }
         
-        const data = await response.json();
-
-        if (data.papers && data.papers.length > 0) {
-            displayPapers(data.papers);
-            addToSearchHistory(query, data.papers.length);
-            showToast(`Found ${data.papers.length} papers`, 'success');
+        const { papers, partial } = await streamSearchResults(response, resultsDiv);
+
+        if (papers.length > 0) {
+            addToSearchHistory(query, papers.length);
+            if (partial) {
+                showToast(`Search timed out, showing the first ${papers.length} papers`, 'warning');
+            } else {
+                showToast(`Found ${papers.length} papers`, 'success');
+            }
         } else {
             resultsDiv.innerHTML = '<div class="error">No papers found. Try a different search term.</div>';
             showToast('No papers found', 'warning');
@@ -75,31 +79,82 @@ async function searchPapers() {
     }
 }
 
-function displayPapers(papers) {
-    const resultsDiv = document.getElementById('searchResults');
-    resultsDiv.innerHTML = papers.map((paper, index) => {
-        const isBookmarked = bookmarkedPapers.some(b => b.id === paper.id);
-        const publishedDate = new Date(paper.published).toLocaleDateString();
+// Read NDJSON search results, showing each paper as soon as its line arrives
+async function streamSearchResults(response, resultsDiv) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let partial = false;
+    const promoted = [];
+    window.currentPapers = [];
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
         
-        return `
-            <div class="paper-card" onclick="selectPaper(${index})">
-                <div class="paper-card-header">
-                    <div class="paper-title">${escapeHtml(paper.title)}</div>
-                    <button class="paper-bookmark ${isBookmarked ? 'bookmarked' : ''}" 
-                            onclick="toggleBookmark(event, ${index})" 
-                            title="${isBookmarked ? 'Remove bookmark' : 'Bookmark paper'}">
-                        <i class="fas fa-bookmark"></i>
-                    </button>
-                </div>
-                <div class="paper-authors">Authors: ${paper.authors.join(', ')}</div>
-                <div class="paper-abstract">${escapeHtml(paper.abstract.substring(0, 300))}...</div>
-                <div class="paper-meta">
-                    <span><i class="fas fa-calendar"></i> ${publishedDate}</span>
-                    <span><i class="fas fa-tags"></i> ${paper.categories.slice(0, 3).join(', ')}</span>
-                </div>
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (!line) continue;
+            
+            const record = JSON.parse(line);
+            if (record.type === 'error') {
+                throw new Error(record.detail || 'Search failed');
+            }
+            if (record.type === 'paper' && record.promoted) {
+                // A later candidate re-ranking moved into the top results; placed by the done line
+                promoted.push(record.paper);
+            } else if (record.type === 'paper') {
+                if (window.currentPapers.length === 0) resultsDiv.innerHTML = '';
+                appendPaperCard(record.paper);
+            } else if (record.type === 'done' && record.order) {
+                // Re-ranked order arrives once every candidate has been seen
+                const byId = new Map(window.currentPapers.concat(promoted).map(paper => [paper.id, paper]));
+                displayPapers(record.order.map(id => byId.get(id)).filter(Boolean));
+            } else if (record.type === 'done' && record.partial) {
+                // The search hit its deadline; the papers already shown are all there is
+                partial = true;
+            }
+        }
+    }
+    return { papers: window.currentPapers, partial };
+}
+
+function paperCardHtml(paper, index) {
+    const isBookmarked = bookmarkedPapers.some(b => b.id === paper.id);
+    const publishedDate = new Date(paper.published).toLocaleDateString();
+    
+    return `
+        <div class="paper-card" onclick="selectPaper(${index})">
+            <div class="paper-card-header">
+                <div class="paper-title">${escapeHtml(paper.title)}</div>
+                <button class="paper-bookmark ${isBookmarked ? 'bookmarked' : ''}" 
+                        onclick="toggleBookmark(event, ${index})" 
+                        title="${isBookmarked ? 'Remove bookmark' : 'Bookmark paper'}">
+                    <i class="fas fa-bookmark"></i>
+                </button>
+            </div>
+            <div class="paper-authors">Authors: ${paper.authors.join(', ')}</div>
+            <div class="paper-abstract">${escapeHtml(paper.abstract.substring(0, 300))}...</div>
+            <div class="paper-meta">
+                <span><i class="fas fa-calendar"></i> ${publishedDate}</span>
+                <span><i class="fas fa-tags"></i> ${paper.categories.slice(0, 3).join(', ')}</span>
             </div>
-        `;
-    }).join('');
+        </div>
+    `;
+}
+
+function appendPaperCard(paper) {
+    const resultsDiv = document.getElementById('searchResults');
+    window.currentPapers.push(paper);
+    resultsDiv.insertAdjacentHTML('beforeend', paperCardHtml(paper, window.currentPapers.length - 1));
+}
+
+function displayPapers(papers) {
+    const resultsDiv = document.getElementById('searchResults');
+    resultsDiv.innerHTML = papers.map(paperCardHtml).join('');
     
     // Store papers globally for selection
     window.currentPapers = papers;
@@ -110,6 +165,7 @@ function selectPaper(paperIndex) {
         if (window.currentPapers && window.currentPapers[paperIndex]) {
             selectedPaper = window.currentPapers[paperIndex];
             currentConversation = []; // Reset conversation
+            chatSessionId = null;
             showChatSection();
             showToast('Paper selected for chat', 'success');
         }
@@ -137,10 +193,32 @@ function showChatSection() {
     // Add welcome message with enhanced formatting
     addMessage('assistant', `**Welcome!** I'm ready to help you understand this paper: **"${selectedPaper.title}"**\n\nFeel free to ask me about:\n- 🔬 **Methodology**: How the research was conducted\n- 📊 **Results**: Key findings and conclusions\n- 🧠 **Concepts**: Technical terms and theories\n- 🌐 **Context**: How this fits in the broader field\n- 💡 **Implications**: Real-world applications and impact`);
     
+    showStoredSummary(selectedPaper);
+    
     // Scroll to chat section
     chatSection.scrollIntoView({ behavior: 'smooth' });
 }
 
+// Show the paper's summary and suggested questions when the server already has them
+async function showStoredSummary(paper) {
+    try {
+        const response = await fetch(`/api/papers/${encodeURIComponent(paper.id)}/summary?generate=false`);
+        if (!response.ok || selectedPaper !== paper) return;
+        
+        const artifacts = await response.json();
+        let content = `**Summary:** ${artifacts.summary}`;
+        if (artifacts.contributions.length) {
+            content += `\n\n**Key contributions:**\n${artifacts.contributions.map(item => `- ${item}`).join('\n')}`;
+        }
+        if (artifacts.questions.length) {
+            content += `\n\n**You might ask:**\n${artifacts.questions.map(item => `- *${item}*`).join('\n')}`;
+        }
+        addMessage('assistant', content);
+    } catch (error) {
+        console.error('Error loading summary:', error);
+    }
+}
+
 // Enhanced chat functionality with markdown support
 async function sendMessage() {
     const input = document.getElementById('chatQuery');
@@ -170,14 +248,15 @@ async function sendMessage() {
     messagesDiv.appendChild(loadingDiv);
 
     try {
-        const response = await fetch('/api/chat', {
+        const response = await fetch('/api/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
                 paper_id: selectedPaper.id,
-                message: message
+                message: message,
+                session_id: chatSessionId
             })
         });
 
@@ -185,12 +264,12 @@ async function sendMessage() {
             throw new Error(`HTTP ${response.status}: ${response.statusText}`);
         }
 
-        const data = await response.json();
-        messagesDiv.removeChild(loadingDiv);
+        chatSessionId = response.headers.get('X-Session-ID') || chatSessionId;
+        const content = await streamChatResponse(response, loadingDiv);
+        loadingDiv.remove();
         
-        if (data.response) {
-            addMessage('assistant', data.response);
-            currentConversation.push({ role: 'assistant', content: data.response, timestamp: new Date() });
+        if (content) {
+            currentConversation.push({ role: 'assistant', content: content, timestamp: new Date() });
             showToast('Response generated successfully', 'success');
         } else {
             addMessage('assistant', 'Sorry, I could not generate a response.');
@@ -198,7 +277,7 @@ async function sendMessage() {
         }
     } catch (error) {
         console.error('Chat error:', error);
-        messagesDiv.removeChild(loadingDiv);
+        loadingDiv.remove();
         addMessage('assistant', '❌ **Error**: Could not get response from AI. Please try again.\n\n*This might be due to network issues or API limits.*');
         showToast('Chat failed. Please try again.', 'error');
     } finally {
@@ -208,12 +287,89 @@ async function sendMessage() {
     }
 }
 
+// Read the Server-Sent Events chat stream, rendering markdown as tokens arrive
+async function streamChatResponse(response, loadingDiv) {
+    const messagesDiv = document.getElementById('chatMessages');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let content = '';
+    let messageDiv = null;
+    let renderScheduled = false;
+    
+    const render = () => {
+        renderScheduled = false;
+        renderMessageContent(messageDiv, 'assistant', content);
+        messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    };
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+            const event = parseSseEvent(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+            
+            if (event.type === 'error') {
+                throw new Error(event.data.detail || 'Stream failed');
+            }
+            if (event.type === 'done' && event.data.partial) {
+                // The answer hit its deadline mid-stream; keep what arrived and say so
+                content += '\n\n*(Response cut short: time limit reached)*';
+                if (!messageDiv) {
+                    loadingDiv.remove();
+                    messageDiv = addMessage('assistant', '');
+                }
+                continue;
+            }
+            if (event.type !== 'token') continue;
+            
+            content += event.data.token;
+            if (!messageDiv) {
+                loadingDiv.remove();
+                messageDiv = addMessage('assistant', '');
+            }
+            // Re-render at most once per frame however fast tokens arrive
+            if (!renderScheduled) {
+                renderScheduled = true;
+                requestAnimationFrame(render);
+            }
+        }
+    }
+    
+    if (messageDiv) render();
+    return content;
+}
+
+function parseSseEvent(rawEvent) {
+    let type = 'message';
+    let data = '';
+    rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) type = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+    });
+    return { type, data: data ? JSON.parse(data) : {} };
+}
+
 // Enhanced message rendering with markdown support
 function addMessage(role, content) {
     const messagesDiv = document.getElementById('chatMessages');
     const messageDiv = document.createElement('div');
     messageDiv.className = `message ${role}`;
+    messageDiv.dataset.timestamp = new Date().toLocaleTimeString();
     
+    renderMessageContent(messageDiv, role, content);
+    
+    messagesDiv.appendChild(messageDiv);
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    return messageDiv;
+}
+
+function renderMessageContent(messageDiv, role, content) {
     // Render markdown if marked library is available
     if (typeof marked !== 'undefined' && role === 'assistant') {
         try {
@@ -232,11 +388,8 @@ function addMessage(role, content) {
     // Add timestamp for better UX
     const timestamp = document.createElement('div');
     timestamp.className = 'message-timestamp';
-    timestamp.textContent = new Date().toLocaleTimeString();
+    timestamp.textContent = messageDiv.dataset.timestamp;
     messageDiv.appendChild(timestamp);
-    
-    messagesDiv.appendChild(messageDiv);
-    messagesDiv.scrollTop = messagesDiv.scrollHeight;
 }
 
 // Bookmark functionality
@@ -328,6 +481,7 @@ function repeatSearch(query) {
 function selectBookmarkedPaper(index) {
     selectedPaper = bookmarkedPapers[index];
     currentConversation = [];
+    chatSessionId = null;
     showChatSection();
     closePanels();
     showToast('Bookmarked paper selected', 'success');
@@ -394,6 +548,7 @@ function clearChat() {
     if (confirm('Clear current conversation?')) {
         document.getElementById('chatMessages').innerHTML = '';
         currentConversation = [];
+        chatSessionId = null;
         showToast('Conversation cleared', 'success');
     }
 }
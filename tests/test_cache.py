@@ -0,0 +1,78 @@
+"""
+Offline tests for the shared SQLite cache backend
+"""
+import sqlite3
+import sys
+
+import pytest
+
+import cache
+from cache import CacheBackendUnavailable, SQLiteCache, build_cache
+
+
+def totals(store):
+    return store._len(), store._size_bytes()
+
+
+def scanned(store):
+    return store._conn.execute(
+        f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {store._table}"
+    ).fetchone()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+def test_totals_follow_inserts_updates_and_deletes(path):
+    store = SQLiteCache("t", ttl=60, max_entries=100, max_bytes=10 ** 6, path=path)
+    store.set("a", "x" * 10)
+    store.set("b", "y" * 20)
+    store.set("a", "z" * 5)
+    assert totals(store) == tuple(scanned(store)) == (2, 7 + 22)
+
+
+def test_evicts_least_recently_used_past_entry_cap(path, monkeypatch):
+    store = SQLiteCache("t", ttl=60, max_entries=3, max_bytes=10 ** 6, path=path)
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(cache.time, "time", lambda: next(clock))
+    for key in "abc":
+        store.set(key, key)
+    store.get("a")
+    store.set("d", "d")
+
+    assert store.get("b") is None
+    assert [store.get(key) for key in "acd"] == ["a", "c", "d"]
+    assert store.evictions == 1
+    assert totals(store) == tuple(scanned(store))
+
+
+def test_evicts_past_byte_cap(path):
+    store = SQLiteCache("t", ttl=60, max_entries=100, max_bytes=50, path=path)
+    for n in range(5):
+        store.set(f"k{n}", "x" * 18)  # 20 encoded bytes each
+    assert totals(store) == (2, 40)
+
+
+def test_existing_table_gets_totals(path):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE cache_t (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+        "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO cache_t VALUES ('old', '\"v\"', 3, 1e12, 0)")
+    conn.commit()
+    conn.close()
+
+    store = SQLiteCache("t", ttl=60, max_entries=100, max_bytes=10 ** 6, path=path)
+    assert totals(store) == (1, 3)
+    # A second worker opening the same file does not count again
+    assert totals(SQLiteCache("t", ttl=60, max_entries=100, max_bytes=10 ** 6, path=path)) == (1, 3)
+
+
+def test_missing_redis_package_fails_loudly(monkeypatch):
+    monkeypatch.setattr(cache.settings, "CACHE_BACKEND", "redis")
+    monkeypatch.setitem(sys.modules, "redis", None)
+    with pytest.raises(CacheBackendUnavailable):
+        build_cache("t", ttl=60, max_entries=10, max_bytes=1000)
@@ -0,0 +1,75 @@
+"""
+Offline tests for server-side conversation history
+"""
+import threading
+
+import pytest
+
+from cache import SQLiteCache
+from config import settings
+from conversation_store import ConversationStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_BACKEND", "memory")
+    return ConversationStore()
+
+
+def test_history_round_trip(store):
+    store.append("s", "p", "user", "What is the method?")
+    store.append("s", "p", "assistant", "Sparse attention.")
+    history = store.history("s", "p")
+    assert [(m.role, m.content) for m in history] == [("user", "What is the method?"), ("assistant", "Sparse attention.")]
+    assert history[0].timestamp.tzinfo is not None
+
+
+def test_session_byte_limit_drops_oldest(store):
+    store.max_session_bytes = 1000
+    for n in range(10):
+        store.append("s", "p", "user", f"{n} " + "x" * 200)
+    stored = store._sessions.get("s|p")
+    assert len(stored) < 10
+    assert stored[-1]["content"].startswith("9 ")
+    assert sum(len(m["content"]) for m in stored) < 1000
+
+
+def test_byte_cap_follows_session_limit(store):
+    assert store._sessions.max_bytes == settings.CHAT_MAX_SESSIONS * settings.CHAT_SESSION_MAX_BYTES
+
+
+def concurrent_appends(store, threads=8, each=10):
+    def worker(n):
+        for i in range(each):
+            store.append("s", "p", "user", f"{n}-{i}")
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+
+def test_concurrent_appends_keep_every_message(store):
+    store.max_messages = 1000
+    concurrent_appends(store)
+    assert len(store._sessions.get("s|p")) == 80
+
+
+def test_concurrent_appends_across_workers_keep_every_message(store, tmp_path):
+    # Two stores on one SQLite file stand in for two workers sharing the cache
+    path = str(tmp_path / "cache.db")
+    other = ConversationStore()
+    for each in (store, other):
+        each.max_messages = 1000
+        each._sessions = SQLiteCache("conversations", 60, 100, 10 ** 7, path)
+
+    def run(target):
+        concurrent_appends(target, threads=4)
+
+    workers = [threading.Thread(target=run, args=(target,)) for target in (store, other)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    assert len(store._sessions.get("s|p")) == 80
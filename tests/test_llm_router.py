@@ -0,0 +1,198 @@
+"""
+Offline tests for provider failover, circuit breakers and hedging, with fake providers
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import llm_router
+from llm_router import AllProvidersFailed, CircuitBreaker, LLMRouter
+
+
+class FakeProvider:
+    """Answers `text` after `latency`; fails every call while `fail` is set, or after `fail_after` chunks"""
+
+    def __init__(self, text="answer", latency=0.0, fail=False, fail_after=None):
+        self.text = text
+        self.latency = latency
+        self.fail = fail
+        self.fail_after = fail_after
+        self.calls = 0
+        self.cancelled = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return SimpleNamespace(content=self.text)
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError("provider down")
+        return SimpleNamespace(content=self.text)
+
+    async def astream(self, prompt):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("provider down")
+        for n, word in enumerate(self.text.split()):
+            if self.fail_after is not None and n >= self.fail_after:
+                raise RuntimeError("stream broke")
+            await asyncio.sleep(self.latency)
+            yield SimpleNamespace(content=word)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(llm_router.time, "monotonic", fake)
+    return fake
+
+
+@pytest.fixture
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(llm_router.settings, "LLM_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(llm_router.settings, "LLM_BREAKER_RESET_SECONDS", 30)
+    monkeypatch.setattr(llm_router.settings, "LLM_HEDGE_MIN_SAMPLES", 5)
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.available() and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.available()
+    assert breaker.allow() and breaker.state == "half_open"
+    # Only one trial at a time
+    assert not breaker.available() and not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_trial_reopens_for_a_fresh_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_cancelled_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_cancelled()
+    assert breaker.state == "open" and not breaker.available()
+
+
+def test_invoke_fails_over_and_open_breaker_is_skipped(breaker_settings, clock):
+    primary = FakeProvider(fail=True)
+    secondary = FakeProvider(text="backup")
+    router = LLMRouter([("primary", primary), ("secondary", secondary)])
+
+    for _ in range(2):
+        text, route = router.invoke("prompt")
+        assert text == "backup"
+        assert route["fallback"] and route["attempts"] == ["primary", "secondary"]
+    assert router.providers[0].breaker.state == "open"
+
+    text, route = router.invoke("prompt")
+    assert route["attempts"] == ["secondary"] and primary.calls == 2
+
+    # After the cooldown one trial reaches the recovered primary and closes its breaker
+    clock.now += 30
+    primary.fail = False
+    text, route = router.invoke("prompt")
+    assert route["provider"] == "primary" and router.providers[0].breaker.state == "closed"
+
+
+def test_all_providers_failing_raises(breaker_settings):
+    router = LLMRouter([("a", FakeProvider(fail=True)), ("b", FakeProvider(fail=True))])
+    with pytest.raises(AllProvidersFailed):
+        router.invoke("prompt")
+    with pytest.raises(AllProvidersFailed):
+        asyncio.run(router.ainvoke("prompt"))
+
+
+def test_ainvoke_fails_over(breaker_settings):
+    router = LLMRouter([("primary", FakeProvider(fail=True)), ("secondary", FakeProvider(text="backup"))])
+    text, route = asyncio.run(router.ainvoke("prompt"))
+    assert text == "backup" and route["fallback"]
+
+
+def collect(router, prompt="prompt"):
+    async def run():
+        route = {}
+        chunks = [chunk async for chunk in router.astream(prompt, route)]
+        return chunks, route
+    return asyncio.run(run())
+
+
+def test_stream_fails_over_before_the_first_chunk(breaker_settings):
+    router = LLMRouter([("primary", FakeProvider(fail=True)), ("secondary", FakeProvider(text="from backup"))])
+    chunks, route = collect(router)
+    assert chunks == ["from", "backup"]
+    assert route["provider"] == "secondary" and route["fallback"]
+
+
+def test_stream_does_not_fail_over_after_the_first_chunk(breaker_settings):
+    secondary = FakeProvider(text="from backup")
+    router = LLMRouter([("primary", FakeProvider(text="partial answer here", fail_after=1)), ("secondary", secondary)])
+    with pytest.raises(RuntimeError, match="stream broke"):
+        collect(router)
+    assert secondary.calls == 0
+
+
+def test_hedge_wins_over_a_slow_primary(breaker_settings):
+    primary = FakeProvider(text="slow", latency=1.0)
+    secondary = FakeProvider(text="fast", latency=0.01)
+    router = LLMRouter([("primary", primary), ("secondary", secondary)], hedging=True)
+    # The primary usually answers in 50 ms, so its p95 sets the hedge delay
+    router.providers[0].latencies.extend([0.05] * 10)
+
+    start = time.perf_counter()
+    text, route = asyncio.run(router.ainvoke("prompt"))
+
+    assert text == "fast"
+    assert route["hedged"] and route["provider"] == "secondary"
+    assert route["attempts"] == ["primary", "secondary"]
+    assert time.perf_counter() - start < 0.5
+    assert router.hedges == 1
+    # The losing primary is cancelled, which is not counted against it
+    assert primary.cancelled == 1
+    assert router.providers[0].breaker.state == "closed" and router.providers[0].breaker.consecutive_failures == 0
+
+
+def test_no_hedge_without_enough_latency_samples(breaker_settings):
+    router = LLMRouter([("primary", FakeProvider(text="slow", latency=0.2)), ("secondary", FakeProvider())],
+                       hedging=True)
+    text, route = asyncio.run(router.ainvoke("prompt"))
+    assert text == "slow" and not route["hedged"]
@@ -0,0 +1,75 @@
+"""
+Offline tests for the local arXiv mirror's query translation and search
+"""
+import itertools
+
+import pytest
+
+from local_index import LocalArxivIndex
+
+
+def record(paper_id, title, abstract, authors=("A. Author",), categories=("cs.LG",)):
+    return {
+        "id": paper_id,
+        "title": title,
+        "abstract": abstract,
+        "authors": list(authors),
+        "published": "2024-01-01",
+        "pdf_url": f"http://arxiv.org/pdf/{paper_id}",
+        "categories": list(categories)
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    local = LocalArxivIndex(str(tmp_path / "arxiv.db"))
+    local.ingest_records([
+        record("2401.00001", "Graph neural networks", "Message passing over graph structure"),
+        record("2401.00002", "Vision transformers", "Attention over image patches"),
+        record("2401.00003", "Graph attention", "Attention weights between graph neighbours"),
+    ])
+    return local
+
+
+def ids(papers):
+    return sorted(paper["id"] for paper in papers)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("graph neural", None),
+    ("graph AND neural", '"graph" AND "neural"'),
+    ("graph OR vision", '"graph" OR "vision"'),
+    ("ti:graph ANDNOT au:smith", 'title:"graph" NOT authors:"smith"'),
+    ("(graph OR vision) AND attention", '("graph" OR "vision") AND "attention"'),
+    ("ANDNOT vision", ""),
+    ("ANDNOT vision graph OR attention", '("graph" OR "attention") NOT "vision"'),
+    ("graph AND (", '"graph"'),
+    ("graph OR ()", '"graph"'),
+    ("graph OR () attention", '"graph" OR "attention"'),
+    ("graph AND ) attention", '"graph" AND "attention"'),
+    ("graph AND (ANDNOT vision)", '"graph" NOT "vision"'),
+    ("(ANDNOT vision attention)", '("attention" NOT "vision")'),
+    ("attention ANDNOT (vision OR neural)", '"attention" NOT ("vision" OR "neural")'),
+])
+def test_parse_boolean_query(query, expected):
+    assert LocalArxivIndex._parse_boolean_query(query) == expected
+
+
+def test_boolean_search(index):
+    assert ids(index.search("attention ANDNOT vision")) == ["2401.00003"]
+    assert ids(index.search("graph AND (ANDNOT neural)")) == ["2401.00003"]
+    assert ids(index.search("vision OR neural")) == ["2401.00001", "2401.00002"]
+    assert index.search("ANDNOT vision") == []
+
+
+def test_malformed_queries_give_valid_fts(index):
+    tokens = ["graph", "AND", "OR", "ANDNOT", "(", ")", "ti:vision"]
+    for length in range(1, 6):
+        for combination in itertools.product(tokens, repeat=length):
+            expression = LocalArxivIndex._parse_boolean_query(" ".join(combination))
+            if expression:
+                index._conn.execute("SELECT rowid FROM papers_fts WHERE papers_fts MATCH ?", (expression,))
+
+
+def test_fts_errors_match_nothing(index):
+    assert index._match('"graph" AND', 10) == []
@@ -0,0 +1,55 @@
+"""
+Offline tests for speculative warm-ups after a search
+"""
+import asyncio
+
+from config import settings
+from prefetch import Prefetcher
+from rate_limit import AdmissionController
+
+PAPER = {"id": "2401.00001v1", "title": "Sparse attention", "abstract": "Attention over long documents"}
+
+
+class FakeRAG:
+    background_workers = 1
+
+    def __init__(self):
+        self.retrieved = []
+
+    async def awarm(self, paper):
+        return True
+
+    async def aretrieve(self, paper, question, top_k=None, background=False):
+        self.retrieved.append((paper["id"], question, background))
+        return ["excerpt from the full text"]
+
+
+class FakeLLMService:
+    def __init__(self):
+        self.calls = []
+
+    async def achat_about_paper(self, paper, message, excerpts=None, history=None, route=None, artifacts=None):
+        self.calls.append({"message": message, "excerpts": excerpts, "artifacts": artifacts})
+        return "summary"
+
+
+def test_summary_uses_the_live_chat_context(monkeypatch):
+    monkeypatch.setattr(settings, "PREFETCH_SUMMARY", True)
+    rag = FakeRAG()
+    llm = FakeLLMService()
+
+    async def run():
+        prefetcher = Prefetcher(llm, rag, AdmissionController(4, 4, 1.0), lambda paper: {"summary": "stored"})
+        prefetcher.schedule([PAPER])
+        await asyncio.gather(*prefetcher._tasks.values())
+        return prefetcher
+
+    prefetcher = asyncio.run(run())
+
+    assert prefetcher.completed == 1
+    assert rag.retrieved == [(PAPER["id"], settings.PREFETCH_SUMMARY_QUESTION, True)]
+    assert llm.calls == [{
+        "message": settings.PREFETCH_SUMMARY_QUESTION,
+        "excerpts": ["excerpt from the full text"],
+        "artifacts": {"summary": "stored"}
+    }]
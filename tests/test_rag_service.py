@@ -0,0 +1,143 @@
+"""
+Offline tests for full-text retrieval, against a small fixture PDF
+"""
+import os
+
+import pytest
+
+from conftest import FIXTURES
+from config import settings
+from embeddings import HashingEmbedder
+from rag_service import RAGService
+
+PAPER = {"id": "2401.00001v1", "pdf_url": "http://arxiv.org/pdf/2401.00001v1"}
+
+
+@pytest.fixture
+def pdf_bytes():
+    with open(os.path.join(FIXTURES, "sample_paper.pdf"), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "RAG_CHUNK_WORDS", 20)
+    monkeypatch.setattr(settings, "RAG_CHUNK_OVERLAP", 5)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch, small_chunks, pdf_bytes):
+    monkeypatch.setattr(settings, "RAG_INDEX_DIR", str(tmp_path / "rag"))
+    rag = RAGService(HashingEmbedder())
+    rag.downloads = 0
+
+    def download(pdf_url):
+        rag.downloads += 1
+        return pdf_bytes
+
+    monkeypatch.setattr(rag, "_download_pdf", download)
+    yield rag
+    rag.shutdown()
+
+
+def test_extract_text(pdf_bytes):
+    text = RAGService._extract_text(pdf_bytes)
+    assert "Sparse Attention for Long Documents" in text
+    assert "quarter of the memory" in text
+
+
+def test_chunk_windows_overlap(small_chunks):
+    words = [f"w{i}" for i in range(50)]
+    chunks = RAGService._chunk(" ".join(words))
+
+    assert [len(chunk.split()) for chunk in chunks] == [20, 20, 20]
+    assert chunks[0].split()[-5:] == chunks[1].split()[:5]
+    assert chunks[-1].split()[-1] == "w49"
+
+
+def test_chunk_short_and_empty_text(small_chunks):
+    assert RAGService._chunk("just a few words") == ["just a few words"]
+    assert RAGService._chunk("") == []
+
+
+def test_build_then_load_from_disk(service, tmp_path):
+    excerpts = service.retrieve(PAPER, "memory and speed")
+    assert excerpts and service.downloads == 1
+
+    paper_dir = service._paper_dir(PAPER["id"])
+    assert sorted(os.listdir(paper_dir)) == ["chunks.json", "vectors.npy"]
+    assert not service._build_locks
+
+    # A fresh service (another worker) opens the stored index without downloading again
+    other = RAGService(HashingEmbedder())
+    other._download_pdf = lambda pdf_url: pytest.fail("index should load from disk")
+    try:
+        assert other.retrieve(PAPER, "memory and speed") == excerpts
+    finally:
+        other.shutdown()
+
+
+def test_index_for_another_embedder_is_rebuilt(service):
+    service.retrieve(PAPER, "attention")
+    other = RAGService(HashingEmbedder(dim=128))
+    assert other._load(PAPER["id"]) is None
+    other.shutdown()
+
+
+def test_retrieve_ranks_relevant_chunk(service):
+    top = service.retrieve(PAPER, "which tasks still favour dense attention limitations", top_k=1)
+    assert len(top) == 1
+    assert "Limitations" in top[0]
+
+
+def test_retrieve_keeps_document_order(service):
+    chunks = service._load_or_build(PAPER)[1]
+    excerpts = service.retrieve(PAPER, "attention tokens", top_k=3)
+    assert [chunks.index(excerpt) for excerpt in excerpts] == sorted(chunks.index(excerpt) for excerpt in excerpts)
+
+
+def test_failed_build_falls_back_and_is_not_retried(service, monkeypatch):
+    calls = []
+
+    def broken(pdf_url):
+        calls.append(pdf_url)
+        raise ValueError("download failed")
+
+    monkeypatch.setattr(service, "_download_pdf", broken)
+    assert service.retrieve(PAPER, "attention") == []
+    assert service.retrieve(PAPER, "attention") == []
+    assert len(calls) == 1
+    assert not service._build_locks
+
+
+def test_failures_are_bounded(service, monkeypatch):
+    monkeypatch.setattr(service, "FAILURE_LIMIT", 3)
+    for i in range(5):
+        service._record_failure(f"paper-{i}")
+    assert list(service._failures) == ["paper-2", "paper-3", "paper-4"]
+
+    monkeypatch.setattr(service, "FAILURE_RETRY_SECONDS", 0)
+    assert not service._recently_failed("paper-4")
+    assert "paper-4" not in service._failures
+
+
+def test_losing_a_build_race_uses_the_winners_index(service, monkeypatch):
+    other = RAGService(HashingEmbedder())
+    other._download_pdf = service._download_pdf
+    real_replace = os.replace
+
+    def racing_replace(src, dst):
+        # Another worker swaps in its index between our cleanup and our replace
+        monkeypatch.setattr(os, "replace", real_replace)
+        other._build(PAPER)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", racing_replace)
+    try:
+        assert service.retrieve(PAPER, "memory and speed")
+    finally:
+        other.shutdown()
+    assert not service._failures
+    # Our temporary build is cleaned up, leaving only the winner's index
+    paper_dir = service._paper_dir(PAPER["id"])
+    assert os.listdir(os.path.dirname(paper_dir)) == [os.path.basename(paper_dir)]
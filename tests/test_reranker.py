@@ -0,0 +1,50 @@
+"""
+Offline tests for the re-ranking embedding store
+"""
+import numpy as np
+
+from embeddings import HashingEmbedder
+from reranker import EmbeddingStore, Reranker, paper_text
+
+
+def paper(n):
+    return {"id": f"p{n}", "title": f"Paper {n}", "abstract": f"topic{n} words about subject {n}"}
+
+
+def expected(store, papers):
+    return store.embedder.embed([paper_text(p) for p in papers]).astype(np.float16).astype(np.float32)
+
+
+def test_full_store_keeps_this_calls_hits():
+    store = EmbeddingStore(HashingEmbedder(dim=32), max_entries=4)
+    store.vectors_for([paper(n) for n in range(4)])
+
+    vectors = store.vectors_for([paper(0), paper(4)])
+
+    assert np.array_equal(vectors, expected(store, [paper(0), paper(4)]))
+    # p1 was the least recently used row once p0 was refreshed
+    assert set(store._rows) == {"p0", "p2", "p3", "p4"}
+    assert store.stats()["hits"] == 1
+
+
+def test_call_larger_than_store():
+    store = EmbeddingStore(HashingEmbedder(dim=32), max_entries=2)
+    papers = [paper(n) for n in range(5)]
+
+    vectors = store.vectors_for(papers + [paper(1)])
+
+    assert np.array_equal(vectors, expected(store, papers + [paper(1)]))
+    assert len(store._rows) == 2
+
+
+def test_rerank_with_a_full_store():
+    reranker = Reranker(HashingEmbedder(dim=64))
+    reranker.store = EmbeddingStore(reranker.embedder, max_entries=3)
+    try:
+        reranker.rerank("topic1", [paper(n) for n in range(3)], 3)
+        ranked, _ = reranker.rerank("topic4", [paper(1), paper(4), paper(5)], 2)
+    finally:
+        reranker.shutdown()
+
+    assert ranked[0]["id"] == "p4"
+    assert len(ranked) == 2